@@ -0,0 +1,20 @@
+"""Service instances shared by every router, built once per process.
+
+Routers import these rather than constructing their own, so /api/weather
+and /api/health are served by the same weather, location, sun, air-quality
+and pollen services (and the gazetteer behind LocationService loads once).
+"""
+from app.core.location_keys import canonical_locations
+from app.services.air_quality_service import AirQualityService
+from app.services.location_service import LocationService
+from app.services.pollen_service import PollenService
+from app.services.sun_service import SunService
+from app.services.weather_service import WeatherService
+
+weather_service = WeatherService()
+location_service = LocationService()
+# Cache keys for place names resolve through the gazetteer, so spellings of one place share entries
+canonical_locations.set_resolver(location_service.resolve_coordinates)
+air_quality_service = AirQualityService(weather_service=weather_service)
+pollen_service = PollenService(weather_service=weather_service)
+sun_service = SunService(location_service, weather_service)
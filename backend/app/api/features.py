@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+from app.api.dependencies import air_quality_service, pollen_service, sun_service
 from app.services.auth_service import AuthService
 from app.services.alert_notification_service import AlertNotificationService
 from app.services.data_export_service import DataExportService
@@ -17,7 +18,7 @@ router = APIRouter()
 auth_service = AuthService()
 alert_notif_service = AlertNotificationService()
 export_service = DataExportService()
-health_safety_service = HealthSafetyService()
+health_safety_service = HealthSafetyService(sun_service, air_quality_service, pollen_service)
 activity_planner_service = ActivityPlannerService()
 seasonal_analysis_service = SeasonalAnalysisService()
 travel_planner_service = TravelPlannerService()
@@ -160,10 +161,10 @@ async def export_pdf(location: str = Query(...)):
 # ==================== HEALTH & SAFETY ====================
 
 @router.get("/health/risks")
-async def get_health_risks(weather_data: Dict = None):
+async def get_health_risks(weather_data: Dict = None, location: Optional[str] = Query(None, description="City name")):
     """Get health risks based on weather"""
     try:
-        risks = await health_safety_service.get_health_risks(weather_data or {})
+        risks = await health_safety_service.get_health_risks(weather_data or {}, location)
         return risks
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional, List, Dict
-from app.services.weather_service import WeatherService
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Tuple
+import json
+from app.core.config import settings
+from app.core.rate_limiter import RateLimitExceeded
+from app.core.resilience import CircuitOpenError
+from app.api.dependencies import (
+    air_quality_service,
+    location_service,
+    pollen_service,
+    sun_service,
+    weather_service
+)
 from app.services.nlp_service import NLPService
 from app.services.alert_service import AlertService
-from app.services.location_service import LocationService
-from app.services.air_quality_service import AirQualityService
-from app.services.sun_service import SunService
 from app.services.outfit_service import OutfitService
 from app.services.historical_service import HistoricalService
-from app.services.pollen_service import PollenService
 from app.services.detailed_weather_service import DetailedWeatherService
 from app.services.comparison_service import ComparisonService
+from app.services.conversation_store import UnknownSessionError
 from app.services.enhanced_nlp_service import EnhancedNLPService
 from app.services.web_insights_service import WebInsightsService
 from app.services.ml_prediction_service import MLPredictionService
@@ -19,61 +27,86 @@ from app.services.learning_service import LearningService
 from app.services.long_range_forecast_service import LongRangeForecastService
 
 router = APIRouter()
-weather_service = WeatherService()
-nlp_service = NLPService()
-alert_service = AlertService()
-location_service = LocationService()
-air_quality_service = AirQualityService()
-sun_service = SunService()
+alert_service = AlertService(weather_service)
+nlp_service = NLPService(location_service, weather_service, air_quality_service, sun_service)
 outfit_service = OutfitService()
-enhanced_nlp_service = EnhancedNLPService()
+enhanced_nlp_service = EnhancedNLPService(nlp_service)
 web_insights_service = WebInsightsService()
 ml_prediction_service = MLPredictionService()
 learning_service = LearningService()
 historical_service = HistoricalService()
-pollen_service = PollenService()
 detailed_weather_service = DetailedWeatherService()
-comparison_service = ComparisonService()
+comparison_service = ComparisonService(weather_service, air_quality_service, sun_service)
 
 
 class QueryRequest(BaseModel):
     query: str
+    location: Optional[str] = Field(None, description="Used when the query names no place")
 
 
 class QueryResponse(BaseModel):
     answer: str
     weather_data: Optional[dict] = None
     confidence: float
+    intent: Optional[str] = None
+    location: Optional[str] = None
+    times: List[dict] = []
+
+
+def _http_error(e: Exception) -> HTTPException:
+    """Map service errors to HTTP errors; quota exhaustion is a 429, an open circuit a 503, an unknown session a 404"""
+    if isinstance(e, UnknownSessionError):
+        return HTTPException(status_code=404, detail=str(e))
+    if isinstance(e, (RateLimitExceeded, CircuitOpenError)):
+        return HTTPException(
+            status_code=429 if isinstance(e, RateLimitExceeded) else 503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.5)))}
+        )
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def _set_freshness_headers(response: Response, meta: Dict) -> None:
+    """Expose cache age and staleness so clients can label old data"""
+    response.headers["Age"] = str(meta["age"])
+    response.headers["X-Cache"] = meta["status"]
 
 
 @router.get("/current")
-async def get_current_weather(location: str = Query(..., description="City name")):
+async def get_current_weather(response: Response, location: str = Query(..., description="City name")):
     """Get current weather for a location"""
     try:
-        weather_data = await weather_service.get_current_weather(location)
+        weather_data, meta = await weather_service.get_current_weather_with_meta(location)
+        _set_freshness_headers(response, meta)
         return weather_data
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/forecast")
-async def get_forecast(location: str = Query(..., description="City name")):
+async def get_forecast(response: Response, location: str = Query(..., description="City name")):
     """Get 7-day weather forecast for a location"""
     try:
-        forecast_data = await weather_service.get_forecast(location)
+        forecast_data, meta = await weather_service.get_forecast_with_meta(location)
+        _set_freshness_headers(response, meta)
         return forecast_data
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.post("/query", response_model=QueryResponse)
-async def natural_language_query(request: QueryRequest):
-    """Process natural language weather queries using AI"""
-    try:
-        response = await nlp_service.process_query(request.query)
-        return response
+async def natural_language_query(request: QueryRequest, response: Response):
+    """Answer a natural language weather query with the data it needs, in one response.
+    
+    Per-stage durations (parse, each dataset fetched, compose) are reported
+    in the Server-Timing header.
+    """
+    try:
+        result, timings = await nlp_service.process_query_with_timings(request.query, request.location)
+        response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in timings.items())
+        return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/recommendations")
@@ -83,7 +116,7 @@ async def get_weather_recommendations(location: str = Query(..., description="Ci
         recommendations = await weather_service.get_recommendations(location)
         return recommendations
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/alerts")
@@ -93,7 +126,7 @@ async def get_alerts(location: str = Query(..., description="City name")):
         alerts = await alert_service.get_alerts(location)
         return {"location": location, "alerts": alerts}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/locations/search")
@@ -106,14 +139,49 @@ async def search_locations(query: str = Query(..., description="Search query"),
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/locations/reverse")
+async def reverse_geocode(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, ge=1, le=50)
+):
+    """Find the nearest known places to a coordinate"""
+    try:
+        location = await location_service.get_location_details(lat, lon)
+        nearby = await location_service.get_nearby_places(lat, lon, k)
+        return {"lat": lat, "lon": lon, "location": location, "nearby": nearby}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class ReverseGeocodeRequest(BaseModel):
+    coordinates: List[Tuple[float, float]] = Field(..., min_length=1, max_length=settings.batch_max_locations)
+
+
+@router.post("/locations/reverse")
+async def reverse_geocode_batch(request: ReverseGeocodeRequest):
+    """Resolve many (lat, lon) pairs to their nearest known place in one request"""
+    try:
+        locations = location_service.get_location_details_batch(request.coordinates)
+        return {"count": len(locations), "results": locations}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/air-quality")
-async def get_air_quality(location: str = Query(..., description="City name")):
+async def get_air_quality(
+    location: str = Query(..., description="City name"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180)
+):
     """Get current air quality index"""
     try:
-        air_quality = await air_quality_service.get_air_quality(location)
+        air_quality = await air_quality_service.get_air_quality(location, lat, lon)
         return air_quality
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/air-quality/forecast")
@@ -122,16 +190,54 @@ async def get_air_quality_forecast(location: str = Query(..., description="City
     try:
         forecast = await air_quality_service.get_air_quality_forecast(location, days)
         return {"location": location, "forecast": forecast}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
+
+
+class BatchLocationsRequest(BaseModel):
+    locations: List[str] = Field(..., min_length=1, max_length=settings.batch_max_locations)
+
+
+@router.post("/air-quality/batch")
+async def get_air_quality_batch(request: BatchLocationsRequest):
+    """Get current air quality for many locations in one request"""
+    try:
+        return await air_quality_service.get_air_quality_batch(request.locations)
+    except Exception as e:
+        raise _http_error(e)
 
 
 @router.get("/sun")
-async def get_sun_data(location: str = Query(..., description="City name"), lat: float = Query(0), lon: float = Query(0)):
+async def get_sun_data(
+    location: str = Query(..., description="City name"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180)
+):
     """Get UV index, sunrise, and sunset times"""
     try:
         sun_data = await sun_service.get_sun_data(location, lat, lon)
         return sun_data
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sun/calendar")
+async def get_sun_calendar(
+    location: str = Query(..., description="City name"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    days: int = Query(30, ge=1, le=366)
+):
+    """Get sunrise, sunset, solar noon and day length for each upcoming day"""
+    try:
+        calendar = await sun_service.get_sun_calendar(location, lat, lon, days)
+        return {"location": location, "calendar": calendar}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -154,7 +260,7 @@ async def get_outfit_suggestions(location: str = Query(..., description="City na
         outfit_suggestions = await outfit_service.get_outfit_suggestions(weather_data)
         return {"location": location, "weather": weather_data, "suggestions": outfit_suggestions}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/activities")
@@ -187,17 +293,23 @@ async def get_precipitation_forecast(location: str = Query(..., description="Cit
         forecast = await historical_service.get_precipitation_forecast(location, hours)
         return {"location": location, "hours": hours, "forecast": forecast}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/pollen")
-async def get_pollen_data(location: str = Query(..., description="City name")):
+async def get_pollen_data(
+    location: str = Query(..., description="City name"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180)
+):
     """Get pollen count and allergy information"""
     try:
-        pollen_data = await pollen_service.get_pollen_data(location)
+        pollen_data = await pollen_service.get_pollen_data(location, lat, lon)
         return pollen_data
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/pollen/forecast")
@@ -206,8 +318,19 @@ async def get_pollen_forecast(location: str = Query(..., description="City name"
     try:
         forecast = await pollen_service.get_pollen_forecast(location, days)
         return {"location": location, "forecast": forecast}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
+
+
+@router.post("/pollen/batch")
+async def get_pollen_batch(request: BatchLocationsRequest):
+    """Get current pollen levels for many locations in one request"""
+    try:
+        return await pollen_service.get_pollen_batch(request.locations)
+    except Exception as e:
+        raise _http_error(e)
 
 
 @router.get("/hourly")
@@ -217,7 +340,7 @@ async def get_hourly_forecast(location: str = Query(..., description="City name"
         forecast = await detailed_weather_service.get_hourly_forecast(location, hours)
         return {"location": location, "hours": hours, "forecast": forecast}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/wind")
@@ -250,9 +373,25 @@ async def get_visibility_data(location: str = Query(..., description="City name"
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class BatchWeatherRequest(BaseModel):
+    locations: List[str] = Field(..., min_length=1, max_length=settings.batch_max_locations)
+    fields: Optional[List[str]] = None
+
+
+@router.post("/batch")
+async def get_batch_weather(request: BatchWeatherRequest):
+    """Get current weather for many locations in one request"""
+    try:
+        batch = await weather_service.get_current_weather_batch(request.locations, request.fields)
+        return batch
+    except Exception as e:
+        raise _http_error(e)
+
+
 class ComparisonRequest(BaseModel):
-    cities: List[str]
+    cities: List[str] = Field(..., max_length=settings.batch_max_locations)
     preferences: Optional[Dict] = None
+    top_k: Optional[int] = Field(None, ge=1)
 
 
 @router.post("/compare")
@@ -262,7 +401,7 @@ async def compare_cities(request: ComparisonRequest):
         comparison = await comparison_service.compare_cities(request.cities)
         return comparison
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.post("/best-destination")
@@ -272,10 +411,12 @@ async def get_best_destination(request: ComparisonRequest):
         if not request.preferences:
             request.preferences = {"ideal_temperature": 22, "low_humidity": True, "low_wind": True}
         
-        recommendation = await comparison_service.get_best_destination(request.cities, request.preferences)
+        recommendation = await comparison_service.get_best_destination(request.cities, request.preferences, request.top_k)
         return recommendation
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/activities")
@@ -286,19 +427,60 @@ async def get_activity_recommendations(location: str = Query(..., description="C
         activities = await outfit_service.get_activity_recommendations(weather_data)
         return {"location": location, "activities": activities}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 # AI Learning & Intelligence Endpoints
 
 @router.post("/ai/query")
-async def ai_query(query: str, location: str = "London", context: Optional[Dict] = None):
-    """Process intelligent query with AI understanding"""
+async def ai_query(query: str, location: str = "London", context: Optional[Dict] = None,
+                   session_id: Optional[str] = None):
+    """Process intelligent query with AI understanding; pass a session_id from POST /ai/sessions for follow-ups"""
     try:
-        result = await enhanced_nlp_service.process_intelligent_query(query, context)
+        result = await enhanced_nlp_service.process_intelligent_query(query, context, session_id)
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
+
+
+@router.post("/ai/query/stream")
+async def ai_query_stream(query: str, location: str = "London", context: Optional[Dict] = None,
+                          session_id: Optional[str] = None):
+    """Stream an AI answer as Server-Sent Events: "token" events as text arrives, then "done" with the full response"""
+    if session_id:
+        # Checked before the stream starts, while an error can still be a status code
+        try:
+            enhanced_nlp_service.conversations.require(session_id)
+        except UnknownSessionError as e:
+            raise _http_error(e)
+    
+    async def events():
+        async for event, data in enhanced_nlp_service.stream_intelligent_query(query, context, session_id):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    # Caching and proxy buffering would otherwise hold tokens back until the response ends
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/ai/sessions")
+async def open_ai_session():
+    """Start a conversation; pass the returned session_id to /ai/query so follow-ups see earlier turns"""
+    session_id = enhanced_nlp_service.conversations.open()
+    return {"session_id": session_id, "idle_ttl": settings.conversation_idle_ttl}
+
+
+@router.delete("/ai/sessions/{session_id}")
+async def clear_ai_session(session_id: str):
+    """Forget a session's conversation history"""
+    try:
+        enhanced_nlp_service.conversations.clear(session_id)
+    except UnknownSessionError as e:
+        raise _http_error(e)
+    return {"session_id": session_id, "cleared": True}
 
 
 @router.get("/ai/insights")
@@ -309,7 +491,7 @@ async def get_ai_insights(location: str = "London"):
         insights = await enhanced_nlp_service.get_weather_insights(location, weather_data)
         return insights
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/ai/news")
@@ -400,7 +582,7 @@ async def get_personalized_insights(user_id: str, location: str = "London"):
         insights = await ml_prediction_service.get_personalized_insights(user_id, weather_data)
         return {"location": location, "personalized_insights": insights}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.get("/ai/recommendations")
@@ -412,7 +594,7 @@ async def get_ai_recommendations(location: str = "London", user_id: Optional[str
         recommendations = await learning_service.get_ai_recommendations(location, weather_data, user_context)
         return {"location": location, **recommendations}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _http_error(e)
 
 
 @router.post("/ai/feedback")
@@ -488,7 +670,7 @@ async def get_forecast_accuracy():
 
 @router.get("/forecast/extended")
 async def get_extended_forecast(location: str = "London", weeks: int = 4):
-    "`"`"Get extended weather forecast for multiple weeks (2-6 weeks)"`"`"
+    """Get extended weather forecast for multiple weeks (2-6 weeks)"""
     try:
         if weeks < 1 or weeks > 8:
             raise HTTPException(status_code=400, detail="Weeks must be between 1 and 8")
@@ -503,7 +685,7 @@ async def get_extended_forecast(location: str = "London", weeks: int = 4):
 
 @router.get("/forecast/ensemble")
 async def get_ensemble_forecast(location: str = "London", days: int = 30):
-    "`"`"Get ensemble forecast using multiple ML models for improved accuracy"`"`"
+    """Get ensemble forecast using multiple ML models for improved accuracy"""
     try:
         if days < 7 or days > 60:
             raise HTTPException(status_code=400, detail="Days must be between 7 and 60")
@@ -518,7 +700,7 @@ async def get_ensemble_forecast(location: str = "London", days: int = 30):
 
 @router.get("/climate/patterns")
 async def get_climate_patterns(location: str = "London"):
-    "`"`"Analyze climate patterns affecting long-range forecasts"`"`"
+    """Analyze climate patterns affecting long-range forecasts"""
     try:
         from app.services.long_range_forecast_service import LongRangeForecastService
         long_range_service = LongRangeForecastService()
@@ -530,7 +712,7 @@ async def get_climate_patterns(location: str = "London"):
 
 @router.get("/forecast/accuracy")
 async def get_forecast_accuracy():
-    "`"`"Get accuracy metrics for different forecast time ranges"`"`"
+    """Get accuracy metrics for different forecast time ranges"""
     try:
         from app.services.long_range_forecast_service import LongRangeForecastService
         long_range_service = LongRangeForecastService()
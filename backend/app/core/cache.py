@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class CacheEntry:
+    """A cached value with the timestamps needed to judge its freshness"""
+
+    __slots__ = ("value", "stored_at", "expires_at")
+
+    def __init__(self, value: Any, stored_at: float, expires_at: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def age(self) -> float:
+        """Seconds since the value was stored"""
+        return time.monotonic() - self.stored_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    @property
+    def ttl_remaining(self) -> float:
+        """Seconds until expiry (negative once expired)"""
+        return self.expires_at - time.monotonic()
+
+    @property
+    def staleness(self) -> float:
+        """Seconds past expiry (0 while still fresh)"""
+        return max(0.0, time.monotonic() - self.expires_at)
+
+
+class TTLCache:
+    """Bounded in-process LRU cache with a per-entry time-to-live.
+
+    Entries are evicted least-recently-used first once ``max_entries`` is
+    reached. ``get`` treats an entry as missing once older than its TTL;
+    ``lookup`` keeps returning it for a further ``stale_ttl`` seconds so
+    callers can serve stale data while they revalidate.
+    """
+
+    def __init__(self, max_entries: int = 5000, default_ttl: float = 600.0, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry if fresh or within the stale window, else None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.staleness > self.stale_ttl:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if entry.is_fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Inspect an entry without touching LRU order or hit/miss counters"""
+        return self._entries.get(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None or not entry.is_fresh:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full"""
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(value, now, now + ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters for monitoring"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
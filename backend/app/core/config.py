@@ -7,6 +7,16 @@ class Settings(BaseSettings):
     openweather_api_key: str = ""
     openai_api_key: str = ""
     
+    # OpenAI chat completions (base URL empty for api.openai.com; point it at scripts/openai_stub.py locally)
+    openai_model: str = "gpt-4-turbo-preview"
+    openai_base_url: str = ""
+    # The completions client has its own pool: completions run far longer than weather
+    # calls, and long streams must not hold connections the weather upstreams need
+    openai_timeout: float = 60.0  # per read, so a stream only times out if it stalls
+    openai_connect_timeout: float = 5.0
+    openai_max_connections: int = 20
+    openai_max_retries: int = 2
+    
     # Database
     database_url: str = "sqlite+aiosqlite:///./weather.db"
     
@@ -14,6 +24,91 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     
+    # Upstream HTTP client (shared connection pool)
+    http_timeout: float = 10.0
+    http_connect_timeout: float = 3.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_per_host_concurrency: int = 32
+    http2_enabled: bool = True
+    
+    # Upstream rate limits (token buckets)
+    openweather_rate_per_minute: int = 60
+    openweather_rate_burst: int = 10
+    openai_rate_per_minute: int = 60
+    openai_rate_burst: int = 5
+    rate_limit_max_queue_time: float = 5.0
+    
+    # Upstream resilience: circuit breaker, retries, hedging
+    breaker_failure_rate: float = 0.5
+    breaker_min_calls: int = 10
+    breaker_window: int = 20
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_calls: int = 3
+    retry_max_attempts: int = 3
+    retry_backoff_base: float = 0.2
+    retry_budget_ratio: float = 0.2  # retries allowed per request, on average
+    retry_budget_max_tokens: float = 10.0
+    hedge_delay: float = 1.0  # send a hedged request after this many seconds (0 disables)
+    
+    # Weather response cache
+    weather_cache_ttl: int = 600
+    weather_cache_stale_ttl: int = 300  # serve stale while refreshing in the background
+    weather_cache_stale_if_error_ttl: int = 3600  # serve stale when the upstream fails
+    weather_cache_max_entries: int = 5000
+    
+    # Batch weather endpoint
+    batch_max_locations: int = 500
+    batch_concurrency: int = 16
+    
+    # Background prefetch of hot locations
+    prefetch_enabled: bool = True
+    prefetch_interval: int = 60
+    prefetch_lead_time: int = 120  # refresh entries this many seconds before they expire
+    prefetch_top_locations: int = 50
+    prefetch_concurrency: int = 4
+    prefetch_max_per_cycle: int = 100
+    location_access_max_entries: int = 10000  # request counters kept; the least requested are trimmed past this
+    
+    # Location gazetteer (directory compiled by scripts/build_gazetteer.py; empty uses built-in cities)
+    gazetteer_path: str = ""
+    reverse_geocode_max_km: float = 25.0  # farther than this, coordinates resolve to no named place
+    location_key_precision: int = 5  # geohash length of location cache keys (5 = ~5 km cells)
+    
+    # Location-keyed caches for non-weather data
+    air_quality_cache_ttl: int = 1800
+    pollen_cache_ttl: int = 3600
+    sun_cache_ttl: int = 3600
+    
+    # Air-quality and pollen providers: "openweathermap" (mock data without an API key), "stub" or "mock"
+    air_data_provider: str = "openweathermap"
+    air_quality_api_url: str = "https://api.openweathermap.org/data/2.5"
+    pollen_api_url: str = "https://air-quality-api.open-meteo.com/v1"
+    air_data_stub_url: str = "http://127.0.0.1:8765"  # scripts/air_data_stub.py
+    pollen_batch_size: int = 50  # coordinates per pollen request
+    
+    # Sun/moon computation memo: (date, coordinates rounded to this many decimals)
+    astronomy_coordinate_decimals: int = 2
+    astronomy_cache_size: int = 4096
+    
+    # Synthetic weather served without an API key; the same seed reproduces the same weather
+    synthetic_weather_seed: int = 0
+    
+    # LLM response cache: exact prompt matches, then rephrasings above this trigram similarity (0 disables)
+    llm_cache_ttl: int = 3600
+    llm_cache_max_entries: int = 2000
+    llm_cache_similarity: float = 0.8
+    llm_cache_candidates: int = 64  # most recent prompts compared per context bucket
+    
+    # Per-session AI conversation memory: turns kept per session (older ones are summarized),
+    # prompt history budget in tokens, and sessions dropped after this many idle seconds
+    conversation_max_turns: int = 20
+    conversation_max_sessions: int = 10000
+    conversation_idle_ttl: int = 1800
+    conversation_token_budget: int = 1500
+    conversation_summary_chars: int = 600
+    
     # ML Model Settings
     ml_model_path: str = "./models"
     
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+from app.core.config import settings
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (installed via httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamClient:
+    """Process-wide pooled HTTP client shared by every service that calls out.
+
+    One ``httpx.AsyncClient`` keeps connections (and TLS sessions) alive between
+    requests, and a semaphore per upstream host caps how many requests we have
+    in flight against any single provider.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        timeout = httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=settings.http2_enabled and _http2_available()
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Underlying client, created lazily so scripts work outside the app lifespan"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self) -> None:
+        """Open the connection pool (called from the FastAPI lifespan)"""
+        _ = self.client
+
+    async def close(self) -> None:
+        """Close all pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._host_limits.clear()
+        self._in_flight.clear()
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(settings.http_per_host_concurrency)
+        return self._host_limits[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the shared pool, respecting the per-host cap"""
+        host = urlsplit(url).netloc
+        async with self._host_semaphore(host):
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+            try:
+                return await self.client.request(method, url, **kwargs)
+            finally:
+                self._in_flight[host] -= 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def stats(self) -> Dict:
+        """Snapshot of pool configuration and per-host concurrency usage"""
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": settings.http2_enabled and _http2_available(),
+            "max_connections": settings.http_max_connections,
+            "per_host_concurrency": settings.http_per_host_concurrency,
+            "in_flight": dict(self._in_flight)
+        }
+
+
+upstream_client = UpstreamClient()
@@ -0,0 +1,79 @@
+from typing import Dict, Optional
+import httpx
+from app.core.config import settings
+from app.core.http_client import _http2_available
+
+
+class LLMClient:
+    """Process-wide OpenAI client over a connection pool of its own.
+
+    Constructing ``AsyncOpenAI`` per request re-reads configuration and builds
+    a new resource tree each time; holding one keeps that off the request path.
+    The pool is separate from the weather upstreams' so completions get their
+    own timeout, and its connection limit caps concurrent completions without
+    taking connections from weather requests.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self.created = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.openai_api_key)
+
+    def _build_http(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        timeout = httpx.Timeout(settings.openai_timeout, connect=settings.openai_connect_timeout)
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=settings.http2_enabled and _http2_available()
+        )
+
+    @property
+    def client(self):
+        """The shared ``AsyncOpenAI`` client, created lazily so scripts work outside the app lifespan"""
+        if self._client is None or self._http is None or self._http.is_closed:
+            from openai import AsyncOpenAI
+            self._http = self._build_http()
+            self._client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url or None,
+                timeout=httpx.Timeout(settings.openai_timeout, connect=settings.openai_connect_timeout),
+                max_retries=settings.openai_max_retries,
+                http_client=self._http
+            )
+            self.created += 1
+        return self._client
+
+    async def start(self) -> None:
+        """Build the client (called from the FastAPI lifespan)"""
+        if self.configured:
+            _ = self.client
+
+    async def close(self) -> None:
+        """Close the completions pool"""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._client = None
+        self._http = None
+
+    def stats(self) -> Dict:
+        return {
+            "configured": self.configured,
+            "open": self._client is not None,
+            "model": settings.openai_model,
+            "base_url": settings.openai_base_url or "https://api.openai.com/v1",
+            "timeout": settings.openai_timeout,
+            "max_connections": settings.openai_max_connections,
+            "clients_created": self.created
+        }
+
+
+llm_client = LLMClient()
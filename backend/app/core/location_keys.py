@@ -0,0 +1,152 @@
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from app.core.config import settings
+
+# Common alternate spellings and abbreviations mapped to a single cache key
+LOCATION_ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "ny": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "dc": "washington",
+    "washington dc": "washington",
+    "washington d.c.": "washington",
+    "ldn": "london",
+    "london, uk": "london",
+    "london, gb": "london",
+    "paris, fr": "paris",
+    "hk": "hong kong",
+    "bombay": "mumbai",
+    "peking": "beijing",
+    "saigon": "ho chi minh city",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a user-supplied location into a stable cache key.
+
+    Case-folds, trims and collapses whitespace, then resolves known aliases
+    so "  NYC", "new york city" and "New York" all share one entry.
+    """
+    key = _WHITESPACE.sub(" ", location.strip().casefold())
+    return LOCATION_ALIASES.get(key, key)
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat: float, lon: float, precision: int = 5) -> str:
+    """Geohash cell containing a coordinate (precision 5 is ~4.9 x 4.9 km at the equator)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    cell = []
+    bits = 0
+    value = 0
+    even = True
+    while len(cell) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            cell.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(cell)
+
+
+def decode_geohash(cell: str) -> Tuple[float, float]:
+    """Center (lat, lon) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for ch in cell:
+        value = GEOHASH_ALPHABET.index(ch)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+class LocationCanonicalizer:
+    """Maps location names and raw coordinates to one canonical cache key.
+
+    Coordinates map to their geohash cell ("gh:u10hb"), so nearby users share
+    entries. Names are normalized, then resolved to coordinates through the
+    registered resolver (the gazetteer), so "NYC", "New York" and a phone
+    reporting its GPS position in Manhattan all land in the same cell. Names
+    the resolver does not know keep a name key ("name:springfield").
+    """
+
+    def __init__(self, precision: int = 5, max_names: int = 10000):
+        self.precision = precision
+        self.max_names = max_names
+        self.resolver: Optional[Callable[[str], Optional[Tuple[float, float]]]] = None
+        self._resolved: "OrderedDict[str, Optional[Tuple[float, float]]]" = OrderedDict()
+        self.metrics = {"name_keys": 0, "coordinate_keys": 0, "resolved": 0, "unresolved": 0}
+
+    def set_resolver(self, resolver: Callable[[str], Optional[Tuple[float, float]]]) -> None:
+        """Register the name -> (lat, lon) lookup used to place names into cells"""
+        self.resolver = resolver
+        self._resolved.clear()
+
+    def key(self, location: Optional[str] = None, lat: Optional[float] = None,
+            lon: Optional[float] = None, precision: Optional[int] = None) -> str:
+        """Canonical key for coordinates if given, else for the location name"""
+        if lat is not None and lon is not None:
+            self.metrics["coordinate_keys"] += 1
+            return self.cell_key(lat, lon, precision)
+        if location is None:
+            raise ValueError("A location name or coordinates are required")
+
+        self.metrics["name_keys"] += 1
+        name = normalize_location(location)
+        coordinates = self.resolve(name)
+        if coordinates is None:
+            return f"name:{name}"
+        return self.cell_key(*coordinates, precision)
+
+    def cell_key(self, lat: float, lon: float, precision: Optional[int] = None) -> str:
+        return f"gh:{encode_geohash(lat, lon, precision or self.precision)}"
+
+    def resolve(self, name: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a normalized name, memoized (including misses)"""
+        if name in self._resolved:
+            self._resolved.move_to_end(name)
+            return self._resolved[name]
+
+        coordinates = self.resolver(name) if self.resolver is not None else None
+        self.metrics["resolved" if coordinates is not None else "unresolved"] += 1
+        self._resolved[name] = coordinates
+        if len(self._resolved) > self.max_names:
+            self._resolved.popitem(last=False)
+        return coordinates
+
+    @staticmethod
+    def cell_center(key: str) -> Optional[Tuple[float, float]]:
+        """Center of the cell behind a "gh:" key (None for name keys)"""
+        if not key.startswith("gh:"):
+            return None
+        return decode_geohash(key[3:])
+
+    def stats(self) -> Dict:
+        return {"precision": self.precision, "memoized_names": len(self._resolved), **self.metrics}
+
+
+# Shared so every service derives the same key for the same place
+canonical_locations = LocationCanonicalizer(settings.location_key_precision)
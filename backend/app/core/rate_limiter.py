@@ -0,0 +1,150 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional
+from app.core.config import settings
+
+
+class Priority(IntEnum):
+    """Request lanes; lower values are served first"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would wait longer than the queue-time limit"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Rate limit for {upstream} exceeded, retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+# Lane used by rate-limited calls made in the current context (request or task)
+current_priority: ContextVar[Priority] = ContextVar("current_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Run upstream calls in this block (and tasks spawned from it) in a given lane"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class TokenBucket:
+    """Async token bucket with priority lanes and a bounded queue time.
+
+    Tokens refill continuously at ``rate_per_minute`` up to ``burst``. When no
+    token is available callers queue; queued interactive callers are always
+    granted before background ones. A caller that cannot be served within
+    ``max_queue_time`` gets ``RateLimitExceeded`` instead of waiting.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int, max_queue_time: float):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_queue_time = max_queue_time
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.metrics = {
+            "granted": 0,
+            "waited": 0,
+            "rejected": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: Optional[Priority] = None, max_wait: Optional[float] = None) -> None:
+        """Take one token, queueing in the caller's lane if none is available"""
+        priority = current_priority.get() if priority is None else priority
+        max_wait = self.max_queue_time if max_wait is None else max_wait
+
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self.metrics["granted"] += 1
+            return
+
+        # Fail fast when the callers ahead in our lane (or higher) already exceed the budget
+        ahead = sum(1 for w in self._waiters if w[0] <= priority and not w[2].done())
+        estimated_wait = (ahead + 1 - self._tokens) / self.rate
+        if estimated_wait > max_wait:
+            self.metrics["rejected"] += 1
+            raise RateLimitExceeded(self.name, estimated_wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            self.metrics["rejected"] += 1
+            raise RateLimitExceeded(self.name, len(self._waiters) / self.rate)
+
+        waited = time.monotonic() - started
+        self.metrics["granted"] += 1
+        self.metrics["waited"] += 1
+        self.metrics["total_wait_seconds"] += waited
+        self.metrics["max_wait_seconds"] = max(self.metrics["max_wait_seconds"], waited)
+
+    async def _dispatch(self) -> None:
+        """Hand out tokens to queued callers, highest priority first, as they refill"""
+        while self._waiters:
+            self._refill()
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)  # caller timed out or was cancelled
+            if not self._waiters:
+                break
+            if self._tokens >= 1:
+                self._tokens -= 1
+                heapq.heappop(self._waiters)[2].set_result(None)
+                continue
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def stats(self) -> Dict:
+        self._refill()
+        queued = [w for w in self._waiters if not w[2].done()]
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "tokens": round(self._tokens, 2),
+            "queued": {lane.name.lower(): sum(1 for w in queued if w[0] == lane) for lane in Priority},
+            **self.metrics,
+            "total_wait_seconds": round(self.metrics["total_wait_seconds"], 3),
+            "max_wait_seconds": round(self.metrics["max_wait_seconds"], 3)
+        }
+
+
+# One bucket per upstream provider, shared by every service instance
+rate_limiters: Dict[str, TokenBucket] = {
+    "openweathermap": TokenBucket(
+        "openweathermap",
+        rate_per_minute=settings.openweather_rate_per_minute,
+        burst=settings.openweather_rate_burst,
+        max_queue_time=settings.rate_limit_max_queue_time
+    ),
+    "openai": TokenBucket(
+        "openai",
+        rate_per_minute=settings.openai_rate_per_minute,
+        burst=settings.openai_rate_burst,
+        max_queue_time=settings.rate_limit_max_queue_time
+    )
+}
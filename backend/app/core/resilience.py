@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Upstream {name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """True for errors that say the upstream is unhealthy (and are worth retrying).
+
+    Network errors, timeouts, 5xx and 429 count; other 4xx responses (e.g. an
+    unknown city) are the caller's problem and do not.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by the recent failure rate.
+
+    While closed, the outcomes of the last ``window`` calls are tracked; once at
+    least ``min_calls`` have been seen and the failure rate reaches
+    ``failure_rate``, the breaker opens and rejects calls for ``open_seconds``.
+    It then lets ``half_open_calls`` trial calls through: if they all succeed
+    it closes, and any failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_rate: float, min_calls: int, window: int,
+                 open_seconds: float, half_open_calls: int):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = self.CLOSED
+        self._outcomes: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trials_started = 0
+        self._trials_succeeded = 0
+        self.metrics = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0, "ignored": 0}
+
+    def _before_call(self) -> None:
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.metrics["rejected"] += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+            self._trials_started = 0
+            self._trials_succeeded = 0
+
+        if self.state == self.HALF_OPEN:
+            if self._trials_started >= self.half_open_calls:
+                self.metrics["rejected"] += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._trials_started += 1
+
+    def _record(self, failed: bool) -> None:
+        self.metrics["calls"] += 1
+        if failed:
+            self.metrics["failures"] += 1
+
+        if self.state == self.HALF_OPEN:
+            if failed:
+                self._open()
+            else:
+                self._trials_succeeded += 1
+                if self._trials_succeeded >= self.half_open_calls:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+            return
+
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls:
+            if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def _release_trial(self) -> None:
+        """Free a half-open trial slot taken by a call that says nothing about the upstream"""
+        if self.state == self.HALF_OPEN:
+            self._trials_started -= 1
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.metrics["opened"] += 1
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` through the breaker, counting only upstream failures against it.
+
+        Other errors (an unknown city, an exhausted local rate limit) are left
+        out of the window entirely, so bad input neither trips the breaker nor
+        dilutes the failure rate as if it were a success.
+        """
+        self._before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # The caller went away; free the half-open trial slot without judging the upstream
+            self._release_trial()
+            raise
+        except Exception as e:
+            if is_upstream_failure(e):
+                self._record(True)
+            else:
+                self.metrics["ignored"] += 1
+                self._release_trial()
+            raise
+        self._record(False)
+        return result
+
+    def stats(self) -> Dict:
+        recent = len(self._outcomes)
+        return {
+            "state": self.state,
+            "recent_failure_rate": round(sum(self._outcomes) / recent, 3) if recent else 0.0,
+            **self.metrics
+        }
+
+
+class RetryBudget:
+    """Caps retries (and hedges) to a fraction of recent request volume.
+
+    Every request deposits ``ratio`` tokens (up to ``max_tokens``); every retry
+    spends one. During an outage retries therefore stay a bounded share of
+    traffic instead of multiplying the load on a struggling upstream.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self.metrics = {"requests": 0, "retries": 0, "exhausted": 0}
+
+    def record_request(self) -> None:
+        self.metrics["requests"] += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.metrics["retries"] += 1
+            return True
+        self.metrics["exhausted"] += 1
+        return False
+
+    def stats(self) -> Dict:
+        return {"tokens": round(self._tokens, 2), **self.metrics}
+
+
+async def hedged(fn: Callable[[], Awaitable[Any]], delay: float, allow_hedge: Callable[[], bool]) -> Any:
+    """Await ``fn()``; if it is still running after ``delay`` seconds, race a second copy.
+
+    The first successful result wins and the other attempt is cancelled. If
+    both fail, the last error is raised.
+    """
+    first = asyncio.ensure_future(fn())
+    pending = {first}
+    try:
+        if delay <= 0:
+            return await first
+
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done and allow_hedge():
+            pending.add(asyncio.ensure_future(fn()))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
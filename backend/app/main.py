@@ -1,12 +1,47 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import weather, user, features
+from app.api.dependencies import weather_service
 from app.core.config import settings
+from app.core.http_client import upstream_client
+from app.core.llm_client import llm_client
+from app.core.location_keys import canonical_locations
+from app.core.rate_limiter import rate_limiters
+from app.services.air_data_providers import air_data_stats
+from app.services.air_quality_service import air_quality_cache
+from app.services.enhanced_nlp_service import conversation_store, llm_response_cache
+from app.services.pollen_service import pollen_cache
+from app.services.prefetch_service import PrefetchService
+from app.services.sun_service import sun_cache
+from app.services.weather_service import (
+    openweather_breaker,
+    openweather_retry_budget,
+    weather_cache,
+    weather_flights
+)
+
+prefetch_service = PrefetchService(weather_service, features.auth_service.get_all_favorites)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream resources on startup and release them on shutdown"""
+    await upstream_client.start()
+    await llm_client.start()
+    if settings.prefetch_enabled:
+        await prefetch_service.start()
+    yield
+    await prefetch_service.stop()
+    await llm_client.close()
+    await upstream_client.close()
+
 
 app = FastAPI(
     title="AI Weather Assistant API",
     description="Super smart AI-powered weather application API with all 10 advanced features",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -16,6 +51,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Age", "X-Cache", "Server-Timing"],
 )
 
 # Include routers
@@ -47,7 +83,30 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "version": "2.0.0"}
+    return {
+        "status": "degraded" if openweather_breaker.state != openweather_breaker.CLOSED else "healthy",
+        "version": "2.0.0",
+        "upstreams": {
+            "openweathermap": {
+                "circuit": openweather_breaker.stats(),
+                "retry_budget": openweather_retry_budget.stats()
+            },
+            "openai": llm_client.stats()
+        },
+        "weather_cache": weather_cache.stats(),
+        "location_caches": {
+            "air_quality": air_quality_cache.stats(),
+            "pollen": pollen_cache.stats(),
+            "sun": sun_cache.stats()
+        },
+        "location_keys": canonical_locations.stats(),
+        "air_data": air_data_stats(),
+        "upstream_coalescing": weather_flights.stats(),
+        "prefetch": prefetch_service.stats(),
+        "llm_cache": llm_response_cache.stats(),
+        "conversations": conversation_store.stats(),
+        "rate_limits": {name: bucket.stats() for name, bucket in rate_limiters.items()}
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,387 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_client import upstream_client
+from app.core.location_keys import canonical_locations
+from app.core.rate_limiter import TokenBucket, rate_limiters
+from app.core.singleflight import SingleFlight
+from app.services.astronomy import solar_zenith
+from app.services.synthetic_weather import synthetic_weather
+
+# (hourly epoch-second timestamps, {series name: values aligned with them}); gaps are NaN
+HourlySeries = Tuple[np.ndarray, Dict[str, np.ndarray]]
+
+FORECAST_HOURS = 7 * 24
+
+# OpenWeatherMap Air Pollution component names -> aqi_engine pollutant names
+OWM_COMPONENTS = {"pm2_5": "pm25", "pm10": "pm10", "o3": "o3", "no2": "no2", "so2": "so2", "co": "co"}
+
+# Pollen species in grains/m³, as reported by Open-Meteo's air-quality API ("<species>_pollen")
+POLLEN_SPECIES = ("alder", "birch", "olive", "grass", "mugwort", "ragweed")
+
+UNKNOWN_LOCATION = "Unknown location; pass a known place or lat and lon"
+
+# Shared by every service so /air-quality, /pollen and health risks coalesce upstream calls
+air_data_flights = SingleFlight()
+
+
+def parse_air_pollution(payload: Dict) -> HourlySeries:
+    """Hourly pollutant concentrations (µg/m³) from an OpenWeatherMap Air Pollution response"""
+    entries = payload.get("list", [])
+    times = np.array([entry["dt"] for entry in entries], dtype=np.int64)
+    values = {
+        pollutant: np.array([entry.get("components", {}).get(component) for entry in entries], dtype=np.float64)
+        for component, pollutant in OWM_COMPONENTS.items()
+    }
+    return times, values
+
+
+def parse_pollen(payload: Dict) -> HourlySeries:
+    """Hourly pollen counts (grains/m³) from an Open-Meteo air-quality response (timeformat=unixtime)"""
+    hourly = payload.get("hourly", {})
+    times = np.array(hourly.get("time", []), dtype=np.int64)
+    values = {
+        species: np.array(hourly.get(f"{species}_pollen") or [None] * len(times), dtype=np.float64)
+        for species in POLLEN_SPECIES
+    }
+    return times, values
+
+
+class AirDataProvider(ABC):
+    """Source of hourly air-quality and pollen series for coordinates.
+
+    Subclasses implement the single-location fetches. The ``*_many`` variants
+    default to running those concurrently and return one series or exception
+    per coordinate; providers whose upstream takes several coordinates per
+    request override them.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def air_quality(self, lat: Optional[float], lon: Optional[float]) -> HourlySeries:
+        """Hourly pollutant concentrations for the coordinates"""
+
+    @abstractmethod
+    async def pollen(self, lat: Optional[float], lon: Optional[float]) -> HourlySeries:
+        """Hourly pollen counts for the coordinates"""
+
+    async def locate(self, location: str) -> Optional[Tuple[float, float]]:
+        """Coordinates the provider itself assigns to a name the gazetteer does not know (None by default)"""
+        return None
+
+    async def air_quality_many(self, coordinates: Sequence[Tuple]) -> List[Any]:
+        return await asyncio.gather(*(self.air_quality(lat, lon) for lat, lon in coordinates), return_exceptions=True)
+
+    async def pollen_many(self, coordinates: Sequence[Tuple]) -> List[Any]:
+        return await asyncio.gather(*(self.pollen(lat, lon) for lat, lon in coordinates), return_exceptions=True)
+
+
+class HttpAirDataProvider(AirDataProvider):
+    """Air quality from an OpenWeatherMap Air Pollution-style API, pollen from an Open-Meteo-style one.
+
+    Requests go through the shared upstream pool. The stub server in
+    scripts/air_data_stub.py speaks both formats, so pointing the two base
+    URLs at it exercises the same code path without network access.
+    """
+
+    name = "http"
+
+    def __init__(self, air_quality_url: str, pollen_url: str, api_key: str,
+                 rate_limiter: Optional[TokenBucket] = None, name: Optional[str] = None):
+        self.air_quality_url = air_quality_url.rstrip("/")
+        self.pollen_url = pollen_url.rstrip("/")
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.http = upstream_client
+        if name:
+            self.name = name
+
+    async def air_quality(self, lat: Optional[float], lon: Optional[float]) -> HourlySeries:
+        self._require_coordinates(lat, lon)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        response = await self.http.get(
+            f"{self.air_quality_url}/air_pollution/forecast",
+            params={"lat": lat, "lon": lon, "appid": self.api_key}
+        )
+        response.raise_for_status()
+        return parse_air_pollution(response.json())
+
+    async def pollen(self, lat: Optional[float], lon: Optional[float]) -> HourlySeries:
+        return (await self._pollen_request([(lat, lon)]))[0]
+
+    async def pollen_many(self, coordinates: Sequence[Tuple]) -> List[Any]:
+        """One request per ``pollen_batch_size`` coordinates (the API takes comma-separated lists)"""
+        results: List[Any] = [None] * len(coordinates)
+        known = []
+        for i, (lat, lon) in enumerate(coordinates):
+            if lat is None or lon is None:
+                results[i] = ValueError(UNKNOWN_LOCATION)
+            else:
+                known.append(i)
+
+        size = settings.pollen_batch_size
+        chunks = [known[i:i + size] for i in range(0, len(known), size)]
+        outcomes = await asyncio.gather(
+            *(self._pollen_request([coordinates[i] for i in chunk]) for chunk in chunks),
+            return_exceptions=True
+        )
+        for chunk, outcome in zip(chunks, outcomes):
+            for position, i in enumerate(chunk):
+                results[i] = outcome if isinstance(outcome, BaseException) else outcome[position]
+        return results
+
+    async def _pollen_request(self, coordinates: Sequence[Tuple]) -> List[HourlySeries]:
+        for lat, lon in coordinates:
+            self._require_coordinates(lat, lon)
+        response = await self.http.get(
+            f"{self.pollen_url}/air-quality",
+            params={
+                "latitude": ",".join(f"{lat:.4f}" for lat, _ in coordinates),
+                "longitude": ",".join(f"{lon:.4f}" for _, lon in coordinates),
+                "hourly": ",".join(f"{species}_pollen" for species in POLLEN_SPECIES),
+                "forecast_days": FORECAST_HOURS // 24,
+                "timeformat": "unixtime"
+            }
+        )
+        response.raise_for_status()
+        payload = response.json()
+        # A single coordinate comes back as an object, several as a list
+        payloads = payload if isinstance(payload, list) else [payload]
+        if len(payloads) != len(coordinates):
+            raise ValueError(f"Expected {len(coordinates)} pollen results, got {len(payloads)}")
+        return [parse_pollen(item) for item in payloads]
+
+    @staticmethod
+    def _require_coordinates(lat: Optional[float], lon: Optional[float]) -> None:
+        if lat is None or lon is None:
+            raise ValueError(UNKNOWN_LOCATION)
+
+
+class MockAirDataProvider(AirDataProvider):
+    """Series derived from the synthetic weather engine, for running without an API key.
+
+    Deterministic per place and hour, and consistent with the mock weather:
+    calm air traps traffic pollution, rain washes particles out, ozone follows
+    sunshine and heat, and pollen follows each species' season, warmth and
+    dry weather.
+    """
+
+    name = "mock"
+
+    # (peak day of year in the northern hemisphere, season width in days, peak grains/m³)
+    POLLEN_SEASONS = {
+        "alder": (60, 20, 150), "birch": (110, 15, 400), "olive": (140, 15, 200),
+        "grass": (170, 30, 60), "mugwort": (220, 15, 40), "ragweed": (245, 15, 80)
+    }
+
+    async def air_quality(self, lat: Optional[float], lon: Optional[float]) -> HourlySeries:
+        times, weather, local_hour = self._weather(lat, lon)
+        hours = times / 3600.0
+        # Traffic peaks morning and evening; wind disperses it and precipitation washes particles out
+        traffic = 1 + 0.4 * np.cos((local_hour - 8) * np.pi / 6) ** 2
+        ventilation = 2.0 / (1 + weather["wind_speed"] / 2.5)
+        washout = np.exp(-0.5 * (weather["rain"] + weather["snow"]))
+        regime = 1 + 0.6 * synthetic_weather.noise(None, 0, hours, 24 * 20, lat, lon)
+        sunlight = np.clip(np.cos(np.radians(solar_zenith(times, lat, lon))), 0, 1) * (1 - weather["clouds"] / 150)
+
+        pm25 = 12 * regime * traffic * ventilation * washout
+        return times, {
+            "pm25": pm25,
+            "pm10": 1.9 * pm25 + 6 * washout,
+            "o3": np.clip(40 + 3 * (weather["temp"] - 15), 10, None) * (0.4 + sunlight),
+            "no2": 25 * regime * traffic * ventilation,
+            "so2": 5 * (1 + 0.5 * synthetic_weather.noise(None, 1, hours, 24 * 10, lat, lon)) * ventilation,
+            "co": 350 * regime * traffic * ventilation
+        }
+
+    async def pollen(self, lat: Optional[float], lon: Optional[float]) -> HourlySeries:
+        times, weather, local_hour = self._weather(lat, lon)
+        hours = times / 3600.0
+        day_of_year = (times % 31557600) / 86400.0
+        # Plants release pollen on warm, dry days, most around midday
+        release = (
+            np.clip((weather["temp"] - 8) / 12, 0, 1)
+            * (1 - 0.9 * np.clip(weather["rain"] + weather["snow"], 0, 1))
+            * (0.3 + np.clip(np.sin((local_hour - 5) * np.pi / 14), 0, None))
+        )
+
+        values = {}
+        for channel, (species, (peak, width, top)) in enumerate(self.POLLEN_SEASONS.items(), start=2):
+            if lat < 0:
+                peak = (peak + 182) % 365
+            distance = (day_of_year - peak + 182.5) % 365 - 182.5
+            season = np.exp(-0.5 * (distance / width) ** 2)
+            variability = np.exp(0.5 * synthetic_weather.noise(None, channel, hours, 36, lat, lon))
+            values[species] = top * season * release * variability
+        return times, values
+
+    async def locate(self, location: str) -> Optional[Tuple[float, float]]:
+        """The synthetic weather's pseudo-coordinates, so every name the mock weather serves is served here too"""
+        _, lat, lon = synthetic_weather.location_seed(location)
+        return lat, lon
+
+    @staticmethod
+    def _weather(lat: Optional[float], lon: Optional[float]) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+        if lat is None or lon is None:
+            raise ValueError(UNKNOWN_LOCATION)
+        start = int(time.time()) // 86400 * 86400
+        weather = synthetic_weather.hours(None, start, FORECAST_HOURS, lat=lat, lon=lon)
+        local_hour = (weather["time"] / 3600.0 + lon / 15.0) % 24
+        return weather["time"], weather, local_hour
+
+
+def build_air_data_provider() -> AirDataProvider:
+    """Provider selected by ``air_data_provider``; OpenWeatherMap without an API key falls back to mock data"""
+    if settings.air_data_provider == "stub":
+        return HttpAirDataProvider(settings.air_data_stub_url, settings.air_data_stub_url, "stub", name="stub")
+    if settings.air_data_provider == "openweathermap" and settings.openweather_api_key:
+        return HttpAirDataProvider(
+            settings.air_quality_api_url,
+            settings.pollen_api_url,
+            settings.openweather_api_key,
+            rate_limiters["openweathermap"],
+            name="openweathermap"
+        )
+    return MockAirDataProvider()
+
+
+air_data_provider = build_air_data_provider()
+
+
+def locator(provider: AirDataProvider, weather_service=None) -> Callable[[str], Awaitable[Optional[Tuple[float, float]]]]:
+    """``HourlySeriesCache.locate`` for a service: the provider's own placement, else the forecast's coordinates"""
+    async def locate(location: str) -> Optional[Tuple[float, float]]:
+        coordinates = await provider.locate(location)
+        if coordinates is None and weather_service is not None:
+            coordinates = await weather_service.get_coordinates(location)
+        return coordinates
+    return locate
+
+
+class HourlySeriesCache:
+    """Provider series per canonical location, fetched at most once per location and hour.
+
+    Entries are keyed by (kind, canonical key, hour): every spelling and nearby
+    coordinate of a place shares one upstream call, and concurrent misses for
+    a key share one in-flight fetch. ``prepare`` turns a raw series into the
+    cached value, so derived data (AQI, pollen indices) is computed once too.
+    Names without a gazetteer cell are placed with ``locate`` (e.g. the
+    forecast's coordinates); the provider rejects those it cannot place.
+    """
+
+    def __init__(self, kind: str, cache: TTLCache, fetch: Callable, fetch_many: Callable,
+                 prepare: Callable[[HourlySeries], Any],
+                 locate: Optional[Callable[[str], Awaitable[Optional[Tuple[float, float]]]]] = None):
+        self.kind = kind
+        self.cache = cache
+        self.fetch = fetch
+        self.fetch_many = fetch_many
+        self.prepare = prepare
+        self.locate = locate
+        self.flights = air_data_flights
+
+    def _key(self, cell: str) -> Tuple:
+        return (self.kind, cell, int(time.time()) // 3600)
+
+    async def get(self, location: Optional[str] = None, lat: Optional[float] = None,
+                  lon: Optional[float] = None) -> Any:
+        cell = canonical_locations.key(location, lat, lon)
+        key = self._key(cell)
+        value = self.cache.get(key)
+        if value is None:
+            value = await self.flights.do(key, lambda: self._fetch_and_store(key, cell, location))
+        return value
+
+    async def get_many(self, locations: Sequence[str]) -> Dict[str, Any]:
+        """Prepared value (or the exception raised fetching it) per canonical key.
+
+        Cache hits are answered directly; the remaining cells are fetched with
+        one call to the provider's batch method, and joined through the
+        single-flight so concurrent single lookups for those cells wait on it.
+        """
+        names: Dict[str, str] = {}
+        for location in locations:
+            names.setdefault(canonical_locations.key(location), location)
+        cells = list(names)
+        results: Dict[str, Any] = {}
+        misses = []
+        for cell in cells:
+            value = self.cache.get(self._key(cell))
+            if value is None:
+                misses.append(cell)
+            else:
+                results[cell] = value
+        if not misses:
+            return results
+
+        to_fetch = [cell for cell in misses if not self.flights.is_in_flight(self._key(cell))]
+        batch = asyncio.ensure_future(self._fetch_many_and_store(to_fetch, names)) if to_fetch else None
+
+        async def from_batch(cell: str) -> Any:
+            if batch is None or cell not in to_fetch:
+                # Its fetch finished between the check and joining; fetch on our own
+                return await self._fetch_and_store(self._key(cell), cell, names[cell])
+            outcome = (await asyncio.shield(batch))[cell]
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+
+        # Cells already in flight join that fetch; the batch result for them is simply not used
+        outcomes = await asyncio.gather(
+            *(self.flights.do(self._key(cell), lambda cell=cell: from_batch(cell)) for cell in misses),
+            return_exceptions=True
+        )
+        results.update(zip(misses, outcomes))
+        return results
+
+    async def _coordinates(self, cell: str, location: Optional[str]) -> Tuple:
+        """The cell center, else ``locate``'s position for the name, else (None, None)"""
+        center = canonical_locations.cell_center(cell)
+        if center is None and location is not None and self.locate is not None:
+            center = await self.locate(location)
+        return center or (None, None)
+
+    async def _fetch_and_store(self, key: Tuple, cell: str, location: Optional[str] = None) -> Any:
+        lat, lon = await self._coordinates(cell, location)
+        value = self.prepare(await self.fetch(lat, lon))
+        self.cache.set(key, value)
+        return value
+
+    async def _fetch_many_and_store(self, cells: List[str], names: Dict[str, str]) -> Dict[str, Any]:
+        coordinates = await asyncio.gather(*(self._coordinates(cell, names.get(cell)) for cell in cells))
+        outcomes = await self.fetch_many(coordinates)
+        results = {}
+        for cell, outcome in zip(cells, outcomes):
+            if not isinstance(outcome, BaseException):
+                try:
+                    outcome = self.prepare(outcome)
+                    self.cache.set(self._key(cell), outcome)
+                except Exception as e:
+                    outcome = e
+            results[cell] = outcome
+        return results
+
+
+def batch_response(locations: Sequence[str], by_cell: Dict[str, Any], render: Callable[[str, Any], Dict]) -> Dict:
+    """Per-location results and errors for a batch, in the shape of the weather /batch endpoint"""
+    results = {}
+    errors = {}
+    for location in locations:
+        outcome = by_cell[canonical_locations.key(location)]
+        try:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            results[location] = render(location, outcome)
+        except Exception as e:
+            errors[location] = str(e) or type(e).__name__
+    return {"count": len(locations), "unique_locations": len(by_cell), "results": results, "errors": errors}
+
+
+def air_data_stats() -> Dict:
+    return {"provider": air_data_provider.name, **air_data_flights.stats()}
@@ -1,66 +1,119 @@
-from typing import List, Dict
-from datetime import datetime, timedelta
-import random
+from typing import List, Dict, Optional, Sequence
+from datetime import datetime, timezone
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.cache import TTLCache
+from app.services.air_data_providers import (
+    AirDataProvider,
+    HourlySeries,
+    HourlySeriesCache,
+    air_data_provider,
+    batch_response,
+    locator
+)
+from app.services.aqi_engine import POLLUTANTS, aqi_category, compute_aqi
+
+# Keyed by canonical location and hour, so every spelling and nearby coordinate shares an entry
+air_quality_cache = TTLCache(max_entries=settings.weather_cache_max_entries, default_ttl=settings.air_quality_cache_ttl)
 
 
 class AirQualityService:
     """Service for air quality index data"""
     
-    async def get_air_quality(self, location: str) -> Dict:
+    def __init__(self, provider: Optional[AirDataProvider] = None, weather_service=None):
+        provider = provider or air_data_provider
+        # Names the gazetteer does not know are placed by the provider (mock data) or where their forecast is
+        locate = locator(provider, weather_service)
+        self.cache = air_quality_cache
+        self.series = HourlySeriesCache(
+            "air_quality", air_quality_cache, provider.air_quality, provider.air_quality_many, self._with_aqi, locate
+        )
+    
+    async def get_air_quality(self, location: str, lat: Optional[float] = None, lon: Optional[float] = None) -> Dict:
         """Get current air quality index for location"""
-        # Mock data - replace with real AQI API like OpenWeatherMap Air Pollution API
-        aqi_value = random.randint(20, 150)
+        return self._current(location, await self.series.get(location, lat, lon))
+    
+    async def get_current_aqi(self, location: str) -> Optional[int]:
+        """Current AQI alone, from the same cached series as /air-quality"""
+        hourly = await self.series.get(location)
+        aqi = hourly["aqi"][self._current_hour(hourly)]
+        return None if np.isnan(aqi) else int(aqi)
+    
+    async def get_air_quality_batch(self, locations: Sequence[str]) -> Dict:
+        """Current air quality for many locations, one upstream fetch per uncached place"""
+        by_cell = await self.series.get_many(locations)
+        return batch_response(locations, by_cell, self._current)
+    
+    async def get_air_quality_forecast(self, location: str, days: int = 3) -> List[Dict]:
+        """Get air quality forecast for upcoming days"""
+        hourly = await self.series.get(location)
         
-        # Determine AQI category
-        if aqi_value <= 50:
-            category = "Good"
-            color = "green"
-            description = "Air quality is satisfactory, and air pollution poses little or no risk."
-        elif aqi_value <= 100:
-            category = "Moderate"
-            color = "yellow"
-            description = "Air quality is acceptable. However, there may be a risk for some people."
-        elif aqi_value <= 150:
-            category = "Unhealthy for Sensitive Groups"
-            color = "orange"
-            description = "Members of sensitive groups may experience health effects."
-        elif aqi_value <= 200:
-            category = "Unhealthy"
-            color = "red"
-            description = "Everyone may begin to experience health effects."
-        else:
-            category = "Very Unhealthy"
-            color = "purple"
-            description = "Health alert: everyone may experience more serious health effects."
+        # Daily AQI is the worst hour of the (UTC) day; hours without readings never win
+        aqi = np.nan_to_num(hourly["aqi"], nan=-1)
+        day_index = hourly["time"] // 86400
+        days_present, starts = np.unique(day_index, return_index=True)
+        daily_max = np.maximum.reduceat(aqi, starts)
+        worst_hour = np.array([
+            start + int(np.argmax(aqi[start:end]))
+            for start, end in zip(starts, list(starts[1:]) + [len(day_index)])
+        ])
+        
+        forecast = []
+        for i, day in enumerate(days_present.tolist()):
+            if daily_max[i] < 0:
+                continue
+            forecast.append({
+                "date": datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%d"),
+                "aqi": int(daily_max[i]),
+                "category": aqi_category(daily_max[i])[0],
+                "dominant_pollutant": str(hourly["dominant"][worst_hour[i]])
+            })
+        
+        return forecast[:days]
+    
+    def _current(self, location: str, hourly: Dict) -> Dict:
+        now = self._current_hour(hourly)
+        if np.isnan(hourly["aqi"][now]):
+            raise ValueError(f"No air quality readings for '{location}'")
+        aqi = int(hourly["aqi"][now])
+        category, color, description = aqi_category(aqi)
         
         return {
             "location": location,
-            "aqi": aqi_value,
+            "aqi": aqi,
             "category": category,
             "color": color,
             "description": description,
-            "pollutants": {
-                "pm25": random.randint(10, 80),
-                "pm10": random.randint(20, 100),
-                "o3": random.randint(30, 120),
-                "no2": random.randint(10, 60),
-                "so2": random.randint(5, 40),
-                "co": random.randint(100, 500)
-            },
-            "timestamp": datetime.now().isoformat()
+            "dominant_pollutant": str(hourly["dominant"][now]),
+            "pollutants": {p: _rounded(hourly["concentrations"][p][now], 1) for p in POLLUTANTS},
+            "sub_indices": {p: _rounded(hourly["sub_indices"][p][now]) for p in POLLUTANTS},
+            "timestamp": datetime.fromtimestamp(int(hourly["time"][now]), timezone.utc).isoformat()
         }
     
-    async def get_air_quality_forecast(self, location: str, days: int = 3) -> List[Dict]:
-        """Get air quality forecast for upcoming days"""
-        forecast = []
-        for i in range(days):
-            date = datetime.now() + timedelta(days=i)
-            aqi_value = random.randint(30, 120)
-            
-            forecast.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "aqi": aqi_value,
-                "category": "Good" if aqi_value <= 50 else "Moderate" if aqi_value <= 100 else "Unhealthy"
-            })
-        
-        return forecast
+    @staticmethod
+    def _current_hour(hourly: Dict) -> int:
+        if len(hourly["time"]) == 0:
+            raise ValueError("Provider returned no air quality readings")
+        return int(np.clip(np.searchsorted(hourly["time"], time.time(), side="right") - 1, 0, len(hourly["time"]) - 1))
+    
+    @staticmethod
+    def _with_aqi(series: HourlySeries) -> Dict:
+        """Hourly concentrations plus their AQI, computed once per fetch"""
+        times, concentrations = series
+        result = compute_aqi(concentrations)
+        return {
+            "time": times,
+            "concentrations": concentrations,
+            "aqi": result["aqi"],
+            "dominant": result["dominant"],
+            "sub_indices": result["sub_indices"]
+        }
+
+
+def _rounded(value: float, decimals: Optional[int] = None):
+    """JSON-safe number: None for missing readings"""
+    if np.isnan(value):
+        return None
+    return round(float(value), decimals) if decimals else int(value)
+
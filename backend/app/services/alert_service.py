@@ -1,39 +1,57 @@
 from typing import List, Dict
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+import numpy as np
+from app.services.weather_service import WeatherService
+
+# (type, severity, title, description, field, comparison, threshold) checked against the next 24 hours
+ALERT_RULES = (
+    ("severe_weather", "warning", "Heavy Rain Warning",
+     "Heavy rain expected. Watch for flooding and allow extra travel time", "precipitation", ">=", 4.0),
+    ("wind", "advisory", "Wind Advisory",
+     "Strong winds expected. Secure loose objects outdoors", "wind_speed", ">=", 14.0),
+    ("temperature", "advisory", "Heat Advisory",
+     "High temperatures expected. Stay hydrated and avoid prolonged sun exposure", "temp", ">=", 32.0),
+    ("temperature", "advisory", "Frost Advisory",
+     "Freezing temperatures expected. Protect plants and watch for ice", "temp", "<=", 0.0),
+    ("visibility", "advisory", "Dense Fog Advisory",
+     "Visibility below 1 km. Drive slowly and use low-beam headlights", "visibility", "<", 1000.0),
+)
 
 
 class AlertService:
     """Service for weather alerts and notifications"""
     
+    def __init__(self, weather_service=None):
+        self.weather_service = weather_service or WeatherService()
+    
     async def get_alerts(self, location: str) -> List[Dict]:
-        """Get active weather alerts for a location"""
-        # Mock alerts - replace with real weather alert API
-        alerts = []
+        """Get active weather alerts for a location from its cached forecast"""
+        parsed = await self.weather_service.get_parsed_forecast(location)
+        series = parsed.hourly(24)
         
-        # Simulate different alert types
-        alert_types = [
-            {
-                "type": "severe_weather",
-                "severity": "warning",
-                "title": "Thunderstorm Warning",
-                "description": "Severe thunderstorms expected with heavy rain and strong winds",
-                "start_time": datetime.now().isoformat(),
-                "end_time": (datetime.now() + timedelta(hours=3)).isoformat(),
-            },
-            {
-                "type": "temperature",
-                "severity": "advisory",
-                "title": "Heat Advisory",
-                "description": "High temperatures expected. Stay hydrated and avoid prolonged sun exposure",
-                "start_time": datetime.now().isoformat(),
-                "end_time": (datetime.now() + timedelta(hours=8)).isoformat(),
-            }
-        ]
-        
-        # Randomly return alerts for demo
-        if random.random() > 0.7:
-            alerts.append(random.choice(alert_types))
+        alerts = []
+        for alert_type, severity, title, description, field, comparison, threshold in ALERT_RULES:
+            values = series[field]
+            if comparison == ">=":
+                active = values >= threshold
+            elif comparison == "<=":
+                active = values <= threshold
+            else:
+                active = values < threshold
+            if not active.any():
+                continue
+            
+            # The first spell of the condition
+            start = int(np.argmax(active))
+            end = start + (int(np.argmin(active[start:])) or len(active) - start)
+            alerts.append({
+                "type": alert_type,
+                "severity": severity,
+                "title": title,
+                "description": description,
+                "start_time": parsed.local_time(series["time"][start]).isoformat(),
+                "end_time": parsed.local_time(series["time"][start] + 3600 * (end - start)).isoformat(),
+            })
         
         return alerts
     
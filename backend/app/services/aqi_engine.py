@@ -0,0 +1,141 @@
+from typing import Dict, Mapping, Tuple
+import numpy as np
+
+POLLUTANTS = ("pm25", "pm10", "o3", "no2", "so2", "co")
+
+# EPA breakpoint tables: (concentration low, concentration high, index low, index high).
+# Units are the EPA's: µg/m³ for particles, ppb for O3/NO2/SO2, ppm for CO. The
+# PM2.5 table is the 2024 revision; O3 uses the 8-hour table, which ends at 200 ppb
+# (AQI 300), together with the 1-hour table in ONE_HOUR_BREAKPOINTS.
+BREAKPOINTS = {
+    "pm25": [(0.0, 9.0, 0, 50), (9.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+             (55.5, 125.4, 151, 200), (125.5, 225.4, 201, 300), (225.5, 325.4, 301, 500)],
+    "pm10": [(0, 54, 0, 50), (55, 154, 51, 100), (155, 254, 101, 150),
+             (255, 354, 151, 200), (355, 424, 201, 300), (425, 604, 301, 500)],
+    "o3": [(0, 54, 0, 50), (55, 70, 51, 100), (71, 85, 101, 150),
+           (86, 105, 151, 200), (106, 200, 201, 300)],
+    "no2": [(0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150),
+            (361, 649, 151, 200), (650, 1249, 201, 300), (1250, 2049, 301, 500)],
+    "so2": [(0, 35, 0, 50), (36, 75, 51, 100), (76, 185, 101, 150),
+            (186, 304, 151, 200), (305, 604, 201, 300), (605, 1004, 301, 500)],
+    "co": [(0.0, 4.4, 0, 50), (4.5, 9.4, 51, 100), (9.5, 12.4, 101, 150),
+           (12.5, 15.4, 151, 200), (15.5, 30.4, 201, 300), (30.5, 50.4, 301, 500)],
+}
+
+# EPA 1-hour O3 table, defined from 125 ppb. Where both O3 tables apply the higher
+# index is used, and above 200 ppb only the 1-hour table does (it alone reaches 301-500).
+ONE_HOUR_BREAKPOINTS = {
+    "o3": [(125, 164, 101, 150), (165, 204, 151, 200), (205, 404, 201, 300), (405, 604, 301, 500)],
+}
+
+# Decimal places concentrations are truncated to before lookup (per the EPA's guidance)
+TRUNCATION = {"pm25": 1, "pm10": 0, "o3": 0, "no2": 0, "so2": 0, "co": 1}
+
+# µg/m³ -> EPA units at 25°C and 1 atm: ppb = µg/m³ * 24.45 / molar mass (ppm for CO)
+UNIT_CONVERSION = {
+    "pm25": 1.0,
+    "pm10": 1.0,
+    "o3": 24.45 / 48.00,
+    "no2": 24.45 / 46.01,
+    "so2": 24.45 / 64.07,
+    "co": 24.45 / 28.01 / 1000,
+}
+
+# (upper AQI, category, color, description)
+CATEGORIES = (
+    (50, "Good", "green", "Air quality is satisfactory, and air pollution poses little or no risk."),
+    (100, "Moderate", "yellow", "Air quality is acceptable. However, there may be a risk for some people."),
+    (150, "Unhealthy for Sensitive Groups", "orange", "Members of sensitive groups may experience health effects."),
+    (200, "Unhealthy", "red", "Everyone may begin to experience health effects."),
+    (300, "Very Unhealthy", "purple", "Health alert: everyone may experience more serious health effects."),
+    (500, "Hazardous", "maroon", "Health warning of emergency conditions: everyone is more likely to be affected."),
+)
+CATEGORY_UPPER = np.array([upper for upper, _, _, _ in CATEGORIES])
+
+
+def _linear_segments(rows) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Segment starts plus slope/intercept so that index = slope * c + intercept.
+
+    A final flat segment just above the table caps the index at 500.
+    """
+    c_low, c_high, i_low, i_high = (np.array(column, dtype=np.float64) for column in zip(*rows))
+    slope = (i_high - i_low) / (c_high - c_low)
+    intercept = i_low - slope * c_low
+    return (
+        np.append(c_low, np.nextafter(c_high[-1], np.inf)),
+        np.append(slope, 0.0),
+        np.append(intercept, 500.0)
+    )
+
+
+_SEGMENTS = {pollutant: _linear_segments(rows) for pollutant, rows in BREAKPOINTS.items()}
+_ONE_HOUR_SEGMENTS = {pollutant: _linear_segments(rows) for pollutant, rows in ONE_HOUR_BREAKPOINTS.items()}
+
+
+def _interpolate(segments: Tuple[np.ndarray, np.ndarray, np.ndarray], values: np.ndarray) -> np.ndarray:
+    starts, slope, intercept = segments
+    segment = np.searchsorted(starts, values, side="right")
+    segment -= 1
+    np.clip(segment, 0, None, out=segment)
+    index = slope[segment]
+    index *= values
+    index += intercept[segment]
+    return index
+
+
+def sub_index(pollutant: str, concentrations, convert: bool = True) -> np.ndarray:
+    """AQI sub-index for one pollutant over an array of concentrations.
+
+    Concentrations are µg/m³ (as OpenWeatherMap reports them) unless
+    ``convert`` is False, in which case they are already in EPA units.
+    Values above the table are capped at 500; missing or negative ones are NaN.
+    """
+    values = np.array(concentrations, dtype=np.float64)
+    scale = 10.0 ** TRUNCATION[pollutant]
+    values *= (UNIT_CONVERSION[pollutant] if convert else 1.0) * scale
+    values += 1e-9
+    np.floor(values, out=values)
+    values /= scale
+
+    index = _interpolate(_SEGMENTS[pollutant], values)
+    if pollutant in ONE_HOUR_BREAKPOINTS:
+        rows = ONE_HOUR_BREAKPOINTS[pollutant]
+        index[values > BREAKPOINTS[pollutant][-1][1]] = np.nan
+        one_hour = _interpolate(_ONE_HOUR_SEGMENTS[pollutant], values)
+        one_hour[values < rows[0][0]] = np.nan
+        index = np.fmax(index, one_hour)
+    np.round(index, out=index)
+    index[values < 0] = np.nan  # NaN input stays NaN through the arithmetic
+    return index
+
+
+def compute_aqi(concentrations: Mapping[str, np.ndarray], convert: bool = True) -> Dict[str, np.ndarray]:
+    """Overall AQI for many readings at once.
+
+    ``concentrations`` maps pollutant names to arrays of the same shape (any
+    subset of POLLUTANTS). The AQI is the highest sub-index; the pollutant
+    that produced it is reported as dominant.
+    """
+    present = [p for p in POLLUTANTS if p in concentrations]
+    sub_indices = {p: sub_index(p, concentrations[p], convert) for p in present}
+
+    # Running max instead of stacking: NaN sub-indices never win a comparison
+    aqi = np.full(sub_indices[present[0]].shape, np.nan)
+    dominant = np.zeros(aqi.shape, dtype=np.intp)
+    for position, pollutant in enumerate(present):
+        higher = sub_indices[pollutant] > aqi
+        higher |= np.isnan(aqi) & ~np.isnan(sub_indices[pollutant])
+        aqi[higher] = sub_indices[pollutant][higher]
+        dominant[higher] = position
+    return {
+        "aqi": aqi,
+        "dominant": np.array(present)[dominant],
+        "category": np.searchsorted(CATEGORY_UPPER, np.fmin(aqi, 500), side="left"),
+        "sub_indices": sub_indices
+    }
+
+
+def aqi_category(aqi: float) -> Tuple[str, str, str]:
+    """(category, color, description) for an AQI value"""
+    _, category, color, description = CATEGORIES[int(np.searchsorted(CATEGORY_UPPER, min(aqi, 500), side="left"))]
+    return category, color, description
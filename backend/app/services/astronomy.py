@@ -0,0 +1,151 @@
+from typing import Dict, Optional
+from datetime import date, datetime, timezone
+from functools import lru_cache
+import numpy as np
+from app.core.config import settings
+
+# Sun's center 0.833° below the horizon: refraction plus the solar disc's radius
+SUNRISE_ZENITH = np.radians(90.833)
+SYNODIC_MONTH = 29.530588853
+
+MOON_PHASES = (
+    "New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous",
+    "Full Moon", "Waning Gibbous", "Last Quarter", "Waning Crescent"
+)
+MOON_EMOJI = "🌑🌒🌓🌔🌕🌖🌗🌘"
+
+_J2000 = np.datetime64("2000-01-01T12:00:00", "s")
+
+
+def _as_seconds(times) -> np.ndarray:
+    return np.asarray(times, dtype="datetime64[s]")
+
+
+def solar_geometry(times) -> tuple:
+    """Solar declination (radians) and equation of time (minutes) at UTC instants.
+
+    NOAA's Fourier-series approximation, accurate to about a minute of time.
+    """
+    times = _as_seconds(times)
+    years = times.astype("datetime64[Y]")
+    year_start = years.astype("datetime64[s]")
+    year_days = ((years + 1).astype("datetime64[D]") - years.astype("datetime64[D]")).astype(np.float64)
+    elapsed_days = (times - year_start).astype(np.float64) / 86400.0
+    # Fractional year in radians, measured from noon on January 1st
+    gamma = 2 * np.pi / year_days * (elapsed_days - 0.5)
+
+    equation_of_time = 229.18 * (
+        0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma)
+    )
+    declination = (
+        0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma)
+    )
+    return declination, equation_of_time
+
+
+def solar_zenith(times, lat, lon) -> np.ndarray:
+    """Solar zenith angle in degrees for UTC instants, broadcast over lat/lon arrays"""
+    times = _as_seconds(times)
+    declination, equation_of_time = solar_geometry(times)
+    minutes_utc = (times - times.astype("datetime64[D]")).astype(np.float64) / 60.0
+    true_solar_minutes = minutes_utc + equation_of_time + 4 * np.asarray(lon, dtype=np.float64)
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_zenith = np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.cos(hour_angle)
+    return np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+
+
+def sun_times(dates, lat, lon) -> Dict[str, np.ndarray]:
+    """Solar noon, sunrise, sunset and day length for arrays of dates and coordinates.
+
+    Each date is the day whose local solar noon falls on it. ``dates`` (datetime64[D] or anything convertible), ``lat`` and ``lon``
+    broadcast against each other, so a (days,) date vector with (cities, 1)
+    coordinates yields a (cities, days) calendar in one pass. Times are UTC
+    ``datetime64[s]``; sunrise and sunset are NaT during polar day or night,
+    which ``polar`` reports as +1 (sun never sets) or -1 (never rises).
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    days, lat, lon = np.broadcast_arrays(days, lat, lon)
+
+    # Evaluate the sun's geometry at the approximate local solar noon
+    approx_noon = days.astype("datetime64[s]") + ((720 - 4 * lon) * 60).astype("timedelta64[s]")
+    declination, equation_of_time = solar_geometry(approx_noon)
+
+    phi = np.radians(lat)
+    cos_hour_angle = (
+        np.cos(SUNRISE_ZENITH) / (np.cos(phi) * np.cos(declination)) - np.tan(phi) * np.tan(declination)
+    )
+    polar = np.where(cos_hour_angle < -1, 1, np.where(cos_hour_angle > 1, -1, 0))
+    half_day = np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1)))  # degrees of hour angle
+
+    noon_minutes = 720 - 4 * lon - equation_of_time
+    start = days.astype("datetime64[s]")
+    to_time = lambda minutes: start + np.round(minutes * 60).astype("timedelta64[s]")
+    never = np.datetime64("NaT", "s")
+    sunrise = np.where(polar != 0, never, to_time(noon_minutes - 4 * half_day))
+    sunset = np.where(polar != 0, never, to_time(noon_minutes + 4 * half_day))
+
+    return {
+        "solar_noon": to_time(noon_minutes),
+        "sunrise": sunrise,
+        "sunset": sunset,
+        "day_length": 8 * half_day * 60,  # seconds; 86400 in polar day, 0 in polar night
+        "polar": polar
+    }
+
+
+def moon_phase(times) -> Dict[str, np.ndarray]:
+    """Moon phase for UTC instants.
+
+    Uses the Moon's mean elongation corrected by its largest periodic terms
+    (Meeus, ch. 48), good to about 0.01 in illuminated fraction.
+    ``phase`` runs 0 -> 1 from new moon through full (0.5) and back.
+    """
+    days = (_as_seconds(times) - _J2000).astype(np.float64) / 86400.0
+    centuries = days / 36525.0
+    elongation = np.radians(297.8501921 + 445267.1114034 * centuries)
+    sun_anomaly = np.radians(357.5291092 + 35999.0502909 * centuries)
+    moon_anomaly = np.radians(134.9633964 + 477198.8675055 * centuries)
+
+    corrected = np.degrees(elongation) + (
+        6.289 * np.sin(moon_anomaly) - 2.100 * np.sin(sun_anomaly)
+        + 1.274 * np.sin(2 * elongation - moon_anomaly) + 0.658 * np.sin(2 * elongation)
+        + 0.214 * np.sin(2 * moon_anomaly) + 0.110 * np.sin(elongation)
+    )
+    phase = np.mod(corrected, 360.0) / 360.0
+    return {
+        "phase": phase,
+        "age_days": phase * SYNODIC_MONTH,
+        "illumination": (1 - np.cos(2 * np.pi * phase)) / 2,
+        "phase_index": np.mod(np.floor(phase * 8 + 0.5), 8).astype(np.int64)
+    }
+
+
+@lru_cache(maxsize=settings.astronomy_cache_size)
+def _sun_day(ordinal: int, lat: float, lon: float) -> tuple:
+    times = sun_times(np.datetime64(date.fromordinal(ordinal), "D"), lat, lon)
+    return tuple(times[field].item() for field in ("solar_noon", "sunrise", "sunset", "day_length", "polar"))
+
+
+def sun_day(day: date, lat: float, lon: float, decimals: Optional[int] = None) -> Dict:
+    """Sun times for one date and place, memoized on (date, rounded coordinates).
+
+    Rounding to ``astronomy_coordinate_decimals`` (2 = ~1 km) moves the times
+    by well under a minute, and lets nearby requests share the computation.
+    Times are timezone-aware UTC datetimes, or None during polar day/night.
+    """
+    decimals = settings.astronomy_coordinate_decimals if decimals is None else decimals
+    noon, sunrise, sunset, day_length, polar = _sun_day(day.toordinal(), round(lat, decimals), round(lon, decimals))
+    aware = lambda value: value.replace(tzinfo=timezone.utc) if isinstance(value, datetime) else None
+    return {
+        "solar_noon": aware(noon),
+        "sunrise": aware(sunrise),
+        "sunset": aware(sunset),
+        "day_length": day_length,
+        "polar": polar
+    }
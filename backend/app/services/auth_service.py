@@ -1,4 +1,4 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 import json
 import hashlib
@@ -140,6 +140,17 @@ class AuthService:
             "favorites": self.users[email]["favorites"]
         }
     
+    async def get_all_favorites(self) -> List[str]:
+        """Favorite locations across all users (deduplicated)"""
+        
+        favorites = []
+        for user in self.users.values():
+            for location in user["favorites"]:
+                if location not in favorites:
+                    favorites.append(location)
+        
+        return favorites
+    
     async def set_alert_thresholds(self, email: str, thresholds: Dict) -> Dict:
         """Set custom alert thresholds"""
         
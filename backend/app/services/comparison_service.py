@@ -1,80 +1,112 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime
+import asyncio
+import time
+from app.core.config import settings
+from app.services.air_quality_service import AirQualityService
+from app.services.ranking_engine import FEATURE_NAMES, DestinationRanker, profile_vectors, validate_preferences
+from app.services.sun_service import SunService
+from app.services.weather_service import WeatherService
+
+# Ranked features that current weather does not include, fetched only when a preference scores them
+EXTRA_FEATURES = ("rain", "aqi", "uv_index")
 
 
 class ComparisonService:
     """Service for comparing weather between cities"""
     
-    async def compare_cities(self, cities: List[str]) -> Dict:
-        """Compare weather data across multiple cities"""
-        from app.services.weather_service import WeatherService
+    EXTREMES = {
+        "hottest": ("temperature", max),
+        "coldest": ("temperature", min),
+        "most_humid": ("humidity", max),
+        "windiest": ("wind_speed", max)
+    }
+    
+    def __init__(self, weather_service=None, air_quality_service=None, sun_service=None):
+        self.weather_service = weather_service or WeatherService()
+        self.air_quality_service = air_quality_service or AirQualityService(weather_service=self.weather_service)
+        self.sun_service = sun_service or SunService(weather_service=self.weather_service)
+    
+    async def compare_cities(self, cities: List[str], extra: Sequence[str] = ()) -> Dict:
+        """Compare weather data across multiple cities.
         
-        weather_service = WeatherService()
-        comparison_data = []
+        Cities are fetched concurrently (bounded by ``batch_concurrency``) so
+        latency tracks the slowest city rather than the sum. A city that fails
+        is reported in ``errors`` and the rest are still compared. ``extra``
+        adds any of EXTRA_FEATURES (today's rain in mm, current AQI and UV
+        index); one that cannot be fetched is left out and listed under
+        ``missing`` in the city's record.
+        """
+        semaphore = asyncio.Semaphore(settings.batch_concurrency)
         
-        for city in cities[:5]:  # Limit to 5 cities
-            try:
-                weather = await weather_service.get_current_weather(city)
-                comparison_data.append({
+        async def fetch_city(city: str) -> Dict:
+            async with semaphore:
+                started = time.perf_counter()
+                fetches = [self.weather_service.get_current_weather(city)]
+                fetches += [self._fetch_feature(name, city) for name in extra]
+                weather, *values = await asyncio.gather(*fetches, return_exceptions=True)
+                if isinstance(weather, Exception):
+                    return {"city": city, "error": str(weather) or type(weather).__name__,
+                            "fetch_ms": round((time.perf_counter() - started) * 1000, 1)}
+                record = {
                     "city": city,
                     "temperature": weather.get("temperature", 0),
                     "feels_like": weather.get("feels_like", 0),
                     "humidity": weather.get("humidity", 0),
                     "description": weather.get("description", ""),
                     "wind_speed": weather.get("wind_speed", 0)
-                })
-            except Exception as e:
-                print(f"Error fetching weather for {city}: {e}")
+                }
+                missing = []
+                for name, value in zip(extra, values):
+                    if isinstance(value, Exception):
+                        missing.append(name)
+                    else:
+                        record[name] = value
+                if missing:
+                    record["missing"] = missing
+                record["fetch_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                return record
         
-        # Find extremes
-        if comparison_data:
-            hottest = max(comparison_data, key=lambda x: x["temperature"])
-            coldest = min(comparison_data, key=lambda x: x["temperature"])
-            most_humid = max(comparison_data, key=lambda x: x["humidity"])
-            windiest = max(comparison_data, key=lambda x: x["wind_speed"])
-        else:
-            hottest = coldest = most_humid = windiest = None
+        results = await asyncio.gather(*(fetch_city(city) for city in cities[:settings.batch_max_locations]))
+        comparison_data = [r for r in results if "error" not in r]
+        errors = [r for r in results if "error" in r]
         
         return {
             "cities": comparison_data,
+            "errors": errors,
             "comparison_date": datetime.now().isoformat(),
-            "extremes": {
-                "hottest": hottest,
-                "coldest": coldest,
-                "most_humid": most_humid,
-                "windiest": windiest
-            }
+            "extremes": self._find_extremes(comparison_data)
         }
     
-    async def get_best_destination(self, cities: List[str], preferences: Dict) -> Dict:
-        """Recommend best city based on weather preferences"""
-        comparison = await self.compare_cities(cities)
+    def _find_extremes(self, comparison_data: List[Dict]) -> Dict[str, Optional[Dict]]:
+        """Hottest/coldest/most humid/windiest city in a single pass"""
+        extremes: Dict[str, Optional[Dict]] = {name: None for name in self.EXTREMES}
         
-        # Simple scoring based on preferences
-        scored_cities = []
-        for city_data in comparison["cities"]:
-            score = 0
-            
-            # Temperature preference
-            ideal_temp = preferences.get("ideal_temperature", 22)
-            temp_diff = abs(city_data["temperature"] - ideal_temp)
-            score += max(0, 100 - (temp_diff * 10))
-            
-            # Humidity preference
-            if preferences.get("low_humidity", False):
-                score += max(0, 100 - city_data["humidity"])
-            
-            # Wind preference
-            if preferences.get("low_wind", False):
-                score += max(0, 100 - (city_data["wind_speed"] * 5))
-            
-            scored_cities.append({
-                **city_data,
-                "score": round(score, 1)
-            })
+        for city_data in comparison_data:
+            for name, (field, pick) in self.EXTREMES.items():
+                current = extremes[name]
+                if current is None or pick(city_data[field], current[field]) != current[field]:
+                    extremes[name] = city_data
+        
+        return extremes
+    
+    async def _fetch_feature(self, name: str, city: str) -> float:
+        if name == "rain":
+            today = (await self.weather_service.get_forecast(city))[0]
+            return today["precipitation"]
+        if name == "aqi":
+            return (await self.air_quality_service.get_air_quality(city))["aqi"]
+        return await self.sun_service.get_current_uv(city)
+    
+    async def get_best_destination(self, cities: List[str], preferences: Dict, top_k: Optional[int] = None) -> Dict:
+        """Recommend best city based on weather preferences"""
+        validate_preferences(preferences)
+        weights, _ = profile_vectors(preferences)
+        extra = [name for name in EXTRA_FEATURES if weights[FEATURE_NAMES.index(name)] > 0]
+        comparison = await self.compare_cities(cities, extra)
         
-        # Sort by score
-        scored_cities.sort(key=lambda x: x["score"], reverse=True)
+        ranker = DestinationRanker.from_records(comparison["cities"])
+        scored_cities = ranker.top_k(preferences, top_k or len(ranker))
         
         return {
             "recommendations": scored_cities,
@@ -0,0 +1,227 @@
+"""Bounded per-session conversation memory for the AI endpoints.
+
+Each session keeps its most recent turns in a ring buffer. Turns pushed out
+of the buffer are folded into a short extractive summary (the questions that
+were asked, trimmed), so older context survives in a few hundred characters
+rather than being dropped outright or replayed in full. Prompts are built
+newest-first under a token budget, with the summary standing in for whatever
+does not fit. Sessions idle for longer than ``idle_ttl`` are evicted, oldest
+first, and the total is capped at ``max_sessions``.
+
+Session ids are issued by the store (``open``) as unguessable tokens; ids it
+did not issue, or has since evicted, are rejected, so one caller cannot read
+or write another's history by picking its id.
+"""
+from typing import Dict, List, Optional
+from collections import OrderedDict, deque
+import hashlib
+import secrets
+import time
+
+# Rough size of a token in characters, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+# Fixed per-turn and per-session bookkeeping, added to the text sizes in the memory estimate
+TURN_OVERHEAD_BYTES = 360
+SESSION_OVERHEAD_BYTES = 600
+SUMMARY_QUESTION_CHARS = 80
+SESSION_ID_BYTES = 24
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class UnknownSessionError(LookupError):
+    """Raised for a session id the store did not issue, or has evicted"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        super().__init__("Unknown or expired conversation session; open a new one")
+
+
+class ConversationSession:
+    """One session's recent turns, the summary of older ones, and its last activity"""
+
+    __slots__ = ("turns", "summary", "last_active", "text_bytes")
+
+    def __init__(self, max_turns: int):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.summary = ""
+        self.last_active = time.monotonic()
+        self.text_bytes = 0
+
+
+class ConversationStore:
+    """Per-session ring buffers of (query, answer) turns with idle eviction"""
+
+    def __init__(self, max_turns: int = 20, max_sessions: int = 10000, idle_ttl: float = 1800.0,
+                 token_budget: int = 1500, summary_chars: int = 600):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        # Ordered by last activity, least recent first, so idle sessions are found at the front
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self.text_bytes = 0
+        self.turns_recorded = 0
+        self.turns_summarized = 0
+        self.idle_evictions = 0
+        self.capacity_evictions = 0
+
+    def open(self) -> str:
+        """Start a session and return its id, evicting the least recently active past ``max_sessions``"""
+        self.evict_idle()
+        session_id = secrets.token_urlsafe(SESSION_ID_BYTES)
+        self._sessions[session_id] = ConversationSession(self.max_turns)
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)))
+            self.capacity_evictions += 1
+        return session_id
+
+    def require(self, session_id: str) -> None:
+        """Raise ``UnknownSessionError`` unless ``session_id`` is a live session issued by ``open``"""
+        if self._active(session_id) is None:
+            raise UnknownSessionError(session_id)
+
+    def record(self, session_id: str, query: str, answer: str) -> bool:
+        """Append a turn, folding the oldest into the summary once the ring buffer is full.
+
+        Returns False, recording nothing, if the session is unknown or was
+        evicted while the answer was being produced.
+        """
+        self.evict_idle()
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        self._sessions.move_to_end(session_id)
+        session.last_active = time.monotonic()
+
+        if len(session.turns) == session.turns.maxlen:
+            self._summarize(session, session.turns[0])
+        turn = {"query": query, "response": answer, "timestamp": time.time()}
+        session.turns.append(turn)
+        self._resize(session, _turn_bytes(turn))
+        self.turns_recorded += 1
+        return True
+
+    def messages(self, session_id: Optional[str], budget: Optional[int] = None) -> List[Dict]:
+        """Chat messages for the session's history, newest turns first to fit ``budget`` tokens.
+
+        Turns that do not fit are represented by the summary (itself trimmed
+        to what is left of the budget) as a leading system message.
+        """
+        session = self._active(session_id)
+        if session is None:
+            return []
+        budget = self.token_budget if budget is None else budget
+
+        kept: List[Dict] = []
+        dropped = False
+        for turn in reversed(session.turns):
+            cost = estimate_tokens(turn["query"]) + estimate_tokens(turn["response"])
+            if cost > budget:
+                dropped = True
+                break
+            budget -= cost
+            kept.append({"role": "assistant", "content": turn["response"]})
+            kept.append({"role": "user", "content": turn["query"]})
+        kept.reverse()
+
+        summary = session.summary
+        if dropped:
+            older = len(session.turns) - len(kept) // 2
+            summary = "; ".join(filter(None, [summary] + [
+                _trim(t["query"], SUMMARY_QUESTION_CHARS) for t in list(session.turns)[:older]
+            ]))
+        if summary and budget > 0:
+            text = f"Earlier in this conversation the user asked: {summary}"
+            kept.insert(0, {"role": "system", "content": _trim(text, (budget - 1) * CHARS_PER_TOKEN, keep="end")})
+        return kept
+
+    def fingerprint(self, session_id: Optional[str]) -> Optional[str]:
+        """Short digest of the history a prompt would include (None without history)"""
+        session = self._active(session_id)
+        if session is None or not (session.turns or session.summary):
+            return None
+        last = session.turns[-1] if session.turns else {}
+        digest = hashlib.sha1(
+            f"{session.summary}|{len(session.turns)}|{last.get('query')}|{last.get('response')}".encode("utf-8")
+        )
+        return digest.hexdigest()[:16]
+
+    def history(self, session_id: str) -> List[Dict]:
+        """The session's retained turns, oldest first"""
+        session = self._active(session_id)
+        return list(session.turns) if session else []
+
+    def clear(self, session_id: str) -> None:
+        self.require(session_id)
+        self._drop(session_id)
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than ``idle_ttl``; the least recently active are at the front"""
+        cutoff = time.monotonic() - self.idle_ttl
+        evicted = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            self._drop(session_id)
+            evicted += 1
+        self.idle_evictions += evicted
+        return evicted
+
+    def _active(self, session_id: Optional[str]) -> Optional[ConversationSession]:
+        if not session_id:
+            return None
+        session = self._sessions.get(session_id)
+        if session is not None and time.monotonic() - session.last_active > self.idle_ttl:
+            self._drop(session_id)
+            self.idle_evictions += 1
+            return None
+        return session
+
+    def _summarize(self, session: ConversationSession, turn: Dict) -> None:
+        """Fold a turn leaving the ring buffer into the summary, keeping the most recent questions"""
+        summary = "; ".join(filter(None, [session.summary, _trim(turn["query"], SUMMARY_QUESTION_CHARS)]))
+        summary = _trim(summary, self.summary_chars, keep="end")
+        self._resize(session, len(summary.encode("utf-8")) - len(session.summary.encode("utf-8")) - _turn_bytes(turn))
+        session.summary = summary
+        self.turns_summarized += 1
+
+    def _resize(self, session: ConversationSession, delta: int) -> None:
+        session.text_bytes += delta
+        self.text_bytes += delta
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self.text_bytes -= session.text_bytes
+
+    def stats(self) -> Dict:
+        """Session counts, eviction counters and an estimate of the memory held"""
+        self.evict_idle()
+        turns = sum(len(s.turns) for s in self._sessions.values())
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "turns": turns,
+            "turns_recorded": self.turns_recorded,
+            "turns_summarized": self.turns_summarized,
+            "idle_evictions": self.idle_evictions,
+            "capacity_evictions": self.capacity_evictions,
+            "estimated_bytes": self.text_bytes + turns * TURN_OVERHEAD_BYTES + len(self._sessions) * SESSION_OVERHEAD_BYTES
+        }
+
+
+def _turn_bytes(turn: Dict) -> int:
+    return len(turn["query"].encode("utf-8")) + len(turn["response"].encode("utf-8"))
+
+
+def _trim(text: str, limit: int, keep: str = "start") -> str:
+    """Shorten ``text`` to ``limit`` characters with an ellipsis, keeping its start or its end"""
+    if len(text) <= limit:
+        return text
+    if limit <= 1:
+        return ""
+    return text[:limit - 1] + "…" if keep == "start" else "…" + text[-(limit - 1):]
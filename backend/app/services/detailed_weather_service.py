@@ -1,41 +1,73 @@
 from typing import List, Dict
-import random
-from datetime import datetime, timedelta
+import time
+import numpy as np
+from app.services.forecast_data import compass_direction
+from app.services.uv_model import uv_index
+from app.services.weather_service import WeatherService
+
+# Typical ratio of peak gust to mean wind speed over land
+GUST_FACTOR = 1.4
 
 
 class DetailedWeatherService:
     """Service for detailed weather metrics"""
     
+    def __init__(self):
+        self.weather_service = WeatherService()
+    
     async def get_hourly_forecast(self, location: str, hours: int = 24) -> List[Dict]:
-        """Get detailed hourly forecast"""
-        forecast = []
+        """Get detailed hourly forecast from the cached 3-hour forecast"""
+        parsed = await self.weather_service.get_parsed_forecast(location)
+        series = parsed.hourly(hours)
+        
+        temperature = np.round(series["temp"], 1).tolist()
+        feels_like = np.round(series["feels_like"], 1).tolist()
+        humidity = np.round(series["humidity"]).astype(int).tolist()
+        pop = np.round(series["pop"] * 100).astype(int).tolist()
+        wind_speed = np.round(series["wind_speed"], 1).tolist()
+        wind_direction = compass_direction(series["wind_deg"]).tolist()
+        pressure = np.round(series["pressure"]).astype(int).tolist()
+        visibility = np.round(series["visibility"] / 1000, 1).tolist()
         
-        for i in range(hours):
-            time = datetime.now() + timedelta(hours=i)
-            temp = round(random.uniform(15, 30), 1)
-            
+        # UV for every hour in one pass: solar position, ozone climatology and forecast clouds
+        if parsed.lat is not None:
+            uv = np.round(uv_index(series["time"], parsed.lat, parsed.lon, clouds=series["clouds"]), 1).tolist()
+        else:
+            uv = [None] * len(series["time"])
+        
+        forecast = []
+        for i, timestamp in enumerate(series["time"]):
+            time = parsed.local_time(timestamp)
             forecast.append({
                 "time": time.strftime("%H:%M"),
                 "datetime": time.isoformat(),
-                "temperature": temp,
-                "feels_like": round(temp + random.uniform(-3, 3), 1),
-                "humidity": random.randint(40, 90),
-                "precipitation_probability": random.randint(0, 100),
-                "wind_speed": round(random.uniform(0, 25), 1),
-                "wind_direction": random.choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"]),
-                "pressure": random.randint(990, 1030),
-                "visibility": round(random.uniform(5, 15), 1),
-                "uv_index": random.randint(0, 11),
-                "description": random.choice(["Clear", "Partly Cloudy", "Cloudy", "Light Rain"])
+                "temperature": temperature[i],
+                "feels_like": feels_like[i],
+                "humidity": humidity[i],
+                "precipitation_probability": pop[i],
+                "wind_speed": wind_speed[i],
+                "wind_direction": wind_direction[i],
+                "pressure": pressure[i],
+                "visibility": visibility[i],
+                "uv_index": uv[i],
+                "description": series["description"][i].capitalize()
             })
         
         return forecast
     
+    async def _now(self, location: str, hours_before: int = 0) -> Dict:
+        """Interpolated conditions for the current hour (and the hours before it) from the cached forecast"""
+        parsed = await self.weather_service.get_parsed_forecast(location)
+        start = int(time.time()) // 3600 * 3600 - 3600 * hours_before
+        return parsed.hourly(hours_before + 1, start)
+    
     async def get_wind_details(self, location: str) -> Dict:
         """Get detailed wind information"""
-        speed = round(random.uniform(0, 30), 1)
-        direction = random.choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"])
-        gust_speed = round(speed * random.uniform(1.2, 1.5), 1)
+        series = await self._now(location)
+        speed = round(float(series["wind_speed"][-1]) * 3.6, 1)  # m/s -> km/h
+        degrees = int(round(float(series["wind_deg"][-1]))) % 360
+        direction = str(compass_direction(degrees))
+        gust_speed = round(speed * GUST_FACTOR, 1)
         
         # Wind classification
         if speed < 1:
@@ -60,14 +92,14 @@ class DetailedWeatherService:
             "speed_mph": round(speed * 0.621371, 1),
             "gust_speed": gust_speed,
             "direction": direction,
-            "direction_degrees": random.randint(0, 359),
+            "direction_degrees": degrees,
             "description": description
         }
     
     async def get_pressure_trends(self, location: str) -> Dict:
         """Get atmospheric pressure trends"""
-        current_pressure = random.randint(990, 1030)
-        hour_ago = current_pressure + random.randint(-3, 3)
+        series = await self._now(location, hours_before=1)
+        hour_ago, current_pressure = np.round(series["pressure"]).astype(int).tolist()
         
         if current_pressure > hour_ago:
             trend = "rising"
@@ -90,7 +122,8 @@ class DetailedWeatherService:
     
     async def get_visibility_data(self, location: str) -> Dict:
         """Get visibility information"""
-        visibility = round(random.uniform(2, 15), 1)
+        series = await self._now(location)
+        visibility = round(float(series["visibility"][-1]) / 1000, 1)
         
         if visibility >= 10:
             quality = "Excellent"
@@ -1,72 +1,189 @@
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
 from datetime import datetime
-import httpx
 from app.core.config import settings
+from app.core.llm_client import llm_client
+from app.core.rate_limiter import rate_limiters
+from app.services.conversation_store import ConversationStore
+from app.services.llm_response_cache import SemanticResponseCache, bucket_context
+from app.services.location_index import fold
+
+# Shared by every instance; answers are reused across users for the same place, day and conditions
+llm_response_cache = SemanticResponseCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl=settings.llm_cache_ttl,
+    similarity=settings.llm_cache_similarity,
+    candidates=settings.llm_cache_candidates
+)
+
+# Per-session history for follow-up questions, bounded per session and in session count
+conversation_store = ConversationStore(
+    max_turns=settings.conversation_max_turns,
+    max_sessions=settings.conversation_max_sessions,
+    idle_ttl=settings.conversation_idle_ttl,
+    token_budget=settings.conversation_token_budget,
+    summary_chars=settings.conversation_summary_chars
+)
+
+# Readings the insights prompt is built from, and so the only ones its cache bucket depends on
+INSIGHT_FIELDS = ("temperature", "humidity", "description", "wind_speed")
+
+SYSTEM_PROMPT = """You are an expert meteorologist and AI weather assistant. 
+            You provide accurate, helpful weather information and advice. 
+            You understand complex weather patterns, can predict trends, and give personalized recommendations.
+            Always be concise but informative. Use data provided to give specific answers."""
 
 
 class EnhancedNLPService:
     """Enhanced NLP service with OpenAI integration for smarter responses"""
     
-    def __init__(self):
+    def __init__(self, fallback_nlp=None):
         self.openai_api_key = settings.openai_api_key
-        self.conversation_history = []
+        self.fallback_nlp = fallback_nlp
+        self.conversations = conversation_store
+        self.rate_limiter = rate_limiters["openai"]
+        self.response_cache = llm_response_cache
+        self.llm = llm_client
     
-    async def process_intelligent_query(self, query: str, context: Optional[Dict] = None) -> Dict:
-        """Process query using OpenAI for intelligent, context-aware responses"""
+    async def process_intelligent_query(self, query: str, context: Optional[Dict] = None,
+                                        session_id: Optional[str] = None) -> Dict:
+        """Process query using OpenAI for intelligent, context-aware responses.
+        
+        With a ``session_id`` issued by ``conversations.open()``, earlier turns
+        of that session are included in the prompt (within the token budget)
+        and this turn is added to them; an unknown id raises ``UnknownSessionError``.
+        """
+        if session_id:
+            self.conversations.require(session_id)
         
         if not self.openai_api_key:
             return await self._fallback_processing(query, context)
         
         try:
-            # Use OpenAI to understand intent and generate response
-            from openai import AsyncOpenAI
-            client = AsyncOpenAI(api_key=self.openai_api_key)
-            
-            # Build context-aware prompt
-            system_prompt = """You are an expert meteorologist and AI weather assistant. 
-            You provide accurate, helpful weather information and advice. 
-            You understand complex weather patterns, can predict trends, and give personalized recommendations.
-            Always be concise but informative. Use data provided to give specific answers."""
-            
-            user_message = f"Weather Query: {query}"
-            if context:
-                user_message += f"\n\nCurrent Context: {context}"
+            async def complete() -> str:
+                await self.rate_limiter.acquire()
+                response = await self.llm.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=self._query_messages(query, context, session_id),
+                    max_tokens=500,
+                    temperature=0.7
+                )
+                return response.choices[0].message.content
             
-            response = await client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=500,
-                temperature=0.7
+            answer, cache_status = await self.response_cache.get_or_create(
+                "query", query, self._query_bucket(query, context, session_id), complete
             )
-            
-            answer = response.choices[0].message.content
-            
-            # Store conversation for context
-            self.conversation_history.append({
-                "query": query,
-                "response": answer,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            return {
-                "answer": answer,
-                "confidence": 0.95,
-                "source": "ai_enhanced",
-                "learned": True
-            }
+            self._remember(query, answer, session_id)
+            return self._ai_response(answer, cache_status)
             
         except Exception as e:
             print(f"OpenAI error: {e}")
             return await self._fallback_processing(query, context)
     
+    async def stream_intelligent_query(self, query: str, context: Optional[Dict] = None,
+                                       session_id: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """Like ``process_intelligent_query``, as ("token", {"text"}) events followed by one ("done", response).
+        
+        Tokens are forwarded as the completion streams in. Cached answers and
+        the non-AI fallback arrive as a single token. A failure before the
+        first token falls back to the basic answer; a failure mid-stream ends
+        with an ("error", ...) event instead, as the partial answer is already sent.
+        """
+        if session_id:
+            self.conversations.require(session_id)
+        if not self.openai_api_key:
+            async for event in self._stream_fallback(query, context):
+                yield event
+            return
+        
+        answer, cache_status, slot = self.response_cache.lookup(
+            "query", query, self._query_bucket(query, context, session_id)
+        )
+        if answer is not None:
+            self._remember(query, answer, session_id)
+            yield "token", {"text": answer}
+            yield "done", self._ai_response(answer, cache_status)
+            return
+        
+        parts: List[str] = []
+        try:
+            await self.rate_limiter.acquire()
+            stream = await self.llm.client.chat.completions.create(
+                model=settings.openai_model,
+                messages=self._query_messages(query, context, session_id),
+                max_tokens=500,
+                temperature=0.7,
+                stream=True
+            )
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    parts.append(text)
+                    yield "token", {"text": text}
+        except Exception as e:
+            print(f"OpenAI streaming error: {e}")
+            if not parts:
+                async for event in self._stream_fallback(query, context):
+                    yield event
+            else:
+                yield "error", {"detail": str(e) or type(e).__name__}
+            return
+        
+        answer = "".join(parts)
+        self.response_cache.put(slot, answer)
+        self._remember(query, answer, session_id)
+        yield "done", self._ai_response(answer, cache_status)
+    
+    async def _stream_fallback(self, query: str, context: Optional[Dict]) -> AsyncIterator[Tuple[str, Dict]]:
+        response = await self._fallback_processing(query, context)
+        yield "token", {"text": response["answer"]}
+        yield "done", response
+    
+    def _query_messages(self, query: str, context: Optional[Dict], session_id: Optional[str] = None) -> List[Dict]:
+        user_message = f"Weather Query: {query}"
+        if context:
+            user_message += f"\n\nCurrent Context: {context}"
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *self.conversations.messages(session_id),
+            {"role": "user", "content": user_message}
+        ]
+    
+    @staticmethod
+    def _ai_response(answer: str, cache_status: str) -> Dict:
+        return {
+            "answer": answer,
+            "confidence": 0.95,
+            "source": "ai_enhanced",
+            "learned": True,
+            "cache": cache_status
+        }
+    
+    def _remember(self, query: str, answer: str, session_id: Optional[str]) -> None:
+        """Store the turn in its session's history; anonymous queries keep no history"""
+        if session_id:
+            self.conversations.record(session_id, query, answer)
+    
     async def _fallback_processing(self, query: str, context: Optional[Dict] = None) -> Dict:
         """Fallback processing when OpenAI is unavailable"""
-        from app.services.nlp_service import NLPService
-        basic_nlp = NLPService()
-        return await basic_nlp.process_query(query)
+        return await self._basic_nlp().process_query(query)
+    
+    def _basic_nlp(self):
+        if self.fallback_nlp is None:
+            from app.services.nlp_service import NLPService
+            self.fallback_nlp = NLPService()
+        return self.fallback_nlp
+    
+    def _query_bucket(self, query: str, context: Optional[Dict], session_id: Optional[str] = None) -> Hashable:
+        """What an answer depends on besides wording: intent, place, requested days, context and history"""
+        parsed = self._basic_nlp().parse(query)
+        times = tuple(
+            (t["start_date"], t["end_date"], t.get("part_of_day"), t.get("hour"))
+            for t in parsed["times"]
+        )
+        bucket = parsed["intent"], fold(parsed["location"] or ""), times, bucket_context(context or {})
+        # Answers to a follow-up depend on the turns before it, so they are only shared within the session
+        history = self.conversations.fingerprint(session_id)
+        return bucket + (history,) if history else bucket
     
     async def learn_from_feedback(self, query: str, response: str, feedback: Dict) -> None:
         """Learn from user feedback to improve future responses"""
@@ -89,9 +206,6 @@ class EnhancedNLPService:
             return {"insights": ["Weather data available for analysis"]}
         
         try:
-            from openai import AsyncOpenAI
-            client = AsyncOpenAI(api_key=self.openai_api_key)
-            
             prompt = f"""Analyze this weather data for {location} and provide 3-4 key insights:
             
 Temperature: {weather_data.get('temperature')}°C
@@ -101,18 +215,24 @@ Wind Speed: {weather_data.get('wind_speed')} km/h
 
 Provide practical, actionable insights about what this means for daily activities."""
             
-            response = await client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300
-            )
+            async def complete() -> str:
+                await self.rate_limiter.acquire()
+                response = await self.llm.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=300
+                )
+                return response.choices[0].message.content
             
-            insights_text = response.choices[0].message.content
+            # Keyed on place and rounded readings, so similar conditions reuse the same insights
+            bucket = (fold(location), bucket_context({field: weather_data.get(field) for field in INSIGHT_FIELDS}))
+            insights_text, cache_status = await self.response_cache.get_or_create("insights", "", bucket, complete)
             insights = [line.strip() for line in insights_text.split('\n') if line.strip()]
             
             return {
                 "insights": insights,
                 "generated_by": "ai",
+                "cache": cache_status,
                 "timestamp": datetime.now().isoformat()
             }
             
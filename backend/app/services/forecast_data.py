@@ -0,0 +1,154 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import time
+import numpy as np
+
+COMPASS_POINTS = np.array(["N", "NE", "E", "SE", "S", "SW", "W", "NW"])
+
+# Numeric per-slot fields pulled out of the OpenWeatherMap 5-day/3-hour payload
+NUMERIC_FIELDS = (
+    "temp", "feels_like", "temp_min", "temp_max", "humidity", "pressure",
+    "wind_speed", "wind_deg", "clouds", "visibility", "pop", "rain", "snow"
+)
+
+
+class ParsedForecast:
+    """Columnar view of a 5-day/3-hour forecast payload.
+
+    Every slot is kept (not just the first of each day) as one NumPy array per
+    field, so daily aggregates and hourly series are derived from the same data
+    without further upstream calls.
+    """
+
+    def __init__(self, dt: np.ndarray, columns: Dict[str, np.ndarray], descriptions: np.ndarray, tz_offset: int = 0,
+                 lat: Optional[float] = None, lon: Optional[float] = None):
+        self.dt = dt
+        self.columns = columns
+        self.descriptions = descriptions
+        self.tz_offset = tz_offset
+        self.lat = lat
+        self.lon = lon
+        self._daily: Optional[List[Dict]] = None
+
+    @classmethod
+    def from_payload(cls, data: Dict) -> "ParsedForecast":
+        """Parse the `/forecast` JSON once into compact arrays"""
+        items = data["list"]
+        n = len(items)
+        dt = np.empty(n, dtype=np.int64)
+        columns = {field: np.zeros(n, dtype=np.float32) for field in NUMERIC_FIELDS}
+        descriptions = np.empty(n, dtype=object)
+
+        for i, item in enumerate(items):
+            main = item["main"]
+            wind = item.get("wind", {})
+            dt[i] = item["dt"]
+            columns["temp"][i] = main["temp"]
+            columns["feels_like"][i] = main.get("feels_like", main["temp"])
+            columns["temp_min"][i] = main.get("temp_min", main["temp"])
+            columns["temp_max"][i] = main.get("temp_max", main["temp"])
+            columns["humidity"][i] = main.get("humidity", 0)
+            columns["pressure"][i] = main.get("pressure", 1013)
+            columns["wind_speed"][i] = wind.get("speed", 0)
+            columns["wind_deg"][i] = wind.get("deg", 0)
+            columns["clouds"][i] = item.get("clouds", {}).get("all", 0)
+            columns["visibility"][i] = item.get("visibility", 10000)
+            columns["pop"][i] = item.get("pop", 0)
+            columns["rain"][i] = item.get("rain", {}).get("3h", 0)
+            columns["snow"][i] = item.get("snow", {}).get("3h", 0)
+            descriptions[i] = item["weather"][0]["description"]
+
+        order = np.argsort(dt, kind="stable")
+        city = data.get("city", {})
+        coord = city.get("coord", {})
+        return cls(
+            dt[order],
+            {field: values[order] for field, values in columns.items()},
+            descriptions[order],
+            city.get("timezone", 0),
+            coord.get("lat"),
+            coord.get("lon")
+        )
+
+    def __len__(self) -> int:
+        return len(self.dt)
+
+    def daily(self, days: int = 7) -> List[Dict]:
+        """Per-day min/max/mean/precipitation via a vectorized group-by on local date"""
+        if self._daily is None:
+            self._daily = self._aggregate_daily()
+        return [dict(day) for day in self._daily[:days]]
+
+    def _aggregate_daily(self) -> List[Dict]:
+        if len(self.dt) == 0:
+            return []
+
+        local = self.dt + self.tz_offset
+        day_index = local // 86400
+        # Slots are sorted by time, so each day is a contiguous run starting at `starts`
+        days, starts, counts = np.unique(day_index, return_index=True, return_counts=True)
+        c = self.columns
+
+        temp_max = np.maximum.reduceat(c["temp_max"], starts)
+        temp_min = np.minimum.reduceat(c["temp_min"], starts)
+        temp_mean = np.add.reduceat(c["temp"], starts) / counts
+        humidity = np.add.reduceat(c["humidity"], starts) / counts
+        precipitation = np.add.reduceat(c["rain"] + c["snow"], starts)
+        pop = np.maximum.reduceat(c["pop"], starts)
+
+        # Describe each day by the slot closest to local midday
+        distance_from_noon = np.abs((local % 86400) - 43200)
+        by_day_then_distance = np.lexsort((distance_from_noon, day_index))
+        first_of_day = np.unique(day_index[by_day_then_distance], return_index=True)[1]
+        midday_slots = by_day_then_distance[first_of_day]
+
+        return [
+            {
+                "date": datetime.fromtimestamp(int(day) * 86400, timezone.utc).strftime("%Y-%m-%d"),
+                "temp_max": round(float(temp_max[i]), 1),
+                "temp_min": round(float(temp_min[i]), 1),
+                "temp_mean": round(float(temp_mean[i]), 1),
+                "description": self.descriptions[midday_slots[i]],
+                "humidity": int(round(float(humidity[i]))),
+                "precipitation": round(float(precipitation[i]), 1),
+                "precipitation_probability": int(round(float(pop[i]) * 100))
+            }
+            for i, day in enumerate(days)
+        ]
+
+    def hourly(self, hours: int = 24, start: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Hourly series from now, linearly interpolated between 3-hour slots.
+
+        Continuous fields are interpolated; precipitation probability, amount
+        (spread evenly over its 3-hour slot) and description come from the slot
+        containing each hour.
+        """
+        if start is None:
+            start = int(time.time()) // 3600 * 3600
+        times = start + 3600 * np.arange(hours, dtype=np.int64)
+        c = self.columns
+
+        series = {
+            field: np.interp(times, self.dt, c[field])
+            for field in ("temp", "feels_like", "humidity", "pressure", "wind_speed", "clouds", "visibility")
+        }
+        # Interpolate wind direction through its vector components to avoid 359°->0° jumps
+        radians = np.deg2rad(c["wind_deg"])
+        u = np.interp(times, self.dt, np.sin(radians))
+        v = np.interp(times, self.dt, np.cos(radians))
+        series["wind_deg"] = np.rad2deg(np.arctan2(u, v)) % 360
+
+        slot = np.clip(np.searchsorted(self.dt, times, side="right") - 1, 0, len(self.dt) - 1)
+        series["pop"] = c["pop"][slot]
+        series["precipitation"] = (c["rain"][slot] + c["snow"][slot]) / 3
+        series["description"] = self.descriptions[slot]
+        series["time"] = times
+        return series
+
+    def local_time(self, timestamp: int) -> datetime:
+        return datetime.fromtimestamp(int(timestamp), timezone(timedelta(seconds=self.tz_offset)))
+
+
+def compass_direction(degrees: np.ndarray) -> np.ndarray:
+    """Map wind bearings in degrees to 8-point compass labels"""
+    return COMPASS_POINTS[np.round(np.asarray(degrees) / 45).astype(int) % 8]
@@ -0,0 +1,200 @@
+from typing import Dict, Iterable, Iterator, List
+from collections import defaultdict
+from pathlib import Path
+import csv
+import numpy as np
+from app.services.location_index import fold, trigrams
+
+# One fixed-width row per place; text lives in a shared UTF-8 string table
+RECORD_DTYPE = np.dtype([
+    ("name_off", "<u4"), ("name_len", "<u2"),
+    ("alt_off", "<u4"), ("alt_len", "<u4"),
+    ("tz_off", "<u4"), ("tz_len", "<u2"),
+    ("country", "S3"),
+    ("lat", "<f4"), ("lon", "<f4"),
+    ("population", "<u4"),
+])
+# Search keys (folded names and alternate names) as fixed-width UTF-8, sorted so a
+# prefix maps to a contiguous range; byte order matches code point order
+KEY_WIDTH = 48
+
+ALT_SEPARATOR = "\x1f"
+ARRAYS = ("records", "strings", "keys", "key_place", "grams", "gram_offsets", "gram_ids")
+
+
+class _StringTableBuilder:
+    """Appends UTF-8 strings to one byte buffer, storing repeated strings once"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.seen: Dict[str, tuple] = {}
+
+    def add(self, text: str) -> tuple:
+        if text not in self.seen:
+            encoded = text.encode("utf-8")
+            self.seen[text] = (len(self.buffer), len(encoded))
+            self.buffer.extend(encoded)
+        return self.seen[text]
+
+
+def compile_records(places: Iterable[Dict]) -> Dict[str, np.ndarray]:
+    """Compile place dicts into the gazetteer's array layout"""
+    table = _StringTableBuilder()
+    rows = []
+    keys = []
+    for index, place in enumerate(places):
+        alternate_names = [n for n in place.get("alternate_names", ()) if n]
+        name_off, name_len = table.add(place["name"])
+        alt_off, alt_len = table.add(ALT_SEPARATOR.join(alternate_names))
+        tz_off, tz_len = table.add(place.get("timezone", ""))
+        rows.append((
+            name_off, name_len, alt_off, alt_len, tz_off, tz_len,
+            place.get("country", "").encode("ascii", "ignore")[:3],
+            place["lat"], place["lon"], int(place.get("population") or 0)
+        ))
+        for key in {fold(place["name"]), *(fold(n) for n in alternate_names)}:
+            if key:
+                keys.append((key.encode("utf-8")[:KEY_WIDTH], index))
+
+    keys.sort()
+    postings = defaultdict(list)
+    for key_id, (key, _) in enumerate(keys):
+        for gram in trigrams(key.decode("utf-8", "ignore")):
+            postings[gram].append(key_id)
+
+    grams = sorted(postings)
+    lengths = np.array([len(postings[g]) for g in grams], dtype=np.int64)
+    return {
+        "records": np.array(rows, dtype=RECORD_DTYPE),
+        "strings": np.frombuffer(bytes(table.buffer), dtype=np.uint8),
+        "keys": np.array([key for key, _ in keys], dtype=f"S{KEY_WIDTH}"),
+        "key_place": np.array([index for _, index in keys], dtype=np.uint32),
+        "grams": np.array(grams, dtype="<U3"),
+        "gram_offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        "gram_ids": np.array([i for g in grams for i in postings[g]], dtype=np.int32)
+    }
+
+
+def read_gazetteer_csv(path: str) -> Iterator[Dict]:
+    """Read places from a CSV with columns name, alternate_names, country, lat, lon, population, timezone.
+
+    ``alternate_names`` may be separated by commas or ``|``.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            alternates = row.get("alternate_names") or ""
+            separator = "|" if "|" in alternates else ","
+            yield {
+                "name": row["name"],
+                "alternate_names": [n.strip() for n in alternates.split(separator) if n.strip()],
+                "country": row.get("country", ""),
+                "lat": float(row["lat"]),
+                "lon": float(row["lon"]),
+                "population": int(float(row.get("population") or 0)),
+                "timezone": row.get("timezone", "")
+            }
+
+
+def compile_gazetteer(csv_path: str, out_dir: str) -> int:
+    """Compile a gazetteer CSV into a directory of .npy arrays; returns the place count"""
+    arrays = compile_records(read_gazetteer_csv(csv_path))
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for name in ARRAYS:
+        np.save(out / f"{name}.npy", arrays[name])
+    return len(arrays["records"])
+
+
+class Gazetteer:
+    """Place catalog backed by fixed-width NumPy arrays and a UTF-8 string table.
+
+    ``Gazetteer.open`` memory-maps a compiled directory, so startup does no
+    parsing and the pages are shared between worker processes through the OS
+    page cache. Columns (lat, lon, population, ...) are array views; a dict is
+    only built for places actually returned to a caller.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.records = arrays["records"]
+        self.strings = memoryview(arrays["strings"])
+        self.grams = arrays["grams"]
+        self.gram_offsets = arrays["gram_offsets"]
+        self.gram_ids = arrays["gram_ids"]
+        self.keys = arrays["keys"]
+        self.key_place = arrays["key_place"]
+
+    @classmethod
+    def open(cls, path: str) -> "Gazetteer":
+        directory = Path(path)
+        # Plain ndarray views over the maps: same pages, without np.memmap's per-access overhead
+        return cls({
+            name: np.load(directory / f"{name}.npy", mmap_mode="r").view(np.ndarray)
+            for name in ARRAYS
+        })
+
+    @classmethod
+    def from_records(cls, places: Iterable[Dict]) -> "Gazetteer":
+        return cls(compile_records(places))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def lat(self) -> np.ndarray:
+        return self.records["lat"]
+
+    @property
+    def lon(self) -> np.ndarray:
+        return self.records["lon"]
+
+    @property
+    def population(self) -> np.ndarray:
+        return self.records["population"]
+
+    @property
+    def country(self) -> np.ndarray:
+        return self.records["country"]
+
+    def _text(self, offset: int, length: int) -> str:
+        return str(self.strings[offset:offset + length], "utf-8")
+
+    def name(self, index: int) -> str:
+        name_off, name_len = self.records[index].item()[:2]
+        return self._text(name_off, name_len)
+
+    def alternate_names(self, index: int) -> List[str]:
+        alt_off, alt_len = self.records[index].item()[2:4]
+        text = self._text(alt_off, alt_len)
+        return text.split(ALT_SEPARATOR) if text else []
+
+    def key(self, key_id: int) -> str:
+        return self.keys[key_id].decode("utf-8", "ignore")
+
+    def key_range(self, folded: str, exact: bool = False) -> tuple:
+        """[lo, hi) range of keys starting with (or, if ``exact``, equal to) the folded text"""
+        needle = folded.encode("utf-8")[:KEY_WIDTH]
+        lo = int(np.searchsorted(self.keys, needle, "left"))
+        if exact or len(needle) == KEY_WIDTH:
+            return lo, int(np.searchsorted(self.keys, needle, "right"))
+        return lo, int(np.searchsorted(self.keys, needle + b"\xff", "left"))
+
+    def postings(self, gram: str) -> np.ndarray:
+        """Key ids whose folded name contains the trigram (empty if unknown)"""
+        i = int(np.searchsorted(self.grams, gram))
+        if i >= len(self.grams) or self.grams[i] != gram:
+            return self.gram_ids[:0]
+        return self.gram_ids[self.gram_offsets[i]:self.gram_offsets[i + 1]]
+
+    def place(self, index: int) -> Dict:
+        """Materialize one place as the dict shape the API returns"""
+        name_off, name_len, _, _, tz_off, tz_len, country, lat, lon, population = self.records[index].item()
+        place = {
+            "name": self._text(name_off, name_len),
+            "country": country.decode("ascii"),
+            "lat": round(lat, 4),
+            "lon": round(lon, 4),
+            "population": population
+        }
+        if tz_len:
+            place["timezone"] = self._text(tz_off, tz_len)
+        return place
@@ -1,17 +1,29 @@
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
 class HealthSafetyService:
     """Health and safety weather alerts"""
     
-    async def get_health_risks(self, weather_data: Dict) -> Dict:
+    def __init__(self, sun_service=None, air_quality_service=None, pollen_service=None):
+        self.sun_service = sun_service
+        self.air_quality_service = air_quality_service
+        self.pollen_service = pollen_service
+    
+    async def get_health_risks(self, weather_data: Dict, location: Optional[str] = None) -> Dict:
         """Assess health risks based on weather"""
         
         temp = weather_data.get("temperature", 20)
         humidity = weather_data.get("humidity", 50)
-        uv_index = weather_data.get("uv_index", 0)
-        aqi = weather_data.get("air_quality", 50)
+        # Missing UV, AQI and pollen come from the location's cached series, shared with /sun, /air-quality and /pollen
+        uv_index, aqi, pollen = await asyncio.gather(
+            self._modelled(weather_data.get("uv_index"), location, self.sun_service, "get_current_uv"),
+            self._modelled(weather_data.get("air_quality"), location, self.air_quality_service, "get_current_aqi"),
+            self._modelled(None, location, self.pollen_service, "get_pollen_data")
+        )
+        uv_index = 0 if uv_index is None else uv_index
+        aqi = 50 if aqi is None else aqi
         
         risks = {
             "temperature_risk": self._assess_temperature_risk(temp),
@@ -20,6 +32,8 @@ class HealthSafetyService:
             "air_quality_risk": self._assess_air_quality_risk(aqi),
             "overall_health_impact": "moderate"
         }
+        if pollen is not None:
+            risks["pollen_risk"] = self._assess_pollen_risk(pollen)
         
         # Calculate overall impact
         risk_levels = [
@@ -28,6 +42,8 @@ class HealthSafetyService:
             risks["uv_risk"]["level"],
             risks["air_quality_risk"]["level"]
         ]
+        if pollen is not None:
+            risk_levels.append(risks["pollen_risk"]["level"])
         
         if "critical" in risk_levels:
             risks["overall_health_impact"] = "critical"
@@ -40,6 +56,27 @@ class HealthSafetyService:
         
         return risks
     
+    @staticmethod
+    async def _modelled(value, location: Optional[str], service, method: str):
+        """``value`` if given, else the service's current value for the location (None without either)"""
+        if value is not None or not location or service is None:
+            return value
+        try:
+            return await getattr(service, method)(location)
+        except Exception as e:
+            print(f"No {method} for {location}: {e}")
+            return None
+    
+    def _assess_pollen_risk(self, pollen: Dict) -> Dict:
+        """Assess pollen allergy risk from the current pollen levels"""
+        levels = {"Low": "low", "Moderate": "moderate", "High": "high", "Very High": "high"}
+        return {
+            "level": levels.get(pollen["overall_level"], "low"),
+            "condition": f"{pollen['overall_level']} pollen ({pollen['dominant_type']})",
+            "risk": "Allergy and asthma symptoms",
+            "advice": pollen["advice"]
+        }
+    
     def _assess_temperature_risk(self, temp: float) -> Dict:
         """Assess temperature-related health risks"""
         
@@ -1,29 +1,36 @@
 from typing import List, Dict
-from datetime import datetime, timedelta
-import random
+from datetime import datetime, timezone
+import time
+import numpy as np
+from app.services.synthetic_weather import synthetic_weather
+from app.services.weather_service import WeatherService
 
 
 class HistoricalService:
     """Service for historical weather data and trends"""
     
+    def __init__(self):
+        self.weather_service = WeatherService()
+    
     async def get_historical_weather(self, location: str, days: int = 30) -> List[Dict]:
         """Get historical weather data for analysis"""
-        historical_data = []
-        
-        for i in range(days, 0, -1):
-            date = datetime.now() - timedelta(days=i)
-            # Mock historical data - replace with real API
-            historical_data.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "temp_avg": round(random.uniform(15, 30), 1),
-                "temp_max": round(random.uniform(25, 35), 1),
-                "temp_min": round(random.uniform(10, 20), 1),
-                "humidity": random.randint(40, 90),
-                "precipitation": round(random.uniform(0, 20), 1),
-                "wind_speed": round(random.uniform(0, 25), 1)
-            })
+        # Synthetic history (no historical API yet), consistent with the mock current weather and forecast
+        today = int(time.time()) // 86400
+        daily = synthetic_weather.daily(location, today - days, days)
         
-        return historical_data
+        rounded = {field: np.round(values, 1).tolist() for field, values in daily.items() if field != "day"}
+        return [
+            {
+                "date": datetime.fromtimestamp(int(day) * 86400, timezone.utc).strftime("%Y-%m-%d"),
+                "temp_avg": rounded["temp_avg"][i],
+                "temp_max": rounded["temp_max"][i],
+                "temp_min": rounded["temp_min"][i],
+                "humidity": int(round(rounded["humidity"][i])),
+                "precipitation": rounded["precipitation"][i],
+                "wind_speed": round(rounded["wind_speed"][i] * 3.6, 1)  # m/s -> km/h
+            }
+            for i, day in enumerate(daily["day"].tolist())
+        ]
     
     async def get_temperature_trends(self, location: str, days: int = 7) -> Dict:
         """Analyze temperature trends"""
@@ -51,15 +58,18 @@ class HistoricalService:
         }
     
     async def get_precipitation_forecast(self, location: str, hours: int = 24) -> List[Dict]:
-        """Get hourly precipitation probability"""
-        forecast = []
+        """Get hourly precipitation probability from the cached 3-hour forecast"""
+        parsed = await self.weather_service.get_parsed_forecast(location)
+        series = parsed.hourly(hours)
         
-        for i in range(hours):
-            time = datetime.now() + timedelta(hours=i)
-            forecast.append({
-                "time": time.strftime("%H:%M"),
-                "precipitation_probability": random.randint(0, 100),
-                "precipitation_amount": round(random.uniform(0, 5), 1) if random.random() > 0.7 else 0
-            })
+        probability = np.round(series["pop"] * 100).astype(int).tolist()
+        amount = np.round(series["precipitation"], 1).tolist()
         
-        return forecast
+        return [
+            {
+                "time": parsed.local_time(timestamp).strftime("%H:%M"),
+                "precipitation_probability": probability[i],
+                "precipitation_amount": amount[i]
+            }
+            for i, timestamp in enumerate(series["time"])
+        ]
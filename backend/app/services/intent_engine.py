@@ -0,0 +1,357 @@
+"""Compiled query understanding: intent, location and time in one pass over the tokens.
+
+The intent and time vocabularies are compiled once, at import, into a token-level
+Aho-Corasick automaton, so every phrase ("will it rain", "this weekend", "air
+quality") is found in a single left-to-right walk whatever the vocabulary size.
+The same walk handles numeric time expressions ("in 3 days", "5pm", "17:30")
+and offers candidate spans to the gazetteer: spans after a preposition in any
+case, or starting with a capitalized word in the original text. The gazetteer
+stays on disk and is probed with exact folded-key lookups, instead of loading
+every place name into the automaton. When no span resolves, a capitalized span
+inside the query (preferably after a preposition) is reported as the location
+as written, so the weather service can still try it.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import date, timedelta
+from functools import lru_cache
+import re
+from app.services.location_index import fold
+
+# (phrase, weight) per intent; strong cues weigh 1, incidental ones less
+INTENT_VOCABULARY = {
+    "current": (
+        ("now", 1.0), ("right now", 1.0), ("current", 1.0), ("currently", 1.0), ("at the moment", 1.0),
+        ("outside", 0.5), ("today", 0.5), ("temperature", 0.5), ("how hot", 0.5), ("how cold", 0.5),
+        ("weather like", 0.5), ("is it raining", 1.0), ("is it snowing", 1.0)
+    ),
+    "forecast": (
+        ("forecast", 1.5), ("will it", 1.0), ("going to", 0.5), ("expect", 0.5), ("expected", 0.5),
+        ("later", 0.5), ("upcoming", 1.0), ("outlook", 1.0), ("chance of", 0.5), ("prediction", 1.0)
+    ),
+    "recommendation": (
+        ("should i", 1.0), ("best time", 1.5), ("good time", 1.0), ("good day", 1.0), ("recommend", 1.0),
+        ("run", 1.0), ("running", 1.0), ("jog", 1.0), ("jogging", 1.0), ("exercise", 1.0), ("workout", 1.0),
+        ("bike", 1.0), ("cycling", 1.0), ("hike", 1.0), ("hiking", 1.0), ("picnic", 1.0), ("beach", 1.0),
+        ("umbrella", 1.0), ("jacket", 1.0), ("coat", 1.0), ("wear", 1.0), ("go out", 0.5), ("walk", 0.5)
+    ),
+    "air_quality": (
+        ("air quality", 2.0), ("aqi", 2.0), ("pollution", 1.5), ("polluted", 1.5), ("smog", 1.5),
+        ("ozone", 1.0), ("pollen", 1.5), ("allergy", 1.0), ("allergies", 1.0), ("hay fever", 1.5),
+        ("particulate", 1.0), ("haze", 0.5)
+    ),
+    "sun": (
+        ("sunrise", 2.0), ("sunset", 2.0), ("sun rise", 2.0), ("sun set", 2.0), ("uv", 1.5),
+        ("uv index", 2.0), ("sunscreen", 1.5), ("sunburn", 1.5), ("daylight", 1.0), ("golden hour", 2.0),
+        ("dawn", 1.0), ("dusk", 1.0), ("moon", 1.0), ("moon phase", 2.0), ("full moon", 1.5)
+    )
+}
+
+# phrase -> (day offset, days covered); weekdays and "this weekend" depend on the reference date
+RELATIVE_DAYS = {
+    "today": (0, 1), "tonight": (0, 1), "this morning": (0, 1), "this afternoon": (0, 1),
+    "this evening": (0, 1), "tomorrow": (1, 1), "day after tomorrow": (2, 1), "the day after tomorrow": (2, 1),
+    "next week": (7, 7), "this week": (0, 7), "next few days": (1, 3), "coming days": (1, 3),
+    "next couple of days": (1, 2)
+}
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+PARTS_OF_DAY = {
+    "morning": "morning", "this morning": "morning", "afternoon": "afternoon", "this afternoon": "afternoon",
+    "evening": "evening", "this evening": "evening", "tonight": "night", "night": "night",
+    "overnight": "night", "midday": "afternoon", "noon": "afternoon"
+}
+# Start hour of each part of day, so "morning" can be compared with "9am"
+PART_HOURS = {"morning": 6, "afternoon": 12, "evening": 18, "night": 21}
+# Part of day for each hour 0-23, looked up per clock time instead of searching PART_HOURS
+PART_BY_HOUR = tuple(
+    max((start, part) for part, start in PART_HOURS.items() if start <= hour)[1] if hour >= 6 else "night"
+    for hour in range(24)
+)
+
+UNIT_DAYS = {"day": 1, "days": 1, "week": 7, "weeks": 7}
+UNIT_HOURS = {"hour": 1, "hours": 1}
+PREPOSITIONS = frozenset(("in", "at", "for", "near", "around", "to", "from", "of"))
+STOPWORDS = frozenset((
+    "i", "a", "an", "the", "is", "it", "be", "will", "what", "whats", "what's", "how", "when", "where",
+    "should", "can", "could", "do", "does", "there", "my", "me", "you", "and", "or", "on", "this",
+    "next", "weather", "rain", "snow", "wind", "windy", "sunny", "hot", "cold", "warm", "like", "please",
+    "tell", "show", "give", "get", "any", "with", "go", "going", "out", "time", "day", "days", "week",
+    "weekend", "am", "pm", "here", "there", "hi", "hey", "thanks", "need", "want", "good", "best", "bad"
+))
+MAX_PLACE_TOKENS = 4
+
+# Words with an apostrophe or inner dot/hyphen, or numbers with optional minutes and am/pm
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:['’.-][^\W\d_]+)*|\d+(?::\d{2})?(?:\s?[ap]\.?m\b\.?)?")
+CLOCK_PATTERN = re.compile(r"(\d{1,2})(?::(\d{2})(?:\s?([ap])\.?m\.?)?|\s?([ap])\.?m\.?)$")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over word tokens.
+
+    Each state is a dict of token -> next state, with a failure link to the
+    longest proper suffix that is also a prefix of some phrase, and the
+    payloads of every phrase ending there (its own and its suffixes'). The
+    failure links are then folded into ``delta``, so a step is one dict probe
+    and a token outside the vocabulary always returns to the root.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, object]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, object]]] = [[]]
+        for phrase, payload in phrases:
+            state = 0
+            tokens = phrase.split()
+            for token in tokens:
+                nxt = self.goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][token] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append((len(tokens), payload))
+        order = self._link()
+        self.delta = self._flatten(order)
+        self.vocabulary = frozenset(token for edges in self.goto for token in edges)
+
+    def _link(self) -> List[int]:
+        """Breadth-first failure links; outputs of the fallback state are inherited"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+        return queue
+
+    def _flatten(self, order: List[int]) -> List[Dict[str, int]]:
+        """Per-state transitions including those inherited through failure links (root's excepted)"""
+        delta = [dict(edges) for edges in self.goto]
+        for state in order:
+            if self.fail[state]:
+                delta[state] = {**delta[self.fail[state]], **self.goto[state]}
+        return delta
+
+    def step(self, state: int, token: str) -> int:
+        return self.delta[state].get(token) or self.delta[0].get(token, 0)
+
+
+def _compile_vocabulary() -> KeywordAutomaton:
+    phrases = []
+    for intent, cues in INTENT_VOCABULARY.items():
+        phrases.extend((phrase, ("intent", intent, weight, phrase)) for phrase, weight in cues)
+    for phrase, (offset, span) in RELATIVE_DAYS.items():
+        phrases.append((phrase, ("days", offset, span)))
+    for weekday, name in enumerate(WEEKDAYS):
+        phrases.append((name, ("weekday", weekday, 0)))
+        phrases.append((f"next {name}", ("weekday", weekday, 7)))
+    phrases.append(("this weekend", ("weekend", 0)))
+    phrases.append(("weekend", ("weekend", 0)))
+    phrases.append(("next weekend", ("weekend", 7)))
+    for phrase, part in PARTS_OF_DAY.items():
+        phrases.append((phrase, ("part", part)))
+    return KeywordAutomaton(phrases)
+
+
+# Compiled once per process; every NLPService shares it
+vocabulary_automaton = _compile_vocabulary()
+
+
+class IntentEngine:
+    """Parse a weather question into intent, place and time expressions"""
+
+    def __init__(self, place_lookup: Optional[Callable[[str], Optional[Dict]]] = None,
+                 automaton: KeywordAutomaton = vocabulary_automaton, cache_size: int = 4096):
+        self.automaton = automaton
+        self.skip_words = STOPWORDS | automaton.vocabulary
+        # Place names repeat across queries; memoize both the folded-key probes and whole windows
+        self.place_lookup = lru_cache(maxsize=cache_size)(place_lookup) if place_lookup else None
+        self._spot_place = lru_cache(maxsize=cache_size)(self._probe_window)
+
+    def parse(self, query: str, today: Optional[date] = None) -> Dict:
+        """Intent, confidence, location and time expressions of ``query``, relative to ``today``"""
+        today = today or date.today()
+        words = TOKEN_PATTERN.findall(query)
+        lowered = list(map(str.lower, words))
+        vocabulary, delta, output = self.automaton.vocabulary, self.automaton.delta, self.automaton.output
+        root = delta[0]
+        spot_place = self._spot_place if self.place_lookup is not None else None
+
+        scores = dict.fromkeys(INTENT_VOCABULARY, 0.0)
+        keywords = []
+        days = []    # (start token, end token, expression dict)
+        parts = []   # (token, part of day)
+        hours = []   # (token, hour)
+        place = None
+        place_anchored = False
+        place_end = 0
+        hint = None
+        hint_anchored = False
+        state = 0
+        for i, token in enumerate(lowered):
+            if token in vocabulary:
+                state = delta[state].get(token) or root.get(token, 0)
+                for length, payload in output[state]:
+                    start = i - length + 1
+                    kind = payload[0]
+                    if kind == "intent":
+                        scores[payload[1]] += payload[2]
+                        keywords.append(payload[3])
+                    elif kind == "part":
+                        parts.append((start, payload[1]))
+                    else:
+                        days.append((start, i + 1, self._resolve_days(payload, today)))
+                # Vocabulary words are never numbers or the first word of a place
+                continue
+
+            state = 0
+            if token[0].isdigit():
+                self._numeric(lowered, i, days, hours)
+                continue
+
+            # Place candidates: any case after a preposition, otherwise capitalized in the original
+            anchored = i > 0 and lowered[i - 1] in PREPOSITIONS
+            if not anchored and (place_anchored or not words[i][0].isupper()):
+                continue
+            if i < place_end or token in STOPWORDS:
+                continue
+            found = spot_place(tuple(lowered[i:i + MAX_PLACE_TOKENS])) if spot_place is not None else None
+            if found:
+                if place is None or (anchored and not place_anchored):
+                    place, place_end = found[0], i + found[1]
+                    place_anchored = anchored
+            elif place is None and i > 0 and words[i][0].isupper() and (hint is None or (anchored and not hint_anchored)):
+                # Not in the gazetteer; a capitalized word past the first is still likely a name
+                hint, hint_anchored = self._name_span(words, lowered, i), anchored
+
+        times = self._assemble_times(days, parts, hours, today) if days or parts or hours else []
+        for expression in times:
+            if expression["day_offset"] > 0 or expression["days"] > 1:
+                scores["forecast"] += 1.0
+            elif expression.get("part_of_day") in ("evening", "night") or "hour" in expression or "within_hours" in expression:
+                scores["forecast"] += 0.5
+
+        intent, confidence = self._classify(scores)
+        return {
+            "intent": intent,
+            "confidence": confidence,
+            "scores": {name: score for name, score in scores.items() if score},
+            "location": place["name"] if place else hint,
+            "place": place,
+            "times": times,
+            "keywords": keywords
+        }
+
+    def _probe_window(self, window: Tuple[str, ...]) -> Optional[Tuple[Dict, int]]:
+        """Longest gazetteer name at the start of a window of lowercased tokens, and its length"""
+        for end in range(len(window), 0, -1):
+            # Names never end on a keyword ("Paris tomorrow" must probe "paris", not "paris tomorrow")
+            if window[end - 1] in self.skip_words:
+                continue
+            place = self.place_lookup(fold(" ".join(window[:end])))
+            if place:
+                return place, end
+        return None
+
+    def _name_span(self, words: List[str], lowered: List[str], i: int) -> str:
+        """Capitalized words from ``i`` as written, up to the first keyword, stopword or lowercase word"""
+        end = i + 1
+        while (end < min(len(words), i + MAX_PLACE_TOKENS) and words[end][0].isupper()
+               and lowered[end] not in self.skip_words):
+            end += 1
+        return " ".join(words[i:end])
+
+    @staticmethod
+    def _resolve_days(payload: tuple, today: date) -> Dict:
+        kind = payload[0]
+        if kind == "days":
+            return {"day_offset": payload[1], "days": payload[2]}
+        if kind == "weekday":
+            offset = (payload[1] - today.weekday()) % 7
+            return {"day_offset": offset + payload[2] if payload[2] and offset == 0 else offset, "days": 1}
+        # Weekend: the coming Saturday and Sunday, or what is left of the current one;
+        # "next weekend" only differs from "this weekend" once the weekend has started
+        weekday = today.weekday()
+        if weekday < 5 or payload[1]:
+            return {"day_offset": (5 - weekday) % 7, "days": 2}
+        return {"day_offset": 0, "days": 7 - weekday}
+
+    @staticmethod
+    def _numeric(lowered: List[str], i: int, days: List, hours: List) -> None:
+        """Numeric times: "in 3 days", "next 5 days", "in 2 hours", "5pm", "5 p.m.", "17:30"""
+        token = lowered[i]
+        if token.isdigit():
+            count = int(token)
+            following = lowered[i + 1] if i + 1 < len(lowered) else ""
+            previous = lowered[i - 1] if i > 0 else ""
+            if following in UNIT_DAYS and previous == "in":
+                days.append((i - 1, i + 2, {"day_offset": count * UNIT_DAYS[following], "days": 1}))
+            elif following in UNIT_DAYS and previous in ("next", "coming"):
+                days.append((i - 1, i + 2, {"day_offset": 1, "days": count * UNIT_DAYS[following]}))
+            elif following in UNIT_HOURS and previous == "in":
+                days.append((i - 1, i + 2, {"day_offset": 0, "days": 1, "within_hours": count}))
+            return
+
+        # A bare number is not a time; a clock needs minutes or am/pm
+        clock = CLOCK_PATTERN.match(token)
+        if clock is None:
+            return
+        hour, minute = int(clock.group(1)), int(clock.group(2) or 0)
+        meridiem = clock.group(3) or clock.group(4)
+        if meridiem:
+            hour = hour % 12 + (12 if meridiem == "p" else 0)
+        if hour < 24 and minute < 60:
+            hours.append((i, hour))
+
+    @staticmethod
+    def _assemble_times(days: List, parts: List, hours: List, today: date) -> List[Dict]:
+        """Longest non-overlapping day expressions, each with the nearest part of day or hour.
+
+        Expressions are built fresh per query by ``_resolve_days`` and
+        ``_numeric``, so they are completed in place.
+        """
+        chosen = []
+        for start, end, expression in (sorted(days, key=lambda d: (d[0], d[0] - d[1])) if len(days) > 1 else days):
+            if chosen and start < chosen[-1][1]:
+                continue
+            chosen.append((start, end, expression))
+        if not chosen:
+            chosen.append((0, 0, {"day_offset": 0, "days": 1}))
+
+        for token, part in parts:
+            nearest = chosen[0] if len(chosen) == 1 else min(chosen, key=lambda c: abs(c[0] - token))
+            nearest[2].setdefault("part_of_day", part)
+        for token, hour in hours:
+            nearest = chosen[0] if len(chosen) == 1 else min(chosen, key=lambda c: abs(c[0] - token))
+            nearest[2].setdefault("hour", hour)
+            nearest[2].setdefault("part_of_day", PART_BY_HOUR[hour])
+
+        times = []
+        for _, _, expression in chosen:
+            expression["start_date"], expression["end_date"] = _date_span(today, expression["day_offset"], expression["days"])
+            times.append(expression)
+        return times
+
+    @staticmethod
+    def _classify(scores: Dict[str, float]) -> Tuple[str, float]:
+        intent, best, total = "general", 0.0, 0.0
+        for name, score in scores.items():
+            total += score
+            if score > best:
+                intent, best = name, score
+        if not total:
+            return "general", 0.5
+        # Share of the evidence for the winner, tempered by how much evidence there is
+        return intent, round(min(0.99, 0.4 + 0.45 * best / total + 0.1 * min(best, 2.0)), 2)
+
+
+@lru_cache(maxsize=1024)
+def _date_span(today: date, offset: int, days: int) -> Tuple[str, str]:
+    """ISO first and last dates of ``days`` days starting ``offset`` days after ``today``"""
+    first = today + timedelta(days=offset)
+    return first.isoformat(), (first + timedelta(days=days - 1)).isoformat()
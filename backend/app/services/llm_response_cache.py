@@ -0,0 +1,182 @@
+"""Response cache for LLM completions: exact prompt hash first, then n-gram similarity.
+
+Every entry belongs to a context bucket: a hashable summary of everything
+besides the prompt wording that the answer depends on (the place and day a
+question is about, weather readings rounded to coarse steps). A lookup first
+hashes the normalized prompt with its bucket; on a miss, it compares character
+trigrams of the prompt against the other prompts cached in the same bucket,
+so a rephrasing ("weather in London today?" / "what's London's weather
+today") reuses an answer, but a question about another place or day never
+does.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import re
+from app.core.cache import TTLCache
+from app.core.singleflight import SingleFlight
+from app.services.location_index import fold, trigrams
+
+# Words that change the wording of a question but not its answer
+FILLER_WORDS = frozenset((
+    "a", "an", "the", "please", "hey", "hi", "hello", "can", "could", "would", "you", "me", "tell", "show",
+    "i", "want", "to", "know", "is", "are", "what", "whats", "what's", "s", "like", "about", "us", "kindly"
+))
+
+# Step each reading is rounded to for bucketing; unlisted numbers are rounded to integers
+CONTEXT_STEPS = {
+    "temperature": 2, "feels_like": 2, "temp": 2, "temp_max": 2, "temp_min": 2, "humidity": 10,
+    "wind_speed": 2, "pressure": 5, "clouds": 20, "visibility": 2000, "uv_index": 1, "aqi": 25,
+    "precipitation": 1, "precipitation_probability": 20
+}
+# Keys that only identify when data was fetched, not what it says
+VOLATILE_KEYS = frozenset(("timestamp", "dt", "date_time", "fetched_at", "age", "cache"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-, accent-, punctuation- and filler-insensitive form of a prompt"""
+    words = _PUNCTUATION.sub(" ", fold(prompt)).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+def bucket_context(value: Any, key: str = "") -> Hashable:
+    """Hashable, coarsened form of a context value, so similar conditions share a bucket"""
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (k, bucket_context(v, k)) for k, v in value.items() if k not in VOLATILE_KEYS and v is not None
+        ))
+    if isinstance(value, (list, tuple)):
+        return tuple(bucket_context(v, key) for v in value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        step = CONTEXT_STEPS.get(key, 1)
+        return int(round(value / step)) * step
+    if isinstance(value, str):
+        return fold(value)
+    return str(value)
+
+
+def _similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+class SemanticResponseCache:
+    """Bounded TTL cache of LLM responses with exact and similarity lookups.
+
+    ``similarity`` is the minimum trigram Jaccard similarity for a near match
+    (0 disables the similarity layer); at most ``candidates`` of the most
+    recent prompts in a bucket are compared.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl: float = 3600.0, similarity: float = 0.8,
+                 candidates: int = 64):
+        self.cache = TTLCache(max_entries=max_entries, default_ttl=ttl)
+        self.similarity = similarity
+        self.candidates = candidates
+        self.flights = SingleFlight()
+        # bucket -> exact key -> prompt trigrams, most recent last; bounded like the cache itself
+        self._buckets: "OrderedDict[Hashable, OrderedDict[str, frozenset]]" = OrderedDict()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    async def get_or_create(self, namespace: str, prompt: str, context: Hashable,
+                            create: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Cached response for the prompt, or ``create()``'s; returns (value, "exact" | "semantic" | "miss").
+
+        Concurrent misses for the same prompt share one ``create()`` call.
+        """
+        value, status, slot = self.lookup(namespace, prompt, context)
+        if value is not None:
+            return value, status
+
+        async def create_and_store():
+            created = await create()
+            self.put(slot, created)
+            return created
+
+        return await self.flights.do(slot[1], create_and_store), status
+
+    def lookup(self, namespace: str, prompt: str, context: Hashable) -> Tuple[Optional[Any], str, tuple]:
+        """(value or None, status, slot); pass the slot to ``put`` to store a response produced on a miss"""
+        normalized = normalize_prompt(prompt)
+        bucket = (namespace, context)
+        key = self._key(bucket, normalized)
+
+        value = self.cache.get(key)
+        if value is not None:
+            self.exact_hits += 1
+            return value, "exact", (bucket, key, None)
+
+        grams = frozenset(trigrams(normalized))
+        value = self._nearest(bucket, grams)
+        if value is not None:
+            self.semantic_hits += 1
+            return value, "semantic", (bucket, key, grams)
+
+        self.misses += 1
+        return None, "miss", (bucket, key, grams)
+
+    def put(self, slot: tuple, value: Any) -> None:
+        """Store a response for the prompt a ``lookup`` missed on"""
+        bucket, key, grams = slot
+        if value is not None and grams is not None:
+            self.store(bucket, key, grams, value)
+
+    def store(self, bucket: Hashable, key: str, grams: frozenset, value: Any) -> None:
+        self.cache.set(key, value)
+        prompts = self._buckets.setdefault(bucket, OrderedDict())
+        prompts[key] = grams
+        prompts.move_to_end(key)
+        self._buckets.move_to_end(bucket)
+        while len(prompts) > self.candidates:
+            prompts.popitem(last=False)
+        while len(self._buckets) > self.cache.max_entries:
+            self._buckets.popitem(last=False)
+
+    def _nearest(self, bucket: Hashable, grams: frozenset) -> Optional[Any]:
+        """Value of the most similar live prompt in the bucket, if similar enough"""
+        prompts = self._buckets.get(bucket)
+        if not prompts or not self.similarity:
+            return None
+
+        best_key, best_score = None, self.similarity
+        for key, cached_grams in list(prompts.items()):
+            entry = self.cache.peek(key)
+            if entry is None or not entry.is_fresh:
+                # Evicted or expired from the cache; drop it from the bucket too
+                del prompts[key]
+                continue
+            score = _similarity(grams, cached_grams)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if not prompts:
+            del self._buckets[bucket]
+        return None if best_key is None else self.cache.get(best_key)
+
+    @staticmethod
+    def _key(bucket: Hashable, normalized: str) -> str:
+        return hashlib.sha256(repr((bucket, normalized)).encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict:
+        """Hit rates per layer, for monitoring LLM spend"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "max_entries": self.cache.max_entries,
+            "buckets": len(self._buckets),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "semantic_hit_rate": round(self.semantic_hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.cache.evictions,
+            "coalesced": self.flights.coalesced
+        }
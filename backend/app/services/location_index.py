@@ -0,0 +1,227 @@
+from typing import Dict, Iterable, List, Optional
+import unicodedata
+import numpy as np
+
+# Candidates confirmed in the first fuzzy batch; each later batch is four times larger
+FUZZY_BATCH = 256
+
+
+def fold(text: str) -> str:
+    """Case- and diacritic-insensitive form of a place name ("São Paulo" -> "sao paulo")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prefix_edit_distance(query: str, key: str, limit: int) -> int:
+    """Smallest Levenshtein distance between ``query`` and any prefix of ``key``.
+
+    Matches both complete names with typos and partially typed ones. Only the
+    diagonal band of width ``2 * limit + 1`` is computed, and the result is
+    capped at ``limit + 1`` as soon as the distance must exceed ``limit``.
+    """
+    n = len(query)
+    key = key[:n + limit]
+    m = len(key)
+    beyond = limit + 1
+    previous = list(range(m + 1))
+    for i in range(1, n + 1):
+        lo = max(1, i - limit)
+        hi = min(m, i + limit)
+        current = [beyond] * (m + 1)
+        current[0] = min(i, beyond)
+        ch = query[i - 1]
+        for j in range(lo, hi + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ch != key[j - 1]))
+        if min(current[lo - 1:hi + 1]) > limit:
+            return beyond
+        previous = current
+    return min(min(previous), beyond)
+
+
+def prefix_edit_distances(query: bytes, keys: np.ndarray, limit: int) -> np.ndarray:
+    """``prefix_edit_distance`` of one byte string against many keys at once.
+
+    ``keys`` is a (keys, width) uint8 array of null-padded key bytes. The band
+    is held as one array per diagonal, each spanning all keys, so every step
+    is a contiguous vector operation. Distances above ``limit`` are only
+    known to exceed it. Bytes equal characters only for ASCII text.
+    """
+    n = len(query)
+    width = 2 * limit + 1
+    # Key bytes by position, with ``limit`` null columns before the key; nulls never match a query byte
+    columns = np.zeros((n + width, len(keys)), dtype=np.uint8)
+    take = min(keys.shape[1], n + limit)
+    columns[limit:limit + take] = keys[:, :take].T
+
+    beyond = np.full(len(keys), limit + 1, dtype=np.int16)
+    previous = [beyond] * limit + [np.full(len(keys), j, dtype=np.int16) for j in range(limit + 1)]
+    for i, ch in enumerate(query):
+        current = []
+        for d in range(width):
+            cell = previous[d] + (columns[i + d] != ch)
+            side = previous[d + 1] if d + 1 < width else None
+            if d:
+                side = current[-1] if side is None else np.minimum(side, current[-1])
+            if side is not None:
+                np.minimum(cell, side + 1, out=cell)
+            current.append(cell)
+        previous = current
+    return np.minimum.reduce(previous)
+
+
+class LocationIndex:
+    """Search index over a gazetteer's place names.
+
+    - Prefix autocomplete: every folded name and alternate name is kept in one
+      sorted key table, so a prefix maps to a contiguous range found by binary search.
+    - Ranking: matches are ordered by population (partial selection over the
+      range, so short prefixes with many hits stay cheap).
+    - Typo tolerance: a trigram inverted index proposes candidates, which are
+      confirmed with an edit distance bounded by ``max_typos``; the closest
+      spellings are returned, most populous first.
+
+    The key table and trigram postings are precompiled in the gazetteer, so
+    building the index costs nothing even for a memory-mapped catalog.
+    """
+
+    def __init__(self, gazetteer, max_typos: int = 2):
+        self.gazetteer = gazetteer
+        self.max_typos = max_typos
+        self.key_place = gazetteer.key_place
+        self.population = gazetteer.population
+        self._by_country: Optional[Dict[str, np.ndarray]] = None
+        self._key_rank: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.gazetteer)
+
+    @property
+    def by_country(self) -> Dict[str, np.ndarray]:
+        """Place indices per folded country code, grouped on first use"""
+        if self._by_country is None:
+            codes, inverse = np.unique(self.gazetteer.country, return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            groups = np.split(order, np.cumsum(np.bincount(inverse, minlength=len(codes)))[:-1])
+            self._by_country = {fold(code.decode("ascii")): group for code, group in zip(codes, groups)}
+        return self._by_country
+
+    @property
+    def key_rank(self) -> np.ndarray:
+        """Position of each key when ordered by its place's population, largest first, computed on first use"""
+        if self._key_rank is None:
+            population = self.population[np.asarray(self.key_place)].astype(np.int64)
+            self._key_rank = np.empty(len(population), dtype=np.int32)
+            self._key_rank[np.argsort(-population, kind="stable")] = np.arange(len(population), dtype=np.int32)
+        return self._key_rank
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Prefix matches, then country matches, each by population; fuzzy only if nothing matched"""
+        folded = fold(query)
+        if not folded:
+            return []
+
+        found: List[int] = []
+        self._extend_unique(found, self.prefix(folded, limit), limit)
+        if len(found) < limit and len(folded) <= 3 and folded in self.by_country:
+            self._extend_unique(found, self._most_populous(self.by_country[folded], limit), limit)
+        if not found and len(folded) >= 3:
+            self._extend_unique(found, self.fuzzy(folded, limit), limit)
+
+        return [self.gazetteer.place(i) for i in found]
+
+    def prefix(self, folded: str, limit: int) -> List[int]:
+        """Places with a name starting with ``folded``, most populous first"""
+        lo, hi = self.gazetteer.key_range(folded)
+        if lo == hi:
+            return []
+
+        places = np.asarray(self.key_place[lo:hi], dtype=np.int64)
+        population = self.population[places].astype(np.int64)
+        # Over-select so duplicate places (matched via several names) don't starve the result
+        take = min(len(places), limit * 3)
+        if take < len(places):
+            top = np.argpartition(-population, take - 1)[:take]
+        else:
+            top = np.arange(len(places))
+        top = top[np.argsort(-population[top], kind="stable")]
+        return list(dict.fromkeys(places[top].tolist()))[:limit]
+
+    def exact(self, folded: str, country: Optional[str] = None) -> Optional[int]:
+        """Most populous place named exactly ``folded`` (optionally within a country code)"""
+        lo, hi = self.gazetteer.key_range(folded, exact=True)
+        places = np.asarray(self.key_place[lo:hi], dtype=np.int64)
+        if country:
+            places = places[[fold(code.decode("ascii")) == fold(country) for code in self.gazetteer.country[places]]]
+        if not len(places):
+            return None
+        return int(places[np.argmax(self.population[places])])
+
+    def fuzzy(self, folded: str, limit: int) -> List[int]:
+        """Typo-tolerant matches at the smallest edit distance any name is within, most populous first.
+
+        One edit changes at most three trigrams (and a prefix can lose the
+        query's trailing one), so a name within ``k`` edits shares at least
+        ``T - 3k - 1`` of the query's ``T`` trigrams. Every key above that
+        overlap is a candidate; candidates are confirmed in population order,
+        one distance at a time, until ``limit`` places are found. Names one
+        edit away are not padded out with names two edits away.
+        """
+        exact = self.prefix(folded, limit)
+        if exact:
+            return exact
+
+        max_typos = 1 if len(folded) <= 5 else self.max_typos
+        grams = trigrams(folded)
+        overlap = np.zeros(len(self.gazetteer.keys), dtype=np.uint16)
+        for gram in grams:
+            overlap[self.gazetteer.postings(gram)] += 1
+
+        query = folded.encode("utf-8")
+        found: Dict[int, None] = {}
+        for typos in range(1, max_typos + 1):
+            candidates = np.flatnonzero(overlap >= max(len(grams) - 3 * typos - 1, 1))
+            candidates = candidates[np.argsort(self.key_rank[candidates])]
+            start, size = 0, FUZZY_BATCH
+            while start < len(candidates) and len(found) < limit:
+                batch = candidates[start:start + size]
+                for key_id in self._within(folded, query, batch, typos):
+                    found.setdefault(int(self.key_place[key_id]), None)
+                start, size = start + size, size * 4
+            if found:
+                break
+        return list(found)[:limit]
+
+    def _within(self, folded: str, query: bytes, key_ids: np.ndarray, limit: int) -> List[int]:
+        """Those of ``key_ids`` within ``limit`` edits of ``folded``, in the given order.
+
+        Distances are computed on bytes, which match characters for ASCII;
+        multi-byte characters only make a byte distance larger, so keys that
+        fail it but hold non-ASCII bytes are rechecked by character.
+        """
+        if not query.isascii():
+            return [k for k in key_ids.tolist() if prefix_edit_distance(folded, self.gazetteer.key(k), limit) <= limit]
+        keys = self.gazetteer.keys[key_ids].view(np.uint8).reshape(len(key_ids), -1)
+        within = prefix_edit_distances(query, keys, limit) <= limit
+        recheck = ~within & (keys.max(axis=1) >= 0x80)
+        for i in np.flatnonzero(recheck).tolist():
+            within[i] = prefix_edit_distance(folded, self.gazetteer.key(int(key_ids[i])), limit) <= limit
+        return key_ids[within].tolist()
+
+    def _most_populous(self, indices: Iterable[int], limit: int) -> List[int]:
+        indices = np.fromiter(indices, dtype=np.int64)
+        population = self.population[indices].astype(np.int64)
+        return indices[np.argsort(-population, kind="stable")][:limit].tolist()
+
+    @staticmethod
+    def _extend_unique(found: List[int], candidates: List[int], limit: int) -> None:
+        for index in candidates:
+            if len(found) >= limit:
+                return
+            if index not in found:
+                found.append(index)
@@ -1,31 +1,46 @@
-from typing import List, Dict
-import httpx
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+from app.core.config import settings
+from app.services.gazetteer import Gazetteer
+from app.services.location_index import LocationIndex, fold
+from app.services.reverse_geocoder import ReverseGeocoder
 
 
 class LocationService:
     """Service for location search and autocomplete"""
     
-    def __init__(self):
-        self.cities_cache = self._load_popular_cities()
+    def __init__(self, gazetteer_path: str = None):
+        self.gazetteer = self._load_gazetteer(gazetteer_path or settings.gazetteer_path)
+        self.index = LocationIndex(self.gazetteer)
+        self.geocoder = ReverseGeocoder(self.gazetteer)
+    
+    def _load_gazetteer(self, path: str) -> Gazetteer:
+        """Memory-map a compiled gazetteer, or compile the built-in cities in memory"""
+        if path and Path(path).is_dir():
+            try:
+                return Gazetteer.open(path)
+            except Exception as e:
+                print(f"Error loading gazetteer from {path}: {e}")
+        return Gazetteer.from_records(self._load_popular_cities())
     
     def _load_popular_cities(self) -> List[Dict]:
         """Load popular cities for autocomplete"""
         return [
-            {"name": "London", "country": "UK", "lat": 51.5074, "lon": -0.1278},
-            {"name": "New York", "country": "US", "lat": 40.7128, "lon": -74.0060},
-            {"name": "Tokyo", "country": "JP", "lat": 35.6762, "lon": 139.6503},
-            {"name": "Paris", "country": "FR", "lat": 48.8566, "lon": 2.3522},
-            {"name": "Sydney", "country": "AU", "lat": -33.8688, "lon": 151.2093},
-            {"name": "Los Angeles", "country": "US", "lat": 34.0522, "lon": -118.2437},
-            {"name": "Mumbai", "country": "IN", "lat": 19.0760, "lon": 72.8777},
-            {"name": "Berlin", "country": "DE", "lat": 52.5200, "lon": 13.4050},
-            {"name": "Toronto", "country": "CA", "lat": 43.6532, "lon": -79.3832},
-            {"name": "Singapore", "country": "SG", "lat": 1.3521, "lon": 103.8198},
-            {"name": "Dubai", "country": "AE", "lat": 25.2048, "lon": 55.2708},
-            {"name": "Barcelona", "country": "ES", "lat": 41.3851, "lon": 2.1734},
-            {"name": "Amsterdam", "country": "NL", "lat": 52.3676, "lon": 4.9041},
-            {"name": "Rome", "country": "IT", "lat": 41.9028, "lon": 12.4964},
-            {"name": "Hong Kong", "country": "HK", "lat": 22.3193, "lon": 114.1694},
+            {"name": "London", "country": "UK", "lat": 51.5074, "lon": -0.1278, "population": 8982000, "timezone": "Europe/London"},
+            {"name": "New York", "country": "US", "lat": 40.7128, "lon": -74.0060, "population": 8336000, "timezone": "America/New_York"},
+            {"name": "Tokyo", "country": "JP", "lat": 35.6762, "lon": 139.6503, "population": 13960000, "timezone": "Asia/Tokyo"},
+            {"name": "Paris", "country": "FR", "lat": 48.8566, "lon": 2.3522, "population": 2161000, "timezone": "Europe/Paris"},
+            {"name": "Sydney", "country": "AU", "lat": -33.8688, "lon": 151.2093, "population": 5312000, "timezone": "Australia/Sydney"},
+            {"name": "Los Angeles", "country": "US", "lat": 34.0522, "lon": -118.2437, "population": 3898000, "timezone": "America/Los_Angeles"},
+            {"name": "Mumbai", "country": "IN", "lat": 19.0760, "lon": 72.8777, "population": 12478000, "timezone": "Asia/Kolkata"},
+            {"name": "Berlin", "country": "DE", "lat": 52.5200, "lon": 13.4050, "population": 3645000, "timezone": "Europe/Berlin"},
+            {"name": "Toronto", "country": "CA", "lat": 43.6532, "lon": -79.3832, "population": 2794000, "timezone": "America/Toronto"},
+            {"name": "Singapore", "country": "SG", "lat": 1.3521, "lon": 103.8198, "population": 5454000, "timezone": "Asia/Singapore"},
+            {"name": "Dubai", "country": "AE", "lat": 25.2048, "lon": 55.2708, "population": 3331000, "timezone": "Asia/Dubai"},
+            {"name": "Barcelona", "country": "ES", "lat": 41.3851, "lon": 2.1734, "population": 1620000, "timezone": "Europe/Madrid"},
+            {"name": "Amsterdam", "country": "NL", "lat": 52.3676, "lon": 4.9041, "population": 872000, "timezone": "Europe/Amsterdam"},
+            {"name": "Rome", "country": "IT", "lat": 41.9028, "lon": 12.4964, "population": 2873000, "timezone": "Europe/Rome"},
+            {"name": "Hong Kong", "country": "HK", "lat": 22.3193, "lon": 114.1694, "population": 7482000, "timezone": "Asia/Hong_Kong"},
         ]
     
     async def search_locations(self, query: str, limit: int = 10) -> List[Dict]:
@@ -33,24 +48,38 @@ class LocationService:
         if not query or len(query) < 2:
             return []
         
-        query_lower = query.lower()
-        results = [
-            city for city in self.cities_cache
-            if query_lower in city["name"].lower() or query_lower in city["country"].lower()
-        ]
-        
-        return results[:limit]
+        return self.index.search(query, limit)
+    
+    def resolve_coordinates(self, name: str) -> Optional[Tuple[float, float]]:
+        """Coordinates of the most populous place called ``name`` ("paris" or "paris, fr")"""
+        place, _, country = name.partition(",")
+        index = self.index.exact(fold(place), country.strip() or None)
+        if index is None:
+            return None
+        return float(self.gazetteer.lat[index]), float(self.gazetteer.lon[index])
+    
+    def find_place(self, folded: str) -> Optional[Dict]:
+        """Most populous place whose folded name is exactly ``folded``, or None"""
+        index = self.index.exact(folded)
+        return None if index is None else self.gazetteer.place(index)
     
     async def get_location_details(self, lat: float, lon: float) -> Dict:
         """Get location details from coordinates"""
-        # Find closest city in cache
-        for city in self.cities_cache:
-            if abs(city["lat"] - lat) < 0.1 and abs(city["lon"] - lon) < 0.1:
-                return city
-        
-        return {
-            "name": f"Location ({lat:.2f}, {lon:.2f})",
-            "country": "Unknown",
-            "lat": lat,
-            "lon": lon
-        }
+        return self.get_location_details_batch([(lat, lon)])[0]
+    
+    def get_location_details_batch(self, coordinates: List[Tuple[float, float]]) -> List[Dict]:
+        """Nearest known place for each coordinate, or a placeholder if none is close enough"""
+        nearest = self.geocoder.nearest_batch(coordinates, k=1, max_distance_km=settings.reverse_geocode_max_km)
+        return [
+            places[0] if places else {
+                "name": f"Location ({lat:.2f}, {lon:.2f})",
+                "country": "Unknown",
+                "lat": lat,
+                "lon": lon
+            }
+            for (lat, lon), places in zip(coordinates, nearest)
+        ]
+    
+    async def get_nearby_places(self, lat: float, lon: float, k: int = 5) -> List[Dict]:
+        """The k nearest places to a coordinate, with their distance in km"""
+        return self.geocoder.nearest(lat, lon, k)
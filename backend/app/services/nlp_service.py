@@ -1,56 +1,325 @@
-from typing import Dict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
+import asyncio
+import calendar
+import time
 from app.core.config import settings
-import re
+from app.services.forecast_data import ParsedForecast
+from app.services.intent_engine import PART_HOURS, IntentEngine
+from app.services.location_index import fold
+
+# Data each intent needs; everything is fetched concurrently through the services' caches
+INTENT_DATA = {
+    "current": ("current",),
+    "forecast": ("forecast",),
+    "recommendation": ("current", "forecast"),
+    "air_quality": ("air_quality",),
+    "sun": ("sun",),
+    "general": ("current",)
+}
+
+NO_LOCATION_ANSWER = "I can help you with weather information for your location. What would you like to know?"
+# Confidence ceiling for an answer that could not use any location
+UNRESOLVED_CONFIDENCE = 0.3
+
+# Hours of forecast shown for a part of day or around a specific hour, and considered for recommendations
+PART_SPAN_HOURS = 6
+HOUR_SPAN_HOURS = 3
+RECOMMENDATION_HOURS = 24
+# Local hours a recommended outdoor slot may start in
+DAYTIME = (6, 21)
 
 
 class NLPService:
     """Service for natural language processing of weather queries"""
     
-    def __init__(self):
+    def __init__(self, location_service=None, weather_service=None, air_quality_service=None, sun_service=None):
         self.openai_api_key = settings.openai_api_key
+        # The keyword automaton is compiled at import; places come from the gazetteer when available
+        self.engine = IntentEngine(location_service.find_place if location_service else None)
+        self.location_service = location_service
+        self.weather_service = weather_service
+        self.air_quality_service = air_quality_service
+        self.sun_service = sun_service
     
-    async def process_query(self, query: str) -> Dict:
+    async def process_query(self, query: str, location: Optional[str] = None) -> Dict:
         """Process natural language query and return weather information"""
+        response, _ = await self.process_query_with_timings(query, location)
+        return response
+    
+    async def process_query_with_timings(self, query: str, location: Optional[str] = None) -> Tuple[Dict, Dict]:
+        """Answer a query in one pass: parse, fetch only what the intent needs concurrently, compose.
         
-        # Simple pattern matching (can be enhanced with OpenAI API)
-        query_lower = query.lower()
-        
-        # Extract location from query
-        location = self._extract_location(query_lower)
-        
-        # Determine query intent
-        if any(word in query_lower for word in ['tomorrow', 'next week', 'forecast', 'will it']):
-            intent = 'forecast'
-            answer = f"Based on the forecast for {location}, I'll provide predictions for the coming days."
-        elif any(word in query_lower for word in ['now', 'current', 'today', 'right now']):
-            intent = 'current'
-            answer = f"The current weather in {location} is available."
-        elif any(word in query_lower for word in ['run', 'exercise', 'workout', 'best time']):
-            intent = 'recommendation'
-            answer = f"Based on weather conditions in {location}, I recommend outdoor activities during morning hours when temperature and humidity are optimal."
-        else:
-            intent = 'general'
-            answer = f"I can help you with weather information for {location}. What would you like to know?"
-        
-        return {
-            "answer": answer,
+        ``location`` is used when the query names no place. A name the
+        gazetteer doesn't know is passed to the weather service as written; if
+        that fails too, or there is no location at all, the generic answer is
+        returned with confidence capped at UNRESOLVED_CONFIDENCE. Timings are
+        in milliseconds per stage, with one entry per fetched dataset.
+        """
+        started = time.perf_counter()
+        parsed = self.parse(query, location)
+        guessed = parsed["place"] is None and parsed["location"] is not None
+        location = parsed["location"] or location
+        timings = {"parse": _elapsed_ms(started)}
+        
+        response = {
+            "answer": NO_LOCATION_ANSWER,
             "weather_data": None,
-            "confidence": 0.85
+            "confidence": min(parsed["confidence"], UNRESOLVED_CONFIDENCE),
+            "intent": parsed["intent"],
+            "location": None,
+            "times": parsed["times"]
         }
+        if not location or self.weather_service is None:
+            timings["total"] = _elapsed_ms(started)
+            return response, timings
+        
+        fetch_started = time.perf_counter()
+        data, errors = await self._fetch(parsed, location, timings)
+        timings["fetch"] = _elapsed_ms(fetch_started)
+        if not data:
+            if guessed:
+                # An unverified name the weather service doesn't know either; not an error
+                timings["total"] = _elapsed_ms(started)
+                return response, timings
+            # Nothing to answer from; the first failure becomes the endpoint's error
+            raise next(iter(errors.values()))
+        
+        compose_started = time.perf_counter()
+        response["confidence"] = parsed["confidence"]
+        response["location"] = location
+        response["answer"] = self._compose(parsed["intent"], location, parsed["times"], data)
+        response["weather_data"] = {**data, "errors": {name: str(e) or type(e).__name__ for name, e in errors.items()}}
+        timings["compose"] = _elapsed_ms(compose_started)
+        timings["total"] = _elapsed_ms(started)
+        return response, timings
     
-    def _extract_location(self, query: str) -> str:
-        """Extract location from query (simplified implementation)"""
-        # Common location patterns
-        patterns = [
-            r'in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-            r'at ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-            r'for ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-        ]
+    def parse(self, query: str, location: Optional[str] = None) -> Dict:
+        """Intent, location and time expressions of a query, in one pass.
         
-        for pattern in patterns:
-            match = re.search(pattern, query)
-            if match:
-                return match.group(1)
+        Relative days ("tomorrow", "on Friday") mean the calendar day where the
+        place is, which is what forecasts are bucketed by. When that differs
+        from the server's date (near midnight, far time zones), the query is
+        parsed again against the place's date. ``location`` stands in for the
+        place when the query names none.
+        """
+        server_today = date.today()
+        parsed = self.engine.parse(query, server_today)
+        if parsed["times"]:
+            place = parsed["place"] or self._find_place(location)
+            local_today = datetime.now(_place_timezone(place)).date() if place else server_today
+            if local_today != server_today:
+                parsed = self.engine.parse(query, local_today)
+        return parsed
+    
+    def _find_place(self, location: Optional[str]) -> Optional[Dict]:
+        if not location or self.location_service is None:
+            return None
+        return self.location_service.find_place(fold(location))
+    
+    async def _fetch(self, parsed: Dict, location: str, timings: Dict) -> Tuple[Dict, Dict]:
+        """Fetch the datasets the intent needs concurrently; a failed dataset is reported, not fatal"""
+        place = parsed["place"]
+        lat = place["lat"] if place else None
+        lon = place["lon"] if place else None
+        hourly = RECOMMENDATION_HOURS if parsed["intent"] == "recommendation" else 0
+        fetchers: Dict[str, Callable[[], Awaitable]] = {
+            "current": lambda: self.weather_service.get_current_weather(location),
+            "forecast": lambda: self._forecast(location, parsed["times"], hourly),
+            "air_quality": lambda: self.air_quality_service.get_air_quality(location, lat, lon),
+            "sun": lambda: self._sun(location, parsed["times"], lat, lon)
+        }
+        services = {"air_quality": self.air_quality_service, "sun": self.sun_service}
+        needed = [name for name in INTENT_DATA[parsed["intent"]] if services.get(name, self.weather_service)]
+        
+        async def timed(name: str):
+            started = time.perf_counter()
+            try:
+                return await fetchers[name]()
+            finally:
+                timings[name] = _elapsed_ms(started)
+        
+        outcomes = await asyncio.gather(*(timed(name) for name in needed), return_exceptions=True)
+        data, errors = {}, {}
+        for name, outcome in zip(needed, outcomes):
+            if isinstance(outcome, Exception):
+                errors[name] = outcome
+            else:
+                data[name] = outcome
+        return data, errors
+    
+    async def _forecast(self, location: str, times: List[Dict], hourly: int = 0) -> Dict:
+        """Daily forecast for the requested days, plus hours for a requested part of day or time.
+        
+        Without a requested window, ``hourly`` hours from now are included instead.
+        """
+        parsed = await self.weather_service.get_parsed_forecast(location)
+        window = times[0] if times else None
+        daily = parsed.daily()
+        if window:
+            daily = [day for day in daily if window["start_date"] <= day["date"] <= window["end_date"]]
+        forecast = {"daily": daily}
+        if window and ("hour" in window or "part_of_day" in window):
+            forecast["hourly"] = self._hours(parsed, *self._hour_range(parsed, window))
+        elif hourly and (window is None or window["day_offset"] == 0):
+            forecast["hourly"] = self._hours(parsed, int(time.time()) // 3600 * 3600, hourly)
+        return forecast
+    
+    @staticmethod
+    def _hour_range(parsed: ParsedForecast, window: Dict) -> Tuple[int, int]:
+        """(first hour, hours) covering the requested hour or part of day, in the location's local time"""
+        day = datetime.strptime(window["start_date"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        midnight = calendar.timegm(day.timetuple()) - parsed.tz_offset
+        if "hour" in window:
+            return midnight + 3600 * window["hour"], HOUR_SPAN_HOURS
+        return midnight + 3600 * PART_HOURS[window["part_of_day"]], PART_SPAN_HOURS
+    
+    @staticmethod
+    def _hours(parsed: ParsedForecast, start: int, hours: int) -> List[Dict]:
+        if len(parsed) == 0 or start > parsed.dt[-1]:
+            return []
+        series = parsed.hourly(hours, start)
+        return [
+            {
+                "time": parsed.local_time(t).strftime("%Y-%m-%d %H:%M"),
+                "temperature": round(float(series["temp"][i]), 1),
+                "feels_like": round(float(series["feels_like"][i]), 1),
+                "description": str(series["description"][i]),
+                "precipitation_probability": int(round(float(series["pop"][i]) * 100)),
+                "wind_speed": round(float(series["wind_speed"][i]), 1)
+            }
+            for i, t in enumerate(series["time"].tolist())
+        ]
+    
+    async def _sun(self, location: str, times: List[Dict], lat: Optional[float], lon: Optional[float]) -> Dict:
+        """Today's sun and UV data, or the sun calendar entry for a later requested day"""
+        if times and times[0]["day_offset"] > 0:
+            days = await self.sun_service.get_sun_calendar(location, lat, lon, times[0]["day_offset"] + 1)
+            return days[-1]
+        return await self.sun_service.get_sun_data(location, lat, lon)
+    
+    def _compose(self, intent: str, location: str, times: List[Dict], data: Dict) -> str:
+        """Answer text from whichever datasets arrived"""
+        when = _describe_when(times[0]) if times else None
+        sentences = []
+        if intent == "forecast" and "forecast" in data:
+            sentences.append(self._forecast_sentence(location, when, data["forecast"]))
+        elif intent == "air_quality" and "air_quality" in data:
+            aq = data["air_quality"]
+            sentences.append(
+                f"Air quality in {location} is {aq['category']} (AQI {aq['aqi']}, mainly {aq['dominant_pollutant']}). "
+                f"{aq['description']}"
+            )
+        elif intent == "sun" and "sun" in data:
+            sentences.append(self._sun_sentence(location, when, data["sun"]))
         
-        # Default location
-        return "your location"
+        if "current" in data and (intent in ("current", "general") or not sentences):
+            sentences.append(self._current_sentence(location, data["current"]))
+        if intent == "recommendation":
+            sentences.append(self._recommendation_sentence(location, data.get("forecast", {}).get("hourly")))
+        if not sentences:
+            sentences.append(f"I couldn't get the weather for {location} right now.")
+        return " ".join(sentences)
+    
+    @staticmethod
+    def _current_sentence(location: str, current: Dict) -> str:
+        return (
+            f"It's currently {current['temperature']:.0f}°C with {current['description']} in {location} "
+            f"(feels like {current['feels_like']:.0f}°C, humidity {current['humidity']:.0f}%, "
+            f"wind {current['wind_speed']:.1f} m/s)."
+        )
+    
+    @staticmethod
+    def _forecast_sentence(location: str, when: Optional[str], forecast: Dict) -> str:
+        prefix = f"{_capitalize(when)} in {location}" if when else f"The coming days in {location}"
+        hourly = forecast.get("hourly")
+        if hourly:
+            temps = [h["temperature"] for h in hourly]
+            wettest = max(hourly, key=lambda h: h["precipitation_probability"])
+            return (
+                f"{prefix}: {min(temps):.0f}-{max(temps):.0f}°C, {wettest['description']}, "
+                f"up to {wettest['precipitation_probability']}% chance of precipitation."
+            )
+        daily = forecast["daily"]
+        if not daily:
+            return f"{prefix} is beyond the available 5-day forecast."
+        if len(daily) == 1:
+            day = daily[0]
+            return (
+                f"{prefix}: {day['description']}, {day['temp_min']:.0f}-{day['temp_max']:.0f}°C "
+                f"with a {day['precipitation_probability']}% chance of precipitation."
+            )
+        highs = [d["temp_max"] for d in daily]
+        lows = [d["temp_min"] for d in daily]
+        wettest = max(daily, key=lambda d: d["precipitation"])
+        return (
+            f"{prefix}: highs of {min(highs):.0f}-{max(highs):.0f}°C and lows of {min(lows):.0f}-{max(lows):.0f}°C; "
+            f"the wettest day is {wettest['date']} ({wettest['precipitation']} mm, {wettest['description']})."
+        )
+    
+    @staticmethod
+    def _sun_sentence(location: str, when: Optional[str], sun: Dict) -> str:
+        prefix = f"{_capitalize(when)} in {location}" if when else f"In {location}"
+        sentence = f"{prefix}, sunrise is at {sun['sunrise'] or 'n/a'} and sunset at {sun['sunset'] or 'n/a'}"
+        if "uv_index" in sun:
+            sentence += (
+                f"; the UV index is {sun['uv_index']} ({sun['uv_category']}), "
+                f"peaking at {sun['uv_max']} around {sun['uv_max_time']}"
+            )
+        return sentence + "."
+    
+    @staticmethod
+    def _recommendation_sentence(location: str, hours: Optional[List[Dict]]) -> str:
+        """Most comfortable daytime slot: mild feels-like temperature, low rain chance, light wind"""
+        daytime = [h for h in hours or [] if DAYTIME[0] <= int(h["time"][-5:-3]) <= DAYTIME[1]]
+        if not daytime:
+            return (
+                f"Based on weather conditions in {location}, I recommend outdoor activities during morning hours "
+                f"when temperature and humidity are optimal."
+            )
+        best = min(
+            daytime,
+            key=lambda h: abs(h["feels_like"] - 18) + 20 * h["precipitation_probability"] / 100 + h["wind_speed"]
+        )
+        advice = (
+            f"The best time to be outside in {location} is around {best['time'][-5:]} "
+            f"({best['temperature']:.0f}°C, {best['description']}, {best['precipitation_probability']}% chance of rain)."
+        )
+        if max(h["precipitation_probability"] for h in daytime) >= 50:
+            advice += " Take an umbrella."
+        return advice
+
+
+def _place_timezone(place: Dict) -> tzinfo:
+    """The gazetteer place's timezone, else the nominal zone for its longitude"""
+    if place.get("timezone"):
+        try:
+            return ZoneInfo(place["timezone"])
+        except Exception as e:
+            print(f"Unknown timezone {place['timezone']}: {e}")
+    return timezone(timedelta(hours=round(place.get("lon", 0) / 15)))
+
+
+def _describe_when(window: Dict) -> str:
+    """Short phrase for a resolved time expression ("tomorrow evening", "2025-06-14 at 17:00")"""
+    offset, days = window["day_offset"], window["days"]
+    if days > 1:
+        label = f"from {window['start_date']} to {window['end_date']}"
+    else:
+        label = {0: "today", 1: "tomorrow"}.get(offset, window["start_date"])
+    if "hour" in window:
+        return f"{label} at {window['hour']:02d}:00"
+    if "part_of_day" in window and days == 1:
+        if offset == 0 and window["part_of_day"] == "night":
+            return "tonight"
+        return f"{label} {window['part_of_day']}"
+    return label
+
+
+def _capitalize(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
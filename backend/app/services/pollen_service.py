@@ -1,60 +1,126 @@
-from typing import List, Dict
-import random
+from typing import List, Dict, Optional, Sequence
+from datetime import datetime, timezone
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.cache import TTLCache
+from app.services.air_data_providers import (
+    POLLEN_SPECIES,
+    AirDataProvider,
+    HourlySeries,
+    HourlySeriesCache,
+    air_data_provider,
+    batch_response,
+    locator
+)
+
+# Keyed by canonical location and hour, so every spelling and nearby coordinate shares an entry
+pollen_cache = TTLCache(max_entries=settings.weather_cache_max_entries, default_ttl=settings.pollen_cache_ttl)
+
+# Provider species grouped into the categories the API reports
+POLLEN_GROUPS = {"tree": ("alder", "birch", "olive"), "grass": ("grass",), "weed": ("mugwort", "ragweed")}
+
+# Grains/m³ at the top of the low, moderate and high bands, and where very high saturates
+# (National Allergy Bureau scale), mapped linearly onto the 0-30-60-90-100 index bands
+POLLEN_THRESHOLDS = {"tree": (15, 90, 1500, 3000), "grass": (5, 20, 200, 400), "weed": (10, 50, 500, 1000)}
+INDEX_BANDS = (0, 30, 60, 90, 100)
+
+# (upper index, level, color, advice)
+POLLEN_LEVELS = (
+    (30, "Low", "green", "Great day for outdoor activities. Allergy risk is minimal."),
+    (60, "Moderate", "yellow", "Some symptoms possible for sensitive individuals. Monitor your symptoms."),
+    (90, "High", "orange", "Most allergy sufferers will experience symptoms. Consider staying indoors."),
+    (np.inf, "Very High", "red", "Severe symptoms likely. Stay indoors and keep windows closed.")
+)
+
+
+def pollen_level(index: float) -> tuple:
+    """(level, color, advice) for a 0-100 pollen index"""
+    for upper, level, color, advice in POLLEN_LEVELS:
+        if index < upper:
+            return level, color, advice
+    return POLLEN_LEVELS[-1][1:]
 
 
 class PollenService:
     """Service for pollen count and allergy information"""
     
-    async def get_pollen_data(self, location: str) -> Dict:
+    def __init__(self, provider: Optional[AirDataProvider] = None, weather_service=None):
+        provider = provider or air_data_provider
+        # Names the gazetteer does not know are placed by the provider (mock data) or where their forecast is
+        locate = locator(provider, weather_service)
+        self.cache = pollen_cache
+        self.series = HourlySeriesCache(
+            "pollen", pollen_cache, provider.pollen, provider.pollen_many, self._with_indices, locate
+        )
+    
+    async def get_pollen_data(self, location: str, lat: Optional[float] = None, lon: Optional[float] = None) -> Dict:
         """Get current pollen levels"""
-        # Mock pollen data - replace with real allergy API
-        pollen_types = {
-            "tree": random.randint(0, 100),
-            "grass": random.randint(0, 100),
-            "weed": random.randint(0, 100),
-            "mold": random.randint(0, 100)
-        }
+        return self._current(location, await self.series.get(location, lat, lon))
+    
+    async def get_pollen_batch(self, locations: Sequence[str]) -> Dict:
+        """Current pollen levels for many locations, batched into as few upstream requests as possible"""
+        by_cell = await self.series.get_many(locations)
+        return batch_response(locations, by_cell, self._current)
+    
+    async def get_pollen_forecast(self, location: str, days: int = 3) -> List[Dict]:
+        """Get pollen forecast for upcoming days"""
+        hourly = await self.series.get(location)
         
-        # Calculate overall level
-        max_pollen = max(pollen_types.values())
+        # Daily index is the worst hour of the (UTC) day for each group
+        day_index = hourly["time"] // 86400
+        days_present, starts = np.unique(day_index, return_index=True)
+        daily = {group: np.maximum.reduceat(values, starts) for group, values in hourly["indices"].items()}
+        
+        forecast = []
+        for i, day in enumerate(days_present[:days].tolist()):
+            by_group = {group: float(values[i]) for group, values in daily.items()}
+            dominant = max(by_group, key=by_group.get)
+            index = int(round(by_group[dominant]))
+            forecast.append({
+                "day": i + 1,
+                "date": datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%d"),
+                "level": pollen_level(index)[0],
+                "index": index,
+                "dominant_type": dominant
+            })
         
-        if max_pollen < 30:
-            level = "Low"
-            color = "green"
-            advice = "Great day for outdoor activities. Allergy risk is minimal."
-        elif max_pollen < 60:
-            level = "Moderate"
-            color = "yellow"
-            advice = "Some symptoms possible for sensitive individuals. Monitor your symptoms."
-        elif max_pollen < 90:
-            level = "High"
-            color = "orange"
-            advice = "Most allergy sufferers will experience symptoms. Consider staying indoors."
-        else:
-            level = "Very High"
-            color = "red"
-            advice = "Severe symptoms likely. Stay indoors and keep windows closed."
+        return forecast
+    
+    def _current(self, location: str, hourly: Dict) -> Dict:
+        if len(hourly["time"]) == 0:
+            raise ValueError(f"No pollen readings for '{location}'")
+        now = int(np.clip(np.searchsorted(hourly["time"], time.time(), side="right") - 1, 0, len(hourly["time"]) - 1))
+        pollen_types = {group: int(round(float(values[now]))) for group, values in hourly["indices"].items()}
+        dominant = max(pollen_types, key=pollen_types.get)
+        level, color, advice = pollen_level(pollen_types[dominant])
         
         return {
             "location": location,
             "overall_level": level,
-            "overall_index": max_pollen,
+            "overall_index": pollen_types[dominant],
             "color": color,
             "advice": advice,
             "pollen_types": pollen_types,
-            "dominant_type": max(pollen_types.items(), key=lambda x: x[1])[0]
+            "dominant_type": dominant,
+            "concentrations": {
+                species: None if np.isnan(values[now]) else round(float(values[now]), 1)
+                for species, values in hourly["concentrations"].items()
+            },
+            "timestamp": datetime.fromtimestamp(int(hourly["time"][now]), timezone.utc).isoformat()
         }
     
-    async def get_pollen_forecast(self, location: str, days: int = 3) -> List[Dict]:
-        """Get pollen forecast for upcoming days"""
-        forecast = []
-        
-        for i in range(days):
-            forecast.append({
-                "day": i + 1,
-                "date": f"Day {i + 1}",
-                "level": random.choice(["Low", "Moderate", "High"]),
-                "index": random.randint(20, 90)
-            })
-        
-        return forecast
+    @staticmethod
+    def _with_indices(series: HourlySeries) -> Dict:
+        """Hourly grains/m³ per species plus a 0-100 index per group, computed once per fetch"""
+        times, concentrations = series
+        indices = {}
+        for group, species in POLLEN_GROUPS.items():
+            # Missing species (outside the provider's coverage) count as no pollen
+            grains = np.nansum([concentrations[s] for s in species if s in concentrations], axis=0)
+            indices[group] = np.interp(grains, (0,) + POLLEN_THRESHOLDS[group], INDEX_BANDS)
+        return {
+            "time": times,
+            "concentrations": {s: concentrations[s] for s in POLLEN_SPECIES if s in concentrations},
+            "indices": indices
+        }
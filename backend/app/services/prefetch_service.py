@@ -0,0 +1,133 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import time
+from app.core.config import settings
+from app.core.location_keys import canonical_locations
+from app.core.rate_limiter import Priority, request_priority
+from app.services.weather_service import WeatherService, location_access
+
+
+class PrefetchService:
+    """Keeps current weather and forecasts for hot locations warm in the cache.
+
+    The hot set is every user's favorites plus the most requested locations.
+    Each cycle refreshes entries that are missing or about to expire, with
+    bounded concurrency and a cap on upstream calls per cycle.
+    """
+
+    KINDS = ("current", "forecast")
+
+    def __init__(self, weather_service: WeatherService, favorites_source: Callable[[], Awaitable[List[str]]]):
+        self.weather_service = weather_service
+        self.favorites_source = favorites_source
+        self.interval = settings.prefetch_interval
+        self.lead_time = settings.prefetch_lead_time
+        self.top_locations = settings.prefetch_top_locations
+        self.concurrency = settings.prefetch_concurrency
+        self.max_per_cycle = settings.prefetch_max_per_cycle
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {
+            "cycles": 0,
+            "refreshed": 0,
+            "errors": 0,
+            "skipped_budget": 0,
+            "hot_set_size": 0,
+            "last_cycle_seconds": 0.0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "last_run": None
+        }
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                print(f"Prefetch cycle failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def hot_set(self) -> List[str]:
+        """Favorites first, then trending locations, deduplicated by cache key"""
+        favorites = await self.favorites_source()
+        trending = [location for location, _ in location_access.most_common(self.top_locations)]
+
+        locations = []
+        seen = set()
+        for location in favorites + trending:
+            key = canonical_locations.key(location)
+            if key not in seen:
+                seen.add(key)
+                locations.append(location)
+
+        return locations
+
+    async def run_cycle(self) -> Dict:
+        """Refresh every hot entry that is missing or due to expire within the lead time"""
+        started = time.monotonic()
+        locations = await self.hot_set()
+
+        due = []
+        for location in locations:
+            for kind in self.KINDS:
+                entry = self.weather_service.cache_entry(kind, location)
+                if entry is None:
+                    # Cold entries have no refresh deadline to lag behind
+                    due.append((float("inf"), None, kind, location))
+                elif entry.ttl_remaining <= self.lead_time:
+                    # Lag: how far past the ideal refresh point (expiry - lead time) we are
+                    lag = self.lead_time - entry.ttl_remaining
+                    due.append((lag, lag, kind, location))
+
+        # Cold and most overdue entries first, so the budget goes where it matters
+        due.sort(key=lambda item: item[0], reverse=True)
+        self.metrics["skipped_budget"] += max(0, len(due) - self.max_per_cycle)
+        due = due[:self.max_per_cycle]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(_, lag: Optional[float], kind: str, location: str) -> None:
+            async with semaphore:
+                try:
+                    # Prefetch yields upstream quota to interactive requests
+                    with request_priority(Priority.BACKGROUND):
+                        await self.weather_service.refresh(kind, location)
+                    self.metrics["refreshed"] += 1
+                    if lag is not None:
+                        self.metrics["last_lag_seconds"] = round(lag, 2)
+                        self.metrics["max_lag_seconds"] = max(self.metrics["max_lag_seconds"], round(lag, 2))
+                except Exception as e:
+                    self.metrics["errors"] += 1
+                    print(f"Prefetch failed for {kind} {location}: {e}")
+
+        await asyncio.gather(*(refresh(*item) for item in due))
+        self._decay_access_counts()
+
+        self.metrics["cycles"] += 1
+        self.metrics["hot_set_size"] = len(locations)
+        self.metrics["last_cycle_seconds"] = round(time.monotonic() - started, 3)
+        self.metrics["last_run"] = datetime.now().isoformat()
+        return self.metrics
+
+    def _decay_access_counts(self) -> None:
+        """Halve request counts each cycle so the trending set follows recent traffic"""
+        for location in list(location_access):
+            location_access[location] //= 2
+            if location_access[location] == 0:
+                del location_access[location]
+
+    def stats(self) -> Dict:
+        return {"running": self._task is not None, **self.metrics}
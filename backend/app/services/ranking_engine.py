@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Sequence
+import math
+import numpy as np
+
+# Scored features: (record field, "prefer low" preference flag, points lost per unit away from target)
+FEATURES = (
+    ("temperature", None, 10.0),
+    ("humidity", "low_humidity", 1.0),
+    ("wind_speed", "low_wind", 5.0),
+    ("rain", "low_rain", 20.0),
+    ("aqi", "low_aqi", 0.5),
+    ("uv_index", "low_uv", 10.0),
+)
+FEATURE_NAMES = tuple(name for name, _, _ in FEATURES)
+SCALES = np.array([scale for _, _, scale in FEATURES], dtype=np.float32)
+
+
+def _finite_number(value: Any, field: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{field} must be a finite number, got {value!r}")
+    return float(value)
+
+
+def validate_preferences(preferences: Dict) -> None:
+    """Raise ValueError unless ``ideal_temperature`` is a number and ``weights`` maps names to numbers >= 0"""
+    if "ideal_temperature" in preferences:
+        _finite_number(preferences["ideal_temperature"], "ideal_temperature")
+    weights = preferences.get("weights", {})
+    if not isinstance(weights, dict):
+        raise ValueError("weights must be an object mapping feature names to numbers")
+    for name, weight in weights.items():
+        if _finite_number(weight, f"weights.{name}") < 0:
+            raise ValueError(f"weights.{name} must not be negative")
+
+
+def profile_vectors(preferences: Dict) -> tuple:
+    """Turn a preference dict into (weights, targets) vectors over FEATURES.
+
+    Temperature is always scored against ``ideal_temperature`` (default 22°C).
+    Every other feature is scored against 0 when its ``low_*`` flag is set.
+    An optional ``weights`` dict overrides the per-feature weight.
+    Malformed preferences raise ValueError.
+    """
+    validate_preferences(preferences)
+    weights = np.zeros(len(FEATURES), dtype=np.float32)
+    targets = np.zeros(len(FEATURES), dtype=np.float32)
+    for j, (name, flag, _) in enumerate(FEATURES):
+        if flag is None or preferences.get(flag, False):
+            weights[j] = 1.0
+    targets[0] = preferences.get("ideal_temperature", 22)
+
+    for name, weight in preferences.get("weights", {}).items():
+        if name in FEATURE_NAMES:
+            weights[FEATURE_NAMES.index(name)] = weight
+    return weights, targets
+
+
+class DestinationRanker:
+    """Scores candidate cities against weather preferences with array operations.
+
+    Candidate weather is held as an (n_cities, n_features) float32 matrix; a
+    feature scores ``max(0, 100 - |value - target| * scale)`` and a city's score
+    is the weighted sum over features. Missing values score 0. Many preference
+    profiles are scored at once as a (profiles x cities) matrix.
+    """
+
+    def __init__(self, names: Sequence[str], values: np.ndarray, records: Optional[List[Dict]] = None):
+        self.names = list(names)
+        self.values = values.astype(np.float32)
+        self.records = records
+        # Components for "prefer low" scoring don't depend on the profile; compute them once
+        self._low_components = self._components(self.values, np.zeros(len(FEATURES), dtype=np.float32))
+
+    @staticmethod
+    def _components(values: np.ndarray, targets: np.ndarray, scales: np.ndarray = SCALES) -> np.ndarray:
+        """Per-feature points: 100 minus the scaled distance from target, floored at 0"""
+        components = np.clip(100 - np.abs(values - targets) * scales, 0, None)
+        return np.nan_to_num(components, nan=0.0)
+
+    @classmethod
+    def from_records(cls, records: List[Dict], name_field: str = "city") -> "DestinationRanker":
+        values = np.array(
+            [[record.get(name, np.nan) for name in FEATURE_NAMES] for record in records],
+            dtype=np.float32
+        ).reshape(len(records), len(FEATURES))
+        return cls([record[name_field] for record in records], values, records)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def score_profiles(self, profiles: List[Dict]) -> np.ndarray:
+        """Scores for every (profile, city) pair, shape (n_profiles, n_cities).
+
+        Features every profile scores against 0 reduce to one matrix product
+        with the precomputed components; features with per-profile targets
+        (e.g. ideal temperature) are broadcast over (profile, city).
+        """
+        vectors = [profile_vectors(p) for p in profiles]
+        weights = np.stack([w for w, _ in vectors])  # (p, f)
+        targets = np.stack([t for _, t in vectors])  # (p, f)
+
+        fixed = np.all(targets == 0, axis=0)
+        scores = weights[:, fixed] @ self._low_components[:, fixed].T
+        for j in np.flatnonzero(~fixed):
+            components = self._components(self.values[None, :, j], targets[:, j, None], SCALES[j])
+            scores += weights[:, j, None] * components
+        return scores
+
+    def score(self, preferences: Dict) -> np.ndarray:
+        return self.score_profiles([preferences])[0]
+
+    def top_k_indices(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best scores (last axis), best first, via partial selection"""
+        k = min(k, scores.shape[-1])
+        if k <= 0:
+            return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+        if k < scores.shape[-1]:
+            candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape).copy()
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=-1)
+
+    def top_k(self, preferences: Dict, k: int = 10) -> List[Dict]:
+        return self.top_k_profiles([preferences], k)[0]
+
+    def top_k_profiles(self, profiles: List[Dict], k: int = 10) -> List[List[Dict]]:
+        """Best k cities for each profile"""
+        scores = self.score_profiles(profiles)
+        best = self.top_k_indices(scores, k)
+        return [
+            [self._result(i, scores[p, i]) for i in best[p]]
+            for p in range(len(profiles))
+        ]
+
+    def _result(self, index: int, score: float) -> Dict:
+        base = self.records[index] if self.records is not None else {"city": self.names[index]}
+        return {**base, "score": round(float(score), 1)}
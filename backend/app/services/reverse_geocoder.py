@@ -0,0 +1,73 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km; accepts scalars or broadcastable arrays of degrees"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def unit_vectors(lats, lons) -> np.ndarray:
+    """(n, 3) points on the unit sphere for arrays of lat/lon degrees"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class ReverseGeocoder:
+    """Nearest-place lookup over a gazetteer's coordinates.
+
+    Places are indexed as 3-D unit vectors in a KD-tree. Straight-line (chord)
+    distance between unit vectors grows monotonically with great-circle
+    distance, so the Euclidean nearest neighbours are the true nearest places,
+    with no distortion near the poles or the antimeridian; chords are converted
+    to haversine kilometres on the way out. The tree is built on first use,
+    keeping service startup free.
+    """
+
+    def __init__(self, gazetteer, leaf_size: int = 16):
+        self.gazetteer = gazetteer
+        self.leaf_size = leaf_size
+        self._tree: Optional[cKDTree] = None
+
+    @property
+    def tree(self) -> cKDTree:
+        if self._tree is None:
+            self._tree = cKDTree(unit_vectors(self.gazetteer.lat, self.gazetteer.lon), leafsize=self.leaf_size)
+        return self._tree
+
+    def query(self, lats: Sequence[float], lons: Sequence[float], k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances (km) and place indices of the k nearest places for each point.
+
+        Both results have shape (n_points, k), nearest first.
+        """
+        k = min(k, len(self.gazetteer))
+        points = unit_vectors(lats, lons)
+        if k <= 0 or not len(points):
+            return np.empty((len(points), 0)), np.empty((len(points), 0), dtype=np.intp)
+        chords, indices = self.tree.query(points, k=k)
+        chords, indices = chords.reshape(len(points), k), indices.reshape(len(points), k)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0, 1)), indices
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_distance_km: Optional[float] = None) -> List[Dict]:
+        return self.nearest_batch([(lat, lon)], k, max_distance_km)[0]
+
+    def nearest_batch(self, coordinates: Sequence[Tuple[float, float]], k: int = 1,
+                      max_distance_km: Optional[float] = None) -> List[List[Dict]]:
+        """Nearest k places (with ``distance_km``) for every (lat, lon), in one tree query"""
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        distances, indices = self.query(coords[:, 0], coords[:, 1], k)
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            places = []
+            for distance, index in zip(row_distances.tolist(), row_indices.tolist()):
+                if max_distance_km is not None and distance > max_distance_km:
+                    break
+                places.append({**self.gazetteer.place(index), "distance_km": round(distance, 2)})
+            results.append(places)
+        return results
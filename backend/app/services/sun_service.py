@@ -1,72 +1,171 @@
-from typing import Dict
-from datetime import datetime, timedelta
-import random
-import math
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.location_keys import canonical_locations
+from app.services.astronomy import MOON_EMOJI, MOON_PHASES, moon_phase, sun_day, sun_times
+from app.services.synthetic_weather import synthetic_weather
+from app.services.uv_model import uv_category, uv_index
+
+# Keyed by canonical location (geohash cell for raw coordinates) and date
+sun_cache = TTLCache(max_entries=settings.weather_cache_max_entries, default_ttl=settings.sun_cache_ttl)
+
+POLAR_STATES = {1: "midnight_sun", -1: "polar_night", 0: None}
 
 
 class SunService:
     """Service for UV index and sun times"""
     
-    async def get_sun_data(self, location: str, lat: float = 0, lon: float = 0) -> Dict:
+    def __init__(self, location_service=None, weather_service=None):
+        self.cache = sun_cache
+        self.location_service = location_service
+        self.weather_service = weather_service
+    
+    async def get_sun_data(self, location: str, lat: Optional[float] = None, lon: Optional[float] = None) -> Dict:
         """Get UV index, sunrise, and sunset times"""
-        # Mock data - replace with real API
-        now = datetime.now()
+        data, uv_times, uv_values = await self._sun_day_data(location, lat, lon)
+        uv_now = round(float(np.interp(time.time(), uv_times, uv_values)), 1)
+        category, recommendation = uv_category(uv_now)
         
-        # Calculate approximate sunrise/sunset (simplified)
-        sunrise = now.replace(hour=6, minute=30, second=0)
-        sunset = now.replace(hour=18, minute=45, second=0)
+        return {
+            "location": location,
+            **data,
+            "uv_index": uv_now,
+            "uv_category": category,
+            "uv_recommendation": recommendation,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    
+    async def get_current_uv(self, location: str, lat: Optional[float] = None, lon: Optional[float] = None) -> float:
+        """Current UV index, from the same cached hourly curve as /sun"""
+        _, uv_times, uv_values = await self._sun_day_data(location, lat, lon)
+        return round(float(np.interp(time.time(), uv_times, uv_values)), 1)
+    
+    async def _sun_day_data(self, location: str, lat: Optional[float], lon: Optional[float]) -> Tuple:
+        """Today's sun times and hourly UV curve for a location, cached per cell and local date"""
+        cell = canonical_locations.key(location, lat, lon)
+        lat, lon = await self._coordinates(location, cell)
+        zone = self._timezone(lat, lon)
+        today = datetime.now(zone).date()
         
-        # UV index (0-11+ scale)
-        uv_index = random.uniform(0, 11)
+        key = ("sun", cell, today)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = await self._compute_sun_day(location, today, lat, lon, zone)
+            self.cache.set(key, cached)
+        return cached
+    
+    async def get_sun_calendar(self, location: str, lat: Optional[float] = None, lon: Optional[float] = None,
+                               days: int = 30) -> List[Dict]:
+        """Sunrise, sunset, solar noon and day length for each of the next ``days`` days"""
+        lat, lon = await self._coordinates(location, canonical_locations.key(location, lat, lon))
+        zone = self._timezone(lat, lon)
+        start = np.datetime64(datetime.now(zone).date(), "D")
+        dates = start + np.arange(days)
+        times = sun_times(dates, lat, lon)
         
-        if uv_index < 3:
-            uv_category = "Low"
-            uv_recommendation = "No protection needed"
-        elif uv_index < 6:
-            uv_category = "Moderate"
-            uv_recommendation = "Wear sunscreen SPF 30+"
-        elif uv_index < 8:
-            uv_category = "High"
-            uv_recommendation = "Protection essential. Wear sunscreen SPF 30+, hat, and sunglasses"
-        elif uv_index < 11:
-            uv_category = "Very High"
-            uv_recommendation = "Extra protection required. Avoid sun during midday hours"
-        else:
-            uv_category = "Extreme"
-            uv_recommendation = "Take all precautions. Avoid sun exposure"
+        calendar = []
+        for i, day in enumerate(dates.tolist()):
+            calendar.append({
+                "date": day.isoformat(),
+                "sunrise": self._local_time(times["sunrise"][i].item(), zone),
+                "sunset": self._local_time(times["sunset"][i].item(), zone),
+                "solar_noon": self._local_time(times["solar_noon"][i].item(), zone),
+                "day_length": self._format_duration(float(times["day_length"][i])),
+                "polar": POLAR_STATES[int(times["polar"][i])]
+            })
+        return calendar
+    
+    async def _compute_sun_day(self, location: str, day: date, lat: float, lon: float, zone: tzinfo) -> Tuple:
+        times = sun_day(day, lat, lon)
+        uv_times, uv_values, cloud_adjusted = await self._uv_curve(location, day, lat, lon, zone)
+        peak = int(np.argmax(uv_values))
         
-        # Calculate day length
-        day_length = sunset - sunrise
-        hours = day_length.seconds // 3600
-        minutes = (day_length.seconds % 3600) // 60
+        data = {
+            "date": day.isoformat(),
+            "timezone": str(zone),
+            "sunrise": self._local_time(times["sunrise"], zone),
+            "sunset": self._local_time(times["sunset"], zone),
+            "solar_noon": self._local_time(times["solar_noon"], zone),
+            "day_length": self._format_duration(times["day_length"]),
+            "polar": POLAR_STATES[times["polar"]],
+            "uv_max": round(float(uv_values[peak]), 1),
+            "uv_max_time": datetime.fromtimestamp(int(uv_times[peak]), zone).strftime("%H:%M"),
+            "uv_cloud_adjusted": cloud_adjusted,
+            "uv_hourly": [
+                {"time": datetime.fromtimestamp(int(t), zone).strftime("%H:%M"), "uv_index": round(float(v), 1)}
+                for t, v in zip(uv_times.tolist(), uv_values.tolist())
+            ]
+        }
+        return data, uv_times, uv_values
+    
+    async def _uv_curve(self, location: str, day: date, lat: float, lon: float, zone: tzinfo) -> Tuple:
+        """Hourly UV over the local day, with cloud cover from the cached forecast when available"""
+        midnight = int(datetime.combine(day, datetime.min.time(), zone).timestamp())
+        uv_times = midnight + 3600 * np.arange(24, dtype=np.int64)
         
-        # Solar noon (midpoint between sunrise and sunset)
-        solar_noon = sunrise + (sunset - sunrise) / 2
+        clouds = None
+        if self.weather_service is not None:
+            try:
+                parsed = await self.weather_service.get_parsed_forecast(location)
+                clouds = parsed.hourly(24, midnight)["clouds"]
+            except Exception as e:
+                print(f"No cloud forecast for {location}, using clear-sky UV: {e}")
         
-        return {
-            "location": location,
-            "sunrise": sunrise.strftime("%H:%M"),
-            "sunset": sunset.strftime("%H:%M"),
-            "solar_noon": solar_noon.strftime("%H:%M"),
-            "day_length": f"{hours}h {minutes}m",
-            "uv_index": round(uv_index, 1),
-            "uv_category": uv_category,
-            "uv_recommendation": uv_recommendation,
-            "timestamp": now.isoformat()
-        }
+        return uv_times, uv_index(uv_times, lat, lon, clouds), clouds is not None
+    
+    async def _coordinates(self, location: str, cell: str) -> Tuple[float, float]:
+        """Coordinates behind a canonical key (the cell center, shared by everyone in the cell).
+        
+        Names the gazetteer does not know have no cell; they use the position
+        the location's forecast is for, as the weather endpoints do. Without
+        an API key that is the mock weather's pseudo-position for the name.
+        """
+        center = canonical_locations.cell_center(cell)
+        if center is not None:
+            return center
+        if not settings.openweather_api_key:
+            _, lat, lon = synthetic_weather.location_seed(location)
+            return lat, lon
+        if self.weather_service is not None:
+            coordinates = await self.weather_service.get_coordinates(location)
+            if coordinates is not None:
+                return coordinates
+        raise ValueError(f"Unknown location '{location}'; pass lat and lon")
+    
+    def _timezone(self, lat: float, lon: float) -> tzinfo:
+        """Timezone of the nearest known place, else the nominal zone for the longitude"""
+        if self.location_service is not None:
+            place = self.location_service.get_location_details_batch([(lat, lon)])[0]
+            if place.get("timezone"):
+                try:
+                    return ZoneInfo(place["timezone"])
+                except Exception as e:
+                    print(f"Unknown timezone {place['timezone']}: {e}")
+        return timezone(timedelta(hours=round(lon / 15)))
+    
+    @staticmethod
+    def _local_time(value: Optional[datetime], zone: tzinfo) -> Optional[str]:
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc).astimezone(zone).strftime("%H:%M")
+    
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        minutes = int(round(seconds / 60))
+        return f"{minutes // 60}h {minutes % 60}m"
     
     async def get_moon_phase(self) -> Dict:
         """Get current moon phase"""
-        phases = [
-            "New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous",
-            "Full Moon", "Waning Gibbous", "Last Quarter", "Waning Crescent"
-        ]
-        
-        # Simplified moon phase calculation
-        phase_index = random.randint(0, 7)
+        moon = moon_phase(np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), "s"))
+        phase_index = int(moon["phase_index"])
         
         return {
-            "phase": phases[phase_index],
-            "illumination": random.randint(0, 100),
-            "emoji": "🌑🌒🌓🌔🌕🌖🌗🌘"[phase_index]
+            "phase": MOON_PHASES[phase_index],
+            "illumination": int(round(float(moon["illumination"]) * 100)),
+            "age_days": round(float(moon["age_days"]), 1),
+            "emoji": MOON_EMOJI[phase_index]
         }
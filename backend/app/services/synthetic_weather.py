@@ -0,0 +1,246 @@
+import zlib
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.location_keys import canonical_locations
+
+# Channels of independent noise; each is a separate stream per location
+_TEMPERATURE, _PRESSURE, _MOISTURE, _WIND, _WIND_DIRECTION, _SHOWERS, _CLIMATE = range(7)
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer over uint64 arrays (wrapping arithmetic)"""
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+def hash_uniform(seed: int, channel: int, counters: np.ndarray) -> np.ndarray:
+    """Uniform [0, 1) values that depend only on (seed, channel, counter).
+
+    Counter-based rather than sequential, so any slice of time can be
+    generated on its own and still agree with every other slice.
+    """
+    with np.errstate(over="ignore"):
+        key = _mix(np.uint64(seed & 0xFFFFFFFFFFFFFFFF) * _GOLDEN + np.uint64(channel))
+        x = _mix(np.asarray(counters, dtype=np.int64).astype(np.uint64) * _GOLDEN + key)
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def value_noise(seed: int, channel: int, hours: np.ndarray, period: float) -> np.ndarray:
+    """Smooth noise in [-1, 1]: random knots every ``period`` hours joined by smoothstep"""
+    position = hours / period
+    knot = np.floor(position)
+    fraction = position - knot
+    fraction = fraction * fraction * (3 - 2 * fraction)
+    knot = knot.astype(np.int64)
+    if knot.size == 0:
+        return fraction
+    # Hash each knot once (a window has far fewer knots than hours), then gather
+    first = int(knot.min())
+    table = 2 * hash_uniform(seed, channel, np.arange(first, int(knot.max()) + 2)) - 1
+    left = table[knot - first]
+    right = table[knot - first + 1]
+    return left + (right - left) * fraction
+
+
+def _saturation_vapour_pressure(temp_c: np.ndarray) -> np.ndarray:
+    """hPa, Magnus formula"""
+    return 6.112 * np.exp(17.62 * temp_c / (243.12 + temp_c))
+
+
+class SyntheticWeather:
+    """Deterministic, physically coherent weather for running without an API key.
+
+    Every value is a pure function of (seed, location, time): a climate set
+    by latitude and season, a diurnal cycle in local solar time damped by
+    cloud, and multi-day weather systems from smooth counter-based noise. The
+    pressure anomaly drives cloud, rain and wind; humidity follows from a
+    slowly varying dew point, so it falls as the afternoon warms. Whole
+    windows are produced with array arithmetic (years of hours in a few ms),
+    and overlapping windows always agree.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = settings.synthetic_weather_seed if seed is None else seed
+
+    def location_seed(self, location: Optional[str] = None, lat: Optional[float] = None,
+                      lon: Optional[float] = None) -> Tuple[int, float, float]:
+        """(seed, lat, lon) for a place.
+
+        Unknown names get stable pseudo-coordinates in the mid-latitudes and
+        then behave exactly like that cell, so mock series fetched by those
+        coordinates (air quality, pollen, UV) agree with the mock weather.
+        """
+        key = canonical_locations.key(location, lat, lon)
+        center = canonical_locations.cell_center(key)
+        if center is None:
+            u = hash_uniform(zlib.crc32(key.encode()) ^ (self.seed * 0x9E3779B1), _CLIMATE, np.array([0, 1]))
+            key = canonical_locations.cell_key(float(25 + 30 * u[0]), float(360 * u[1] - 180))
+            center = canonical_locations.cell_center(key)
+        seed = zlib.crc32(key.encode()) ^ (self.seed * 0x9E3779B1)
+        return seed, center[0], center[1]
+
+    def hourly(self, location: Optional[str], times: np.ndarray, lat: Optional[float] = None,
+               lon: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Weather at each UTC epoch-second in ``times``.
+
+        Returns arrays for temp, feels_like, humidity, dew_point, pressure,
+        clouds (%), wind_speed (m/s), wind_deg, visibility (m), pop (0-1),
+        rain and snow (mm/h) and description.
+        """
+        seed, lat, lon = self.location_seed(location, lat, lon)
+        times = np.asarray(times, dtype=np.int64)
+        hours = times / 3600.0
+        day_of_year = (times % 31557600) / 86400.0
+        local_hour = (hours + lon / 15.0) % 24
+
+        # Climate: warm tropics, cold poles, seasons that grow with latitude and peak a month after the solstice
+        climate = hash_uniform(seed, _CLIMATE, np.arange(4))
+        phi = np.radians(lat)
+        annual_mean = 28 - 0.55 * max(abs(lat) - 18, 0) + 4 * (climate[0] - 0.5)
+        season_peak = 200 if lat >= 0 else 17
+        seasonal = 0.2 * abs(lat) * np.cos(2 * np.pi * (day_of_year - season_peak) / 365.25)
+        humid_climate = 0.3 + 0.5 * climate[1]
+
+        # Weather systems: a 4-day pressure wave with a faster component; lows bring cloud, rain and wind
+        pressure_anomaly = 0.75 * value_noise(seed, _PRESSURE, hours, 96) + 0.25 * value_noise(seed, _PRESSURE + 16, hours, 20)
+        moisture = 0.7 * value_noise(seed, _MOISTURE, hours, 30) + 0.3 * value_noise(seed, _MOISTURE + 16, hours, 7)
+        cloud_fraction = 1 / (1 + np.exp(-(2.8 * (humid_climate - 0.5) - 3.2 * pressure_anomaly + 2.2 * moisture)))
+
+        # Day-to-day swings are small in the tropics and grow towards the poles
+        synoptic = (
+            (0.3 + 0.7 * abs(np.sin(phi))) * 3.5 * value_noise(seed, _TEMPERATURE, hours, 72)
+            + value_noise(seed, _TEMPERATURE + 16, hours, 11)
+        )
+        diurnal_range = (5 + 4 * (1 - humid_climate)) * (1 - 0.65 * cloud_fraction)
+        diurnal = diurnal_range / 2 * np.cos(2 * np.pi * (local_hour - 15) / 24)
+        temp = annual_mean + seasonal + synoptic + diurnal
+
+        # The dew point follows the day's mean temperature, so relative humidity peaks at dawn
+        dew_depression = np.clip(2 + 9 * (1 - humid_climate) * (1 - cloud_fraction) + diurnal_range / 2, 0.5, None)
+        dew_point = annual_mean + seasonal + synoptic - dew_depression
+        humidity = np.clip(100 * _saturation_vapour_pressure(dew_point) / _saturation_vapour_pressure(temp), 5, 100)
+
+        pressure = 1013 - 4 * abs(np.sin(phi)) + 14 * pressure_anomaly + 0.6 * np.cos(2 * np.pi * (local_hour - 10) / 12)
+
+        showers = hash_uniform(seed, _SHOWERS, np.floor(hours).astype(np.int64))
+        rain_potential = np.clip((cloud_fraction - 0.72) / 0.28, 0, 1)
+        pop = np.round(np.clip(rain_potential * 1.1, 0, 1), 2)
+        precipitation = np.where(showers < pop, 4 * rain_potential ** 2 * (0.3 + showers), 0.0)
+        frozen = temp < 0.5
+        rain = np.where(frozen, 0.0, precipitation)
+        snow = np.where(frozen, precipitation, 0.0)
+
+        gusty = np.clip(np.abs(pressure_anomaly) + 0.5 * np.abs(value_noise(seed, _WIND, hours, 9)), 0, None)
+        wind_speed = (1.2 + 6.5 * gusty ** 1.3) * (1 + 0.25 * np.cos(2 * np.pi * (local_hour - 14) / 24))
+        # Prevailing westerlies outside the tropics, easterly trades inside, veering as systems pass
+        prevailing = 270 if 25 <= abs(lat) <= 65 else 90
+        wind_deg = (prevailing + 120 * value_noise(seed, _WIND_DIRECTION, hours, 40)) % 360
+
+        visibility = np.clip(
+            10000 * (1 - 0.55 * np.clip(precipitation / 4, 0, 1)) * np.where(humidity > 97, 0.25, 1.0), 200, 10000
+        )
+
+        # Apparent temperature (Steadman), wind in m/s
+        vapour = humidity / 100 * _saturation_vapour_pressure(temp)
+        feels_like = temp + 0.33 * vapour - 0.7 * wind_speed - 4.0
+
+        clouds = np.round(100 * cloud_fraction)
+        return {
+            "time": times,
+            "temp": temp,
+            "feels_like": feels_like,
+            "humidity": humidity,
+            "dew_point": dew_point,
+            "pressure": pressure,
+            "clouds": clouds,
+            "wind_speed": wind_speed,
+            "wind_deg": wind_deg,
+            "visibility": visibility,
+            "pop": pop,
+            "rain": rain,
+            "snow": snow,
+            "description": describe(clouds, rain, snow)
+        }
+
+    def hours(self, location: Optional[str], start: int, count: int, step: int = 3600,
+              lat: Optional[float] = None, lon: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """``count`` evenly spaced instants from ``start`` (epoch seconds)"""
+        return self.hourly(location, start + step * np.arange(count, dtype=np.int64), lat, lon)
+
+    def daily(self, location: Optional[str], first_day: int, days: int, lat: Optional[float] = None,
+              lon: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Per-UTC-day aggregates from the hourly series; ``first_day`` counts days since the epoch"""
+        series = self.hours(location, first_day * 86400, days * 24, lat=lat, lon=lon)
+        shaped = {field: series[field].reshape(days, 24) for field in ("temp", "humidity", "wind_speed", "rain", "snow")}
+        return {
+            "day": first_day + np.arange(days),
+            "temp_avg": shaped["temp"].mean(axis=1),
+            "temp_max": shaped["temp"].max(axis=1),
+            "temp_min": shaped["temp"].min(axis=1),
+            "humidity": shaped["humidity"].mean(axis=1),
+            "precipitation": (shaped["rain"] + shaped["snow"]).sum(axis=1),
+            "wind_speed": shaped["wind_speed"].mean(axis=1)
+        }
+
+    def noise(self, location: Optional[str], channel: int, hours: np.ndarray, period: float,
+              lat: Optional[float] = None, lon: Optional[float] = None) -> np.ndarray:
+        """Smooth [-1, 1] noise for other mock series (pollutants, pollen) tied to the same location seed"""
+        seed, _, _ = self.location_seed(location, lat, lon)
+        return value_noise(seed, 64 + channel, np.asarray(hours, dtype=np.float64), period)
+
+    def forecast_payload(self, location: str, start: int, slots: int = 40) -> Dict:
+        """A 5-day/3-hour forecast in the OpenWeatherMap shape"""
+        _, lat, lon = self.location_seed(location)
+        s = self.hours(location, start, slots, step=10800)
+        columns = {field: np.round(s[field], 1).tolist() for field in ("temp", "feels_like", "wind_speed", "rain", "snow")}
+        rounded = {field: np.round(s[field]).astype(int).tolist() for field in ("pressure", "humidity", "clouds", "wind_deg", "visibility")}
+
+        items = []
+        for i, dt in enumerate(s["time"].tolist()):
+            item = {
+                "dt": dt,
+                "main": {
+                    "temp": columns["temp"][i],
+                    "feels_like": columns["feels_like"][i],
+                    "temp_min": columns["temp"][i],
+                    "temp_max": columns["temp"][i],
+                    "pressure": rounded["pressure"][i],
+                    "humidity": rounded["humidity"][i]
+                },
+                "weather": [{"description": s["description"][i]}],
+                "clouds": {"all": rounded["clouds"][i]},
+                "wind": {"speed": columns["wind_speed"][i], "deg": rounded["wind_deg"][i]},
+                "visibility": rounded["visibility"][i],
+                "pop": float(s["pop"][i])
+            }
+            if columns["rain"][i]:
+                item["rain"] = {"3h": round(columns["rain"][i] * 3, 1)}
+            if columns["snow"][i]:
+                item["snow"] = {"3h": round(columns["snow"][i] * 3, 1)}
+            items.append(item)
+
+        return {
+            "list": items,
+            "city": {"name": location, "timezone": int(round(lon / 15)) * 3600, "coord": {"lat": lat, "lon": lon}}
+        }
+
+
+def describe(clouds: np.ndarray, rain: np.ndarray, snow: np.ndarray) -> np.ndarray:
+    """OpenWeatherMap-style descriptions from cloud cover (%) and precipitation (mm/h)"""
+    sky = np.array(["clear sky", "few clouds", "scattered clouds", "broken clouds", "overcast clouds"], dtype=object)
+    description = sky[np.searchsorted([12, 35, 60, 85], clouds, side="right")]
+    for amounts, kind in ((rain, "rain"), (snow, "snow")):
+        intensity = np.searchsorted([0, 1, 4], amounts, side="left")
+        wet = amounts > 0
+        labels = np.array(["", f"light {kind}", f"moderate {kind}", f"heavy {kind}"], dtype=object)
+        description = np.where(wet, labels[np.minimum(intensity, 3)], description)
+    return description
+
+
+synthetic_weather = SyntheticWeather()
@@ -1,6 +1,60 @@
-import httpx
-from typing import Dict, List
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+import numpy as np
 from app.core.config import settings
+from app.core.cache import CacheEntry, TTLCache
+from app.core.http_client import upstream_client
+from app.core.location_keys import canonical_locations, normalize_location
+from app.core.rate_limiter import rate_limiters
+from app.core.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, hedged, is_upstream_failure
+from app.core.singleflight import SingleFlight
+from app.services.forecast_data import ParsedForecast
+from app.services.synthetic_weather import synthetic_weather
+
+# Shared by every WeatherService instance so all endpoints hit the same entries.
+# Expired entries are retained for the longest stale window we may serve them in.
+weather_cache = TTLCache(
+    max_entries=settings.weather_cache_max_entries,
+    default_ttl=settings.weather_cache_ttl,
+    stale_ttl=max(settings.weather_cache_stale_ttl, settings.weather_cache_stale_if_error_ttl)
+)
+weather_flights = SingleFlight()
+
+# Upstream health guards, shared so every instance sees the same breaker state
+openweather_breaker = CircuitBreaker(
+    "openweathermap",
+    failure_rate=settings.breaker_failure_rate,
+    min_calls=settings.breaker_min_calls,
+    window=settings.breaker_window,
+    open_seconds=settings.breaker_open_seconds,
+    half_open_calls=settings.breaker_half_open_calls
+)
+openweather_retry_budget = RetryBudget(
+    ratio=settings.retry_budget_ratio,
+    max_tokens=settings.retry_budget_max_tokens
+)
+
+# Request counts per normalized location, used to find trending places to prefetch
+location_access: Counter = Counter()
+
+
+def record_location_access(location: str) -> None:
+    """Count a request for ``location``, trimming to the most requested half past the cap.
+
+    Every distinct raw location string gets a counter, so without the cap the
+    counts would grow with the set of strings ever requested.
+    """
+    location_access[normalize_location(location)] += 1
+    if len(location_access) > settings.location_access_max_entries:
+        keep = location_access.most_common(settings.location_access_max_entries // 2)
+        location_access.clear()
+        location_access.update(dict(keep))
+
+# Strong references to background revalidations so they are not garbage collected
+_background_refreshes: Set[asyncio.Task] = set()
 
 
 class WeatherService:
@@ -9,73 +63,236 @@ class WeatherService:
     def __init__(self):
         self.api_key = settings.openweather_api_key
         self.base_url = "https://api.openweathermap.org/data/2.5"
+        self.http = upstream_client
+        self.rate_limiter = rate_limiters["openweathermap"]
+        self.cache = weather_cache
+        self.flights = weather_flights
+        self.stale_while_revalidate = settings.weather_cache_stale_ttl
+        self.stale_if_error = settings.weather_cache_stale_if_error_ttl
+        self.breaker = openweather_breaker
+        self.retry_budget = openweather_retry_budget
     
     async def get_current_weather(self, location: str) -> Dict:
+        """Get current weather, served from cache when fresh"""
+        data, _ = await self.get_current_weather_with_meta(location)
+        return data
+    
+    async def get_current_weather_with_meta(self, location: str) -> Tuple[Dict, Dict]:
+        """Get current weather along with its cache age/staleness"""
+        key = ("current", canonical_locations.key(location))
+        record_location_access(location)
+        data, meta = await self._cached(
+            key,
+            lambda: self._fetch_current_weather(location),
+            fallback=lambda: self._get_mock_current_weather(location)
+        )
+        return {**data, "location": location}, meta
+    
+    async def get_current_weather_batch(self, locations: List[str], fields: Optional[List[str]] = None) -> Dict:
+        """Current weather for many locations in one call.
+        
+        Spellings that resolve to the same place are fetched once, cache hits
+        are answered immediately, and misses are fetched concurrently with at
+        most ``batch_concurrency`` upstream calls in flight. Failures are
+        reported per location instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(settings.batch_concurrency)
+        unique: Dict[str, str] = {}
+        for location in locations:
+            unique.setdefault(canonical_locations.key(location), location)
+        
+        async def fetch_one(location: str) -> Tuple[Dict, Dict]:
+            entry = self.cache_entry("current", location)
+            if entry is not None and entry.is_fresh:
+                return await self.get_current_weather_with_meta(location)
+            async with semaphore:
+                return await self.get_current_weather_with_meta(location)
+        
+        outcomes = await asyncio.gather(
+            *(fetch_one(location) for location in unique.values()),
+            return_exceptions=True
+        )
+        by_key = dict(zip(unique, outcomes))
+        
+        results = {}
+        errors = {}
+        for location in locations:
+            outcome = by_key[canonical_locations.key(location)]
+            if isinstance(outcome, BaseException):
+                errors[location] = str(outcome) or type(outcome).__name__
+                continue
+            data, meta = outcome
+            if fields:
+                data = {field: data[field] for field in fields if field in data}
+            results[location] = {**data, "location": location, "cache": meta["status"]}
+        
+        return {
+            "count": len(locations),
+            "unique_locations": len(unique),
+            "results": results,
+            "errors": errors
+        }
+    
+    async def get_forecast(self, location: str) -> List[Dict]:
+        """Get daily forecast, served from cache when fresh"""
+        data, _ = await self.get_forecast_with_meta(location)
+        return data
+    
+    async def get_forecast_with_meta(self, location: str) -> Tuple[List[Dict], Dict]:
+        """Get daily forecast along with its cache age/staleness"""
+        parsed, meta = await self.get_parsed_forecast_with_meta(location)
+        return parsed.daily(), meta
+    
+    async def get_parsed_forecast(self, location: str) -> ParsedForecast:
+        """Get the full-resolution columnar forecast (shared by daily and hourly views)"""
+        parsed, _ = await self.get_parsed_forecast_with_meta(location)
+        return parsed
+    
+    async def get_coordinates(self, location: str) -> Optional[Tuple[float, float]]:
+        """Position the location's forecast is for (None if it cannot be placed).
+        
+        Places names the gazetteer does not know, so services keyed on
+        coordinates answer for every name the weather endpoints answer for.
+        """
+        try:
+            parsed = await self.get_parsed_forecast(location)
+        except Exception as e:
+            print(f"No forecast coordinates for {location}: {e}")
+            return None
+        if parsed.lat is None or parsed.lon is None:
+            return None
+        return parsed.lat, parsed.lon
+    
+    async def get_parsed_forecast_with_meta(self, location: str) -> Tuple[ParsedForecast, Dict]:
+        key = ("forecast", canonical_locations.key(location))
+        record_location_access(location)
+        return await self._cached(
+            key,
+            lambda: self._fetch_forecast(location),
+            fallback=lambda: ParsedForecast.from_payload(self._get_mock_forecast_payload(location))
+        )
+    
+    async def _cached(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                      fallback: Optional[Callable[[], Any]] = None) -> Tuple[Any, Dict]:
+        """Read-through cache with stale-while-revalidate and stale-if-error.
+        
+        Fresh entries are returned as-is. Entries expired less than
+        ``stale_while_revalidate`` seconds ago are returned immediately while a
+        single background task refreshes them. Older entries are refetched, but
+        still served if the upstream call fails within ``stale_if_error``. When
+        the circuit is open and nothing usable is cached, ``fallback`` (mock
+        data, never cached) is served instead. Concurrent fetches for a key
+        share one upstream call.
+        """
+        entry = self.cache.lookup(key)
+        if entry is not None and entry.is_fresh:
+            return entry.value, self._freshness(entry, "hit")
+        
+        if entry is not None and entry.staleness <= self.stale_while_revalidate:
+            self._revalidate(key, fetch)
+            return entry.value, self._freshness(entry, "stale")
+        
+        try:
+            data = await self.flights.do(key, lambda: self._fetch_and_store(key, fetch))
+        except Exception as e:
+            if entry is not None and entry.staleness <= self.stale_if_error:
+                return entry.value, self._freshness(entry, "stale-if-error")
+            if isinstance(e, CircuitOpenError) and fallback is not None:
+                return fallback(), {"status": "fallback", "age": 0, "stale": True}
+            raise
+        
+        return data, {"status": "miss", "age": 0, "stale": False}
+    
+    def cache_entry(self, kind: str, location: str) -> Optional[CacheEntry]:
+        """Peek at the cached entry for a location without counting a lookup"""
+        return self.cache.peek((kind, canonical_locations.key(location)))
+    
+    async def refresh(self, kind: str, location: str) -> None:
+        """Fetch ``kind`` ("current" or "forecast") for a location into the cache"""
+        key = (kind, canonical_locations.key(location))
+        fetch = self._fetch_current_weather if kind == "current" else self._fetch_forecast
+        await self.flights.do(key, lambda: self._fetch_and_store(key, lambda: fetch(location)))
+    
+    async def _fetch_and_store(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        data = await fetch()
+        self.cache.set(key, data)
+        return data
+    
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> None:
+        """Refresh a stale entry in the background unless a fetch is already running"""
+        if self.flights.is_in_flight(key):
+            return
+        
+        task = asyncio.ensure_future(self.flights.do(key, lambda: self._fetch_and_store(key, fetch)))
+        _background_refreshes.add(task)
+        task.add_done_callback(_on_refresh_done)
+    
+    @staticmethod
+    def _freshness(entry: CacheEntry, status: str) -> Dict:
+        return {"status": status, "age": int(entry.age), "stale": not entry.is_fresh}
+    
+    async def _fetch_current_weather(self, location: str) -> Dict:
         """Fetch current weather data from OpenWeatherMap API"""
         if not self.api_key:
             # Return mock data if API key is not configured
             return self._get_mock_current_weather(location)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/weather",
-                params={
-                    "q": location,
-                    "appid": self.api_key,
-                    "units": "metric"
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "location": location,
-                "temperature": data["main"]["temp"],
-                "feels_like": data["main"]["feels_like"],
-                "humidity": data["main"]["humidity"],
-                "description": data["weather"][0]["description"],
-                "wind_speed": data["wind"]["speed"],
-                "timestamp": data["dt"]
-            }
+        data = await self._get_upstream("weather", location)
+        
+        return {
+            "location": location,
+            "temperature": data["main"]["temp"],
+            "feels_like": data["main"]["feels_like"],
+            "humidity": data["main"]["humidity"],
+            "description": data["weather"][0]["description"],
+            "wind_speed": data["wind"]["speed"],
+            "timestamp": data["dt"]
+        }
     
-    async def get_forecast(self, location: str) -> List[Dict]:
-        """Fetch 7-day forecast from OpenWeatherMap API"""
+    async def _fetch_forecast(self, location: str) -> ParsedForecast:
+        """Fetch the 5-day/3-hour forecast from OpenWeatherMap and parse every slot"""
         if not self.api_key:
             # Return mock data if API key is not configured
-            return self._get_mock_forecast(location)
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/forecast",
-                params={
-                    "q": location,
-                    "appid": self.api_key,
-                    "units": "metric"
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Process forecast data (simplified - takes one reading per day)
-            forecast = []
-            seen_dates = set()
-            
-            for item in data["list"]:
-                date = item["dt_txt"].split()[0]
-                if date not in seen_dates:
-                    forecast.append({
-                        "date": date,
-                        "temp_max": item["main"]["temp_max"],
-                        "temp_min": item["main"]["temp_min"],
-                        "description": item["weather"][0]["description"],
-                        "humidity": item["main"]["humidity"]
-                    })
-                    seen_dates.add(date)
-                
-                if len(forecast) >= 7:
-                    break
-            
-            return forecast
+            return ParsedForecast.from_payload(self._get_mock_forecast_payload(location))
+        
+        return ParsedForecast.from_payload(await self._get_upstream("forecast", location))
+    
+    async def _get_upstream(self, endpoint: str, location: str) -> Dict:
+        """GET an OpenWeatherMap endpoint behind the circuit breaker, with retries and hedging"""
+        return await self.breaker.call(lambda: self._get_with_retries(endpoint, location))
+    
+    async def _get_with_retries(self, endpoint: str, location: str) -> Dict:
+        """Retry upstream failures with jittered exponential backoff, within the retry budget"""
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await hedged(
+                    lambda: self._send(endpoint, location),
+                    settings.hedge_delay,
+                    self.retry_budget.try_spend
+                )
+            except Exception as e:
+                attempt += 1
+                if attempt >= settings.retry_max_attempts or not is_upstream_failure(e):
+                    raise
+                if not self.retry_budget.try_spend():
+                    raise
+                await asyncio.sleep(random.uniform(0, settings.retry_backoff_base * 2 ** attempt))
+    
+    async def _send(self, endpoint: str, location: str) -> Dict:
+        """Single rate-limited GET against an OpenWeatherMap endpoint"""
+        await self.rate_limiter.acquire()
+        response = await self.http.get(
+            f"{self.base_url}/{endpoint}",
+            params={
+                "q": location,
+                "appid": self.api_key,
+                "units": "metric"
+            }
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def get_recommendations(self, location: str) -> Dict:
         """Generate AI-powered weather recommendations"""
@@ -107,25 +324,25 @@ class WeatherService:
         return recommendations
     
     def _get_mock_current_weather(self, location: str) -> Dict:
-        """Return mock weather data for testing"""
+        """Current conditions from the synthetic weather engine (matches the mock forecast)"""
+        now = int(time.time())
+        weather = synthetic_weather.hourly(location, np.array([now]))
         return {
             "location": location,
-            "temperature": 22.5,
-            "feels_like": 21.0,
-            "humidity": 65,
-            "description": "partly cloudy",
-            "wind_speed": 3.5,
-            "timestamp": 1705507200
+            "temperature": round(float(weather["temp"][0]), 1),
+            "feels_like": round(float(weather["feels_like"][0]), 1),
+            "humidity": int(round(float(weather["humidity"][0]))),
+            "description": weather["description"][0],
+            "wind_speed": round(float(weather["wind_speed"][0]), 1),
+            "timestamp": now
         }
     
-    def _get_mock_forecast(self, location: str) -> List[Dict]:
-        """Return mock forecast data for testing"""
-        return [
-            {"date": "2026-01-18", "temp_max": 24, "temp_min": 18, "description": "sunny", "humidity": 60},
-            {"date": "2026-01-19", "temp_max": 26, "temp_min": 19, "description": "clear", "humidity": 55},
-            {"date": "2026-01-20", "temp_max": 23, "temp_min": 17, "description": "cloudy", "humidity": 70},
-            {"date": "2026-01-21", "temp_max": 25, "temp_min": 20, "description": "sunny", "humidity": 50},
-            {"date": "2026-01-22", "temp_max": 27, "temp_min": 21, "description": "clear", "humidity": 48},
-            {"date": "2026-01-23", "temp_max": 24, "temp_min": 19, "description": "partly cloudy", "humidity": 62},
-            {"date": "2026-01-24", "temp_max": 22, "temp_min": 16, "description": "rainy", "humidity": 75},
-        ]
+    def _get_mock_forecast_payload(self, location: str) -> Dict:
+        """Return a synthetic 5-day/3-hour payload in the OpenWeatherMap shape"""
+        return synthetic_weather.forecast_payload(location, int(time.time()) // 10800 * 10800)
+
+
+def _on_refresh_done(task: asyncio.Task) -> None:
+    _background_refreshes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background weather refresh failed: {task.exception()}")
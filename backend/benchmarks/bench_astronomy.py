@@ -0,0 +1,61 @@
+"""Benchmark: vectorized sun times and moon phase vs. per-point evaluation.
+
+    cd backend && python -m benchmarks.bench_astronomy
+"""
+import time
+from datetime import date
+import numpy as np
+from app.services.astronomy import _sun_day, moon_phase, sun_day, sun_times
+
+CITIES = 1000
+DAYS = 365
+
+
+def main() -> None:
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(-60, 70, CITIES)
+    lons = rng.uniform(-180, 180, CITIES)
+    dates = np.datetime64("2026-01-01") + np.arange(DAYS)
+
+    start = time.perf_counter()
+    times = sun_times(dates, lats[:, None], lons[:, None])
+    vector_ms = (time.perf_counter() - start) * 1e3
+    assert times["sunrise"].shape == (CITIES, DAYS)
+
+    start = time.perf_counter()
+    sun_times(dates, lats[0], lons[0])
+    year_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    sun_times(dates[0], lats, lons)
+    cities_ms = (time.perf_counter() - start) * 1e3
+
+    sample = 2000
+    start = time.perf_counter()
+    for i in range(sample):
+        sun_times(dates[i % DAYS], lats[i % CITIES], lons[i % CITIES])
+    scalar_us = (time.perf_counter() - start) / sample * 1e6
+
+    _sun_day.cache_clear()
+    today = date(2026, 6, 21)
+    sun_day(today, 51.5074, -0.1278)
+    start = time.perf_counter()
+    for _ in range(sample):
+        sun_day(today, 51.5071, -0.1281)  # rounds onto the memoized entry
+    memo_us = (time.perf_counter() - start) / sample * 1e6
+
+    instants = np.datetime64("2026-01-01T00:00", "s") + np.arange(DAYS * 24) * np.timedelta64(3600, "s")
+    start = time.perf_counter()
+    moon_phase(instants)
+    moon_ms = (time.perf_counter() - start) * 1e3
+
+    points = CITIES * DAYS
+    print(f"sun calendar {CITIES} cities x {DAYS} days: {vector_ms:8.1f} ms ({vector_ms * 1e3 / points:.2f} us/point)")
+    print(f"one city, full year          : {year_ms:8.2f} ms")
+    print(f"{CITIES} cities, one day          : {cities_ms:8.2f} ms")
+    print(f"one point per call           : {scalar_us:8.1f} us/point (~{scalar_us * points / 1e6:.0f} s for the grid)")
+    print(f"memoized sun_day hit         : {memo_us:8.2f} us")
+    print(f"moon phase, hourly for a year: {moon_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
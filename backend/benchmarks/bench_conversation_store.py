@@ -0,0 +1,102 @@
+"""Benchmark: memory held by conversation history, process-global list vs per-session store.
+
+    cd backend && python -m benchmarks.bench_conversation_store
+
+Replays TURNS turns spread over a rotating population of sessions and reports
+the memory traced after the replay, the store's own estimate, and how long
+recording a turn and building a prompt's history take.
+"""
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from app.services.conversation_store import ConversationStore, estimate_tokens
+
+TURNS = 200_000
+ACTIVE_SESSIONS = 1_000
+# New users keep arriving, so the population of sessions ever seen keeps growing
+SESSION_CHURN = 0.05
+
+QUESTION = "Will it rain in {place} tomorrow afternoon, and should I take the bike?"
+ANSWER = ("Showers are likely in {place} between 2pm and 5pm with around 4 mm of rain and gusts near 35 km/h. "
+          "Take the bus this afternoon, or ride in the morning while it is still dry.")
+PLACES = ("London", "Paris", "Tokyo", "Sydney", "Berlin", "Toronto")
+
+
+def conversation(n: int, rng: random.Random) -> list:
+    sessions = [f"session-{i}" for i in range(ACTIVE_SESSIONS)]
+    next_id = ACTIVE_SESSIONS
+    turns = []
+    for _ in range(n):
+        if rng.random() < SESSION_CHURN:
+            sessions[rng.randrange(ACTIVE_SESSIONS)] = f"session-{next_id}"
+            next_id += 1
+        place = rng.choice(PLACES)
+        turns.append((rng.choice(sessions), QUESTION.format(place=place), ANSWER.format(place=place)))
+    return turns
+
+
+def _copy(text: str) -> str:
+    """A fresh string, so the text a request would carry in is counted as traced memory"""
+    return text.encode("utf-8").decode("utf-8")
+
+
+def replay_list(turns: list) -> int:
+    """The previous behaviour: every turn of every user appended to one list"""
+    tracemalloc.start()
+    history = []
+    for _, query, answer in turns:
+        history.append({"query": _copy(query), "response": _copy(answer), "timestamp": datetime.now().isoformat()})
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return traced
+
+
+def record(store: ConversationStore, session_ids: dict, user: str, query: str, answer: str) -> None:
+    """Record a user's turn, opening a new session when theirs was never issued or has been evicted"""
+    session_id = session_ids.get(user)
+    if session_id is None or not store.record(session_id, query, answer):
+        session_ids[user] = store.open()
+        store.record(session_ids[user], query, answer)
+
+
+def replay_store(turns: list) -> tuple:
+    tracemalloc.start()
+    store = ConversationStore(max_turns=20, max_sessions=2_000)
+    session_ids = {}
+    for user, query, answer in turns:
+        record(store, session_ids, user, _copy(query), _copy(answer))
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, session_ids, traced
+
+
+def main() -> None:
+    turns = conversation(TURNS, random.Random(5))
+    print(f"{TURNS} turns, {ACTIVE_SESSIONS} active sessions, {len({t[0] for t in turns})} sessions seen")
+
+    print(f"global list  : {replay_list(turns) / 2**20:7.1f} MiB traced, grows with every turn")
+
+    store, session_ids, traced = replay_store(turns)
+    stats = store.stats()
+    print(f"session store: {traced / 2**20:7.1f} MiB traced, {stats['estimated_bytes'] / 2**20:.1f} MiB estimated, "
+          f"{stats['sessions']} sessions, {stats['turns']} turns kept, {stats['turns_summarized']} summarized, "
+          f"{stats['capacity_evictions']} sessions evicted at capacity")
+
+    started = time.perf_counter()
+    for user, query, answer in turns[:50_000]:
+        record(store, session_ids, user, query, answer)
+    record_us = (time.perf_counter() - started) / 50_000 * 1e6
+
+    session_id = max(store._sessions, key=lambda s: len(store._sessions[s].turns))
+    started = time.perf_counter()
+    for _ in range(10_000):
+        messages = store.messages(session_id)
+    messages_us = (time.perf_counter() - started) / 10_000 * 1e6
+    tokens = sum(estimate_tokens(m["content"]) for m in messages)
+    print(f"record {record_us:.1f} us/turn; history for a full session {messages_us:.1f} us, "
+          f"{len(messages)} messages, ~{tokens} tokens (budget {store.token_budget})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark: per-dict scoring loop vs the vectorized DestinationRanker.
+
+    cd backend && python -m benchmarks.bench_destination_ranking
+"""
+import time
+import numpy as np
+from app.services.ranking_engine import DestinationRanker
+
+CITIES = 10_000
+PROFILES = 100
+TOP_K = 10
+
+
+def _loop_rank(records, preferences):
+    """The previous ComparisonService scoring: Python arithmetic per city, then a full sort"""
+    scored = []
+    for city_data in records:
+        score = 0
+        temp_diff = abs(city_data["temperature"] - preferences.get("ideal_temperature", 22))
+        score += max(0, 100 - (temp_diff * 10))
+        if preferences.get("low_humidity", False):
+            score += max(0, 100 - city_data["humidity"])
+        if preferences.get("low_wind", False):
+            score += max(0, 100 - (city_data["wind_speed"] * 5))
+        scored.append({**city_data, "score": round(score, 1)})
+    scored.sort(key=lambda x: x["score"], reverse=True)
+    return scored[:TOP_K]
+
+
+def _timeit(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    rng = np.random.default_rng(42)
+    records = [
+        {
+            "city": f"City{i}",
+            "temperature": float(rng.uniform(-10, 40)),
+            "humidity": float(rng.uniform(10, 100)),
+            "wind_speed": float(rng.uniform(0, 20)),
+            "rain": float(rng.exponential(1.0)),
+            "aqi": float(rng.uniform(0, 200)),
+            "uv_index": float(rng.uniform(0, 11))
+        }
+        for i in range(CITIES)
+    ]
+    preferences = {"ideal_temperature": 22, "low_humidity": True, "low_wind": True}
+    profiles = [
+        {"ideal_temperature": float(t), "low_humidity": True, "low_wind": bool(t % 2), "low_aqi": True}
+        for t in rng.uniform(5, 30, PROFILES)
+    ]
+
+    start = time.perf_counter()
+    ranker = DestinationRanker.from_records(records)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    loop_ms = _timeit(lambda: _loop_rank(records, preferences))
+    vector_ms = _timeit(lambda: ranker.top_k(preferences, TOP_K))
+    profiles_ms = _timeit(lambda: ranker.top_k_profiles(profiles, TOP_K))
+
+    print(f"cities={CITIES} top_k={TOP_K}")
+    print(f"build ranker            : {build_ms:8.2f} ms (once per catalog)")
+    print(f"python loop + sort      : {loop_ms:8.2f} ms")
+    print(f"vectorized top-k        : {vector_ms:8.2f} ms  ({loop_ms / vector_ms:.0f}x)")
+    print(f"{PROFILES} profiles at once    : {profiles_ms:8.2f} ms  ({profiles_ms / PROFILES:.3f} ms/profile)")
+
+
+if __name__ == "__main__":
+    main()
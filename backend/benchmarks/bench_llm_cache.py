@@ -0,0 +1,93 @@
+"""Benchmark: LLM response cache hit rates on a paraphrased, skewed query stream.
+
+    cd backend && python -m benchmarks.bench_llm_cache
+
+Each simulated completion takes COMPLETION_MS and its answer records which
+(question, place, day) it was generated for, so a similarity hit that served
+the wrong answer is counted instead of assumed away.
+"""
+import asyncio
+import random
+import time
+from app.services.enhanced_nlp_service import EnhancedNLPService
+from app.services.llm_response_cache import SemanticResponseCache, bucket_context
+from app.services.location_service import LocationService
+from app.services.nlp_service import NLPService
+
+QUERIES = 20_000
+COMPLETION_MS = 2.0
+
+# Paraphrases per question; the label is what a correct answer must be about
+QUESTIONS = {
+    "rain": ("Will it rain in {place} {when}?", "will it rain in {place} {when}", "Is it going to rain in {place} {when}?",
+             "will it rain {when} in {place}?", "Hey, will it rain in {place} {when}?"),
+    "snow": ("Will it snow in {place} {when}?", "is it going to snow in {place} {when}"),
+    "run": ("Should I go for a run in {place} {when}?", "should i go running in {place} {when}",
+            "Is it a good day for a run in {place} {when}?"),
+    "sunset": ("When is sunset in {place} {when}?", "what time is sunset in {place} {when}",
+               "When's the sunset in {place} {when}?"),
+    "air": ("What's the air quality in {place} {when}?", "How is the air quality in {place} {when}?",
+            "air quality in {place} {when} please"),
+}
+PLACES = ("London", "Paris", "New York", "Tokyo", "Sydney", "Berlin", "Rome", "Toronto", "Dubai", "Mumbai",
+          "Singapore", "Barcelona", "Amsterdam", "Hong Kong", "Los Angeles")
+WHENS = ("today", "tomorrow", "this weekend")
+
+
+def query_stream(n: int, rng: random.Random) -> list:
+    """Zipf-skewed places, uniform questions and paraphrases"""
+    weights = [1 / (rank + 1) for rank in range(len(PLACES))]
+    stream = []
+    for _ in range(n):
+        label = rng.choice(list(QUESTIONS))
+        place = rng.choices(PLACES, weights)[0]
+        when = rng.choice(WHENS)
+        template = rng.choice(QUESTIONS[label])
+        stream.append((template.format(place=place, when=when), (label, place, when)))
+    return stream
+
+
+async def run(stream: list, similarity: float) -> dict:
+    cache = SemanticResponseCache(max_entries=2000, ttl=3600, similarity=similarity)
+    nlp = EnhancedNLPService(NLPService(LocationService()))
+    calls = 0
+    wrong = 0
+    lookup_s = 0.0
+
+    for query, truth in stream:
+        async def complete(truth=truth) -> tuple:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(COMPLETION_MS / 1000)
+            return truth
+
+        started = time.perf_counter()
+        answer, status = await cache.get_or_create("query", query, nlp._query_bucket(query, None), complete)
+        if status != "miss":
+            lookup_s += time.perf_counter() - started
+        wrong += answer != truth
+    stats = cache.stats()
+    hits = stats["exact_hits"] + stats["semantic_hits"]
+    return {**stats, "calls": calls, "wrong": wrong, "lookup_us": lookup_s / max(hits, 1) * 1e6}
+
+
+def main() -> None:
+    stream = query_stream(QUERIES, random.Random(11))
+    print(f"{QUERIES} queries, {len(PLACES)} places, {sum(map(len, QUESTIONS.values()))} phrasings")
+    for label, similarity in (("exact only", 0.0), ("exact + trigram 0.8", 0.8), ("exact + trigram 0.7", 0.7)):
+        result = asyncio.run(run(stream, similarity))
+        print(
+            f"{label:20s}: hit rate {result['hit_rate']:.1%} (semantic {result['semantic_hit_rate']:.1%}), "
+            f"{result['calls']} completions, {result['wrong']} wrong answers served, "
+            f"hit served in {result['lookup_us']:.0f} us"
+        )
+
+    # Insights are bucketed on rounded readings, so nearby conditions share one completion
+    weather = [{"temperature": 14.2 + 0.1 * i, "humidity": 71 + i % 3, "description": "light rain",
+                "wind_speed": 3.4, "timestamp": i} for i in range(20)]
+    buckets = {bucket_context({k: w[k] for k in ("temperature", "humidity", "description", "wind_speed")}) for w in weather}
+    print(f"insights: 20 readings drifting over 2°C/3% humidity fall into {len(buckets)} bucket(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark: gazetteer load time and LocationIndex search latency on 100k synthetic places.
+
+    cd backend && python -m benchmarks.bench_location_search
+"""
+import tempfile
+import time
+import numpy as np
+from app.services.gazetteer import ARRAYS, Gazetteer, compile_records
+from app.services.location_index import LocationIndex
+
+PLACES = 100_000
+QUERIES = 2000
+
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwz" for v in ["a", "e", "i", "o", "u", "ão", "é"]] + \
+    ["ber", "gra", "lon", "que", "ville", "burg", "ton", "stad"]
+
+
+def _synthetic_places(rng: np.random.Generator):
+    places = []
+    for i in range(PLACES):
+        parts = rng.choice(SYLLABLES, size=rng.integers(2, 5))
+        name = "".join(parts).capitalize()
+        places.append({
+            "name": name,
+            "country": ["US", "GB", "FR", "BR", "IN", "JP"][i % 6],
+            "lat": float(rng.uniform(-60, 70)),
+            "lon": float(rng.uniform(-180, 180)),
+            "population": int(rng.pareto(1.2) * 1000)
+        })
+    return places
+
+
+def _measure(index: LocationIndex, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, 10)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main() -> None:
+    rng = np.random.default_rng(7)
+    places = _synthetic_places(rng)
+
+    start = time.perf_counter()
+    arrays = compile_records(places)
+    compile_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ARRAYS:
+            np.save(f"{directory}/{name}.npy", arrays[name])
+        start = time.perf_counter()
+        index = LocationIndex(Gazetteer.open(directory))
+        open_ms = (time.perf_counter() - start) * 1e3
+        _report(index, places, rng, compile_s, open_ms)
+
+
+def _report(index: LocationIndex, places, rng, compile_s: float, open_ms: float) -> None:
+    names = [places[i]["name"] for i in rng.integers(0, PLACES, QUERIES)]
+    prefixes = [name[:int(rng.integers(2, max(3, len(name))))] for name in names]
+    accented = [name.upper().replace("AO", "ÃO") for name in names]
+    typos = [name[:2] + name[3:] if len(name) > 4 else name + "x" for name in names]
+    linear = names[:200]
+
+    print(f"places={PLACES} compile={compile_s:.2f}s (offline) open+index={open_ms:.2f}ms (mmap)")
+    print(f"prefix autocomplete : {_measure(index, prefixes):8.1f} us/query")
+    print(f"exact, folded       : {_measure(index, accented):8.1f} us/query")
+    print(f"one typo (fuzzy)    : {_measure(index, typos):8.1f} us/query")
+
+    start = time.perf_counter()
+    for query in linear:
+        q = query.lower()
+        [p for p in places if q in p["name"].lower()][:10]
+    linear_us = (time.perf_counter() - start) / len(linear) * 1e6
+    print(f"old substring scan  : {linear_us:8.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
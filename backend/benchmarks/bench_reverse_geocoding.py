@@ -0,0 +1,53 @@
+"""Benchmark: nearest-place reverse geocoding over 200k synthetic places.
+
+    cd backend && python -m benchmarks.bench_reverse_geocoding
+"""
+import time
+import numpy as np
+from app.services.gazetteer import Gazetteer
+from app.services.reverse_geocoder import ReverseGeocoder, haversine_km
+
+PLACES = 200_000
+QUERIES = 10_000
+
+
+def main() -> None:
+    rng = np.random.default_rng(11)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, PLACES)))  # uniform over the sphere
+    lons = rng.uniform(-180, 180, PLACES)
+    gazetteer = Gazetteer.from_records(
+        {"name": f"Place {i}", "country": "XX", "lat": lats[i], "lon": lons[i], "population": i}
+        for i in range(PLACES)
+    )
+    geocoder = ReverseGeocoder(gazetteer)
+
+    start = time.perf_counter()
+    geocoder.tree
+    build_s = time.perf_counter() - start
+
+    query_lats = np.degrees(np.arcsin(rng.uniform(-1, 1, QUERIES)))
+    query_lons = rng.uniform(-180, 180, QUERIES)
+
+    start = time.perf_counter()
+    for lat, lon in zip(query_lats[:1000].tolist(), query_lons[:1000].tolist()):
+        geocoder.nearest(lat, lon)
+    single_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    start = time.perf_counter()
+    distances, indices = geocoder.query(query_lats, query_lons, k=5)
+    batch_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+    start = time.perf_counter()
+    for lat, lon in zip(query_lats[:20].tolist(), query_lons[:20].tolist()):
+        brute = haversine_km(lat, lon, gazetteer.lat, gazetteer.lon)
+        assert np.isclose(brute.min(), geocoder.query([lat], [lon])[0][0, 0], atol=1e-2)
+    brute_us = (time.perf_counter() - start) / 20 * 1e6
+
+    print(f"places={PLACES} tree build={build_s:.2f}s (lazy, first lookup)")
+    print(f"single nearest (k=1, dict): {single_us:8.1f} us/query")
+    print(f"batch nearest (k=5)       : {batch_us:8.1f} us/point")
+    print(f"brute-force haversine scan: {brute_us:8.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
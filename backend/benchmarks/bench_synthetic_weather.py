@@ -0,0 +1,49 @@
+"""Benchmark: synthetic weather generation, and agreement between overlapping windows.
+
+    cd backend && python -m benchmarks.bench_synthetic_weather
+"""
+import time
+import numpy as np
+from app.services.synthetic_weather import SyntheticWeather
+
+YEARS = 5
+START = 1735689600  # 2025-01-01T00:00Z
+
+
+def main() -> None:
+    engine = SyntheticWeather(seed=42)
+    hours = YEARS * 365 * 24
+    engine.hours(None, START, 24, lat=51.5, lon=-0.1)  # warm up
+
+    start = time.perf_counter()
+    series = engine.hours(None, START, hours, lat=51.5, lon=-0.1)
+    years_ms = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    daily = engine.daily(None, START // 86400, 365, lat=51.5, lon=-0.1)
+    daily_ms = (time.perf_counter() - start) * 1e3
+
+    sample = 1000
+    start = time.perf_counter()
+    for i in range(sample):
+        engine.hours(None, START + 3600 * i, 40, step=10800, lat=51.5, lon=-0.1)
+    forecast_us = (time.perf_counter() - start) / sample * 1e6
+
+    # Any window must reproduce the same hours as the long series
+    offset = 24 * 400 + 7
+    window = engine.hours(None, START + 3600 * offset, 72, lat=51.5, lon=-0.1)
+    fields = ("temp", "humidity", "pressure", "wind_speed", "clouds", "rain")
+    consistent = all(np.array_equal(window[f], series[f][offset:offset + 72]) for f in fields)
+    reproducible = np.array_equal(SyntheticWeather(seed=42).hours(None, START, 72, lat=51.5, lon=-0.1)["temp"], series["temp"][:72])
+
+    anomaly = series["temp"] - np.convolve(series["temp"], np.ones(24) / 24, "same")
+    print(f"{YEARS} years hourly ({hours} hours): {years_ms:8.1f} ms ({years_ms * 1e3 / hours:.2f} us/hour)")
+    print(f"one year of daily aggregates : {daily_ms:8.2f} ms ({len(daily['day'])} days)")
+    print(f"5-day/3-hour forecast window : {forecast_us:8.1f} us")
+    print(f"overlapping windows agree    : {consistent}; same seed reproduces: {reproducible}")
+    print(f"corr(diurnal temp, humidity) : {np.corrcoef(anomaly, series['humidity'])[0, 1]:+.2f}")
+    print(f"corr(pressure, cloud cover)  : {np.corrcoef(series['pressure'], series['clouds'])[0, 1]:+.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark: per-call AsyncClient vs the shared upstream pool.
+
+Starts a local stub of the OpenWeatherMap `/weather` endpoint and drives
+`WeatherService._fetch_current_weather` against it with a fixed concurrency.
+The fetch path skips the response cache, and the service gets an unlimited
+rate limiter, so every request reaches the stub and only the client differs.
+
+    cd backend && python -m benchmarks.bench_upstream_client
+"""
+import asyncio
+import json
+import time
+import httpx
+from app.core.http_client import upstream_client
+from app.core.rate_limiter import TokenBucket
+from app.services.weather_service import WeatherService
+
+REQUESTS = 2000
+CONCURRENCY = 50
+
+STUB_BODY = json.dumps({
+    "main": {"temp": 12.3, "feels_like": 11.0, "humidity": 71},
+    "weather": [{"description": "light rain"}],
+    "wind": {"speed": 4.1},
+    "dt": 1705507200
+}).encode()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Minimal HTTP/1.1 keep-alive responder"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not head:
+                break
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(STUB_BODY)).encode() + b"\r\n\r\n" + STUB_BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _per_call_client(service: WeatherService, location: str) -> None:
+    """The pre-pool code path: one AsyncClient (and connection) per request"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{service.base_url}/weather",
+            params={"q": location, "appid": service.api_key, "units": "metric"}
+        )
+        response.raise_for_status()
+        response.json()
+
+
+async def _drive(call) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await call(f"City{i % 25}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    service = WeatherService()
+    service.api_key = "benchmark"
+    service.base_url = f"http://127.0.0.1:{port}"
+    service.rate_limiter = TokenBucket("benchmark", rate_per_minute=1e9, burst=REQUESTS, max_queue_time=0)
+
+    await upstream_client.start()
+    try:
+        before = await _drive(lambda loc: _per_call_client(service, loc))
+        after = await _drive(service._fetch_current_weather)
+    finally:
+        await upstream_client.close()
+        server.close()
+        await server.wait_closed()
+
+    print(f"requests={REQUESTS} concurrency={CONCURRENCY}")
+    print(f"per-call AsyncClient : {before:8.0f} req/s")
+    print(f"shared upstream pool : {after:8.0f} req/s  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
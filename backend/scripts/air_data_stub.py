@@ -0,0 +1,121 @@
+"""Serve air-quality and pollen fixtures over HTTP, for running the API without upstream access.
+
+    cd backend && python -m scripts.air_data_stub scripts/stub_data --port 8765 --delay 0.2
+
+Then start the API with AIR_DATA_PROVIDER=stub (AIR_DATA_STUB_URL defaults to
+http://127.0.0.1:8765). The stub answers the two upstream formats the HTTP
+provider speaks:
+
+    /air_pollution/forecast?lat=..&lon=..        OpenWeatherMap Air Pollution
+    /air-quality?latitude=a,b&longitude=c,d      Open-Meteo (pollen, batched)
+
+from JSON files in the data directory: <dir>/air_pollution/<geohash>.json or
+<dir>/pollen/<geohash>.json for a specific cell, else default.json. Fixture
+timestamps are shifted so the first entry is the current hour. Every request
+is logged, so coalescing and caching are visible from the request count.
+"""
+import argparse
+import json
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict
+from urllib.parse import parse_qs, urlsplit
+from app.core.config import settings
+from app.core.location_keys import encode_geohash
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    data_dir = Path(".")
+    delay = 0.0
+    served = 0
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        time.sleep(self.delay)
+        try:
+            if url.path.endswith("/air_pollution/forecast"):
+                body = self._air_pollution(float(query["lat"][0]), float(query["lon"][0]))
+            elif url.path.endswith("/air-quality"):
+                body = self._pollen(query["latitude"][0], query["longitude"][0])
+            else:
+                self.send_error(404, "Unknown endpoint")
+                return
+        except (KeyError, ValueError) as e:
+            self.send_error(400, f"Bad request: {e}")
+            return
+        except FileNotFoundError as e:
+            self.send_error(404, str(e))
+            return
+
+        StubHandler.served += 1
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _air_pollution(self, lat: float, lon: float) -> Dict:
+        fixture = _fixture(self.data_dir / "air_pollution", _cell(lat, lon))
+        start = _current_hour() - fixture["list"][0]["dt"]
+        return {
+            "coord": {"lat": lat, "lon": lon},
+            "list": [{**entry, "dt": entry["dt"] + start} for entry in fixture["list"]]
+        }
+
+    def _pollen(self, latitudes: str, longitudes: str):
+        results = []
+        for lat, lon in zip(latitudes.split(","), longitudes.split(",")):
+            fixture = _fixture(self.data_dir / "pollen", _cell(float(lat), float(lon)))
+            hourly = dict(fixture["hourly"])
+            start = _current_hour() - hourly["time"][0]
+            hourly["time"] = [t + start for t in hourly["time"]]
+            results.append({"latitude": float(lat), "longitude": float(lon), "hourly": hourly})
+        return results[0] if len(results) == 1 else results
+
+    def log_message(self, format: str, *args) -> None:
+        print(f"[stub #{StubHandler.served}] {format % args}")
+
+
+def _cell(lat: float, lon: float) -> str:
+    return encode_geohash(lat, lon, settings.location_key_precision)
+
+
+def _current_hour() -> int:
+    return int(time.time()) // 3600 * 3600
+
+
+@lru_cache(maxsize=1024)
+def _fixture(directory: Path, cell: str) -> Dict:
+    for name in (f"{cell}.json", "default.json"):
+        path = directory / name
+        if path.exists():
+            return json.loads(path.read_text())
+    raise FileNotFoundError(f"No fixture for cell {cell} in {directory}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data_dir", type=Path)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    StubHandler.data_dir = args.data_dir
+    StubHandler.delay = args.delay
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Serving {args.data_dir} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
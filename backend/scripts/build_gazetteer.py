@@ -0,0 +1,24 @@
+"""Compile a gazetteer CSV into the memory-mapped format LocationService loads.
+
+    cd backend && python -m scripts.build_gazetteer places.csv data/gazetteer
+
+The CSV needs columns name, alternate_names, country, lat, lon, population,
+timezone. Point GAZETTEER_PATH at the output directory.
+"""
+import sys
+import time
+from app.services.gazetteer import compile_gazetteer
+
+
+def main() -> None:
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    count = compile_gazetteer(sys.argv[1], sys.argv[2])
+    print(f"Compiled {count} places into {sys.argv[2]} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Serve a canned chat-completions endpoint, for running the AI endpoints without OpenAI.
+
+    cd backend && python -m scripts.openai_stub --port 8766 --first-token-delay 0.3 --token-delay 0.05
+
+Then start the API with OPENAI_API_KEY=stub and OPENAI_BASE_URL=http://127.0.0.1:8766/v1.
+POST /v1/chat/completions answers with the same reply either as one JSON
+completion, after the first-token delay plus every token delay (what a
+non-streaming client waits for), or, with "stream": true, as Server-Sent
+Events: the first chunk after the first-token delay, then one chunk per
+token. Every request is logged, so cache hits are visible as missing requests.
+"""
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+DEFAULT_REPLY = (
+    "Expect light rain through the afternoon with temperatures around 14°C. "
+    "Take an umbrella, and plan outdoor exercise for the drier morning hours."
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    reply = DEFAULT_REPLY
+    first_token_delay = 0.0
+    token_delay = 0.0
+    served = 0
+
+    def do_POST(self) -> None:
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404, "Unknown endpoint")
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError as e:
+            self.send_error(400, f"Bad request: {e}")
+            return
+
+        StubHandler.served += 1
+        tokens = _tokens(self.reply)
+        model = request.get("model", "stub")
+        if request.get("stream"):
+            self._stream(model, tokens)
+        else:
+            time.sleep(self.first_token_delay + self.token_delay * (len(tokens) - 1))
+            self._json(_completion(model, self.reply))
+
+    def _stream(self, model: str, tokens: List[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.token_delay)
+            self._chunk(_chunk(model, {"role": "assistant", "content": token} if i == 0 else {"content": token}))
+        self._chunk(_chunk(model, {}, finish_reason="stop"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, payload: Dict) -> None:
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _json(self, body: Dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        print(f"[stub #{StubHandler.served}] {format % args}")
+
+
+def _tokens(text: str) -> List[str]:
+    """Word-sized pieces with their leading space, roughly how the real API chunks text"""
+    return re.findall(r"\s*\S+", text)
+
+
+def _completion(model: str, text: str) -> Dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(_tokens(text)), "total_tokens": len(_tokens(text))}
+    }
+
+
+def _chunk(model: str, delta: Dict, finish_reason=None) -> Dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds between tokens")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    StubHandler.reply = args.reply
+    StubHandler.first_token_delay = args.first_token_delay
+    StubHandler.token_delay = args.token_delay
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Serving chat completions on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
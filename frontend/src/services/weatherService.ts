@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { WeatherData, ForecastData, QueryResponse } from '../types/weather';
+import { WeatherData, ForecastData, QueryResponse, BatchWeatherResponse } from '../types/weather';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
@@ -19,6 +19,12 @@ export const weatherService = {
     return response.data;
   },
 
+  // Get current weather for many locations in one request
+  getBatchWeather: async (locations: string[], fields?: string[]): Promise<BatchWeatherResponse> => {
+    const response = await api.post(`/api/weather/batch`, { locations, fields });
+    return response.data;
+  },
+
   // Get 7-day forecast
   getForecast: async (location: string): Promise<ForecastData[]> => {
     const response = await api.get(`/api/weather/forecast`, {
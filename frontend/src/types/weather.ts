@@ -16,6 +16,13 @@ export interface ForecastData {
   humidity: number;
 }
 
+export interface BatchWeatherResponse {
+  count: number;
+  unique_locations: number;
+  results: Record<string, Partial<WeatherData> & { location: string; cache: string }>;
+  errors: Record<string, string>;
+}
+
 export interface QueryResponse {
   answer: string;
   weatherData?: WeatherData;